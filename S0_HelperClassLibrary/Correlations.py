@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+from S0_HelperClassLibrary.ParallelColumns import mapSharedArrays
+
+# Methods of correlationMatrix, as the methods of DataFrame.corr
+CORRELATION_METHODS = ['pearson', 'spearman', 'kendall']
+# Number of records of the sufficient statistics of each chunk
+CHUNK_SIZE = 100000
+# Number of tasks of column pairs of each worker, so that workers that finish early take more tasks
+PAIR_BLOCKS_PER_WORKER = 4
+# Largest table of counts of the values of 2 fields for Kendall, per record, above which tau-b is computed by sorting
+KENDALL_TABLE_CELLS_PER_RECORD = 4
+
+
+# Correlation matrix of the numeric and boolean fields
+def correlationMatrix(transactionData, method='pearson', workers=1, chunkSize=CHUNK_SIZE):
+    """
+    Compute the correlation matrix of the numeric and boolean fields with the values of DataFrame.corr(method).
+
+    Each pair of fields is correlated on the records where both are present.  Pearson is accumulated from the sums,
+    sums of squares, and cross products of chunks of records.  Each field is ranked only once: Spearman is the Pearson
+    correlation of the average ranks, and the ranks of pairs with different missing records are recounted from the
+    dense ranks of the fields without sorting again.  Kendall tau-b counts the discordant pairs of fields with few
+    values from the table of counts of their values in O(n), and by merge sort in O(n log n) otherwise.
+
+    With more than 1 worker the chunks of records (pearson, spearman) or the blocks of pairs of fields (spearman,
+    kendall) are spread across a pool of processes that share the values read only.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The dataset.  Fields that are not numeric or boolean are left out, as DataFrame.corr(numeric_only=True).
+    method : str
+        The correlation method.  Example: 'pearson', 'spearman', or 'kendall'
+    workers : int
+        The number of processes.
+    chunkSize : int
+        The number of records of each chunk of sufficient statistics.
+
+    Return
+    _______
+    correlations : DataFrame
+        The correlation of each pair of fields.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError("Correlation method needs to be one of: " + ', '.join(CORRELATION_METHODS))
+
+    numericData = transactionData.select_dtypes(include=['number', 'bool'])
+    values = numericData.to_numpy(dtype='float64', na_value=np.nan)
+    if method == 'pearson':
+        correlations = pearsonCorrelations(values, workers, chunkSize)
+    elif method == 'spearman':
+        correlations = spearmanCorrelations(values, workers, chunkSize)
+    else:
+        correlations = kendallCorrelations(values, workers)
+    return pd.DataFrame(correlations, index=numericData.columns, columns=numericData.columns)
+
+
+# Pearson correlations from the sufficient statistics of chunks of records
+def pearsonCorrelations(values, workers=1, chunkSize=CHUNK_SIZE):
+    # The values are shifted by the median of the first chunk of each field, so the sums of squares do not lose the
+    # precision of large values, e.g. account numbers.  A constant field is shifted to exactly 0.
+    firstChunk = values[:chunkSize]
+    shifts = np.zeros(values.shape[1])
+    for field in range(values.shape[1]):
+        present = np.isfinite(firstChunk[:, field])
+        if present.any():
+            shifts[field] = np.median(firstChunk[present, field])
+    chunks = [(start, min(start + chunkSize, len(values))) for start in range(0, len(values), chunkSize)]
+
+    statistics = initPearsonStatistics(values.shape[1])
+    for chunkStatistics in mapSharedArrays(chunkPearsonStatistics, {'values': values}, chunks, workers, args=(shifts,)):
+        statistics = mergePearsonStatistics(statistics, chunkStatistics)
+    return pearsonFromStatistics(statistics)
+
+
+# Sufficient statistics of the records of a chunk
+def chunkPearsonStatistics(arrays, chunk, shifts):
+    return pearsonStatistics(arrays['values'][chunk[0]:chunk[1]] - shifts)
+
+
+# Empty sufficient statistics of a number of fields
+def initPearsonStatistics(numberOfFields):
+    return {name: np.zeros((numberOfFields, numberOfFields))
+            for name in ['count', 'sums', 'sumSquares', 'crossProducts']}
+
+
+# Sufficient statistics of each pair of fields on the records where both are present
+def pearsonStatistics(values):
+    """
+    Compute the number of records, sums, sums of squares, and cross products of each pair of fields, counting only
+    the records where both fields are present.  The statistics of chunks of records add up with mergePearsonStatistics.
+
+    Parameters
+    __________
+    values : ndarray
+        The values of the fields of a chunk of records, missing values are NaN.
+
+    Return
+    _______
+    statistics : dict
+        Matrices of the statistics, the sums and sums of squares of field i on the records where field j is present
+        are at [i, j].
+    """
+    present = np.isfinite(values)
+    presentValues = np.where(present, values, 0.0)
+    present = present.astype('float64')
+    return {'count': present.T @ present,
+            'sums': presentValues.T @ present,
+            'sumSquares': (presentValues ** 2).T @ present,
+            'crossProducts': presentValues.T @ presentValues}
+
+
+# Sufficient statistics of the union of 2 chunks of records
+def mergePearsonStatistics(statistics, otherStatistics):
+    return {name: statistics[name] + otherStatistics[name] for name in statistics}
+
+
+# Pearson correlations of the sufficient statistics, NaN when a field is constant on the records of the pair
+def pearsonFromStatistics(statistics):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = statistics['count']
+        sums = statistics['sums']
+        covariance = statistics['crossProducts'] - sums * sums.T / count
+        variance = statistics['sumSquares'] - sums ** 2 / count
+        divisor = np.sqrt(np.maximum(variance * variance.T, 0.0))
+        correlations = covariance / divisor
+    correlations[(count < 1) | (divisor == 0)] = np.nan
+    return correlations
+
+
+# Dense rank of the values of each field, computed once by sorting each field
+def denseRanks(values):
+    """
+    Rank the distinct values of each field in increasing order.
+
+    Parameters
+    __________
+    values : ndarray
+        The values of the fields, missing values are NaN.
+
+    Return
+    _______
+    ranks : ndarray
+        The int64 dense rank of each value from 0, missing values are -1.
+    """
+    ranks = np.full(values.shape, -1, dtype='int64')
+    for field in range(values.shape[1]):
+        present = np.isfinite(values[:, field])
+        ranks[present, field] = np.unique(values[present, field], return_inverse=True)[1]
+    return ranks
+
+
+# Average rank of tied values from 1 of dense ranks, as the ranks of Spearman
+def averageRanks(ranks):
+    counts = np.bincount(ranks)
+    return (np.cumsum(counts) - (counts - 1) / 2.0)[ranks]
+
+
+# Spearman correlations, the Pearson correlations of the average ranks
+def spearmanCorrelations(values, workers=1, chunkSize=CHUNK_SIZE):
+    ranks = denseRanks(values)
+    present = ranks >= 0
+
+    # Pairs of fields present on the same records share the ranks of each field
+    rankValues = np.full(values.shape, np.nan)
+    for field in range(values.shape[1]):
+        rankValues[present[:, field], field] = averageRanks(ranks[present[:, field], field])
+    correlations = pearsonCorrelations(rankValues, workers, chunkSize)
+
+    # Fields are ranked again on the records where both are present, from the dense ranks
+    pairs = [(i, j) for i in range(values.shape[1]) for j in range(i + 1, values.shape[1])
+             if not np.array_equal(present[:, i], present[:, j])]
+    for (pair, correlation) in mapPairBlocks(spearmanPairBlock, ranks, pairs, workers):
+        correlations[pair] = correlations[pair[::-1]] = correlation
+    return correlations
+
+
+# Spearman correlation of each pair of fields of a block on the records where both are present
+def spearmanPairBlock(arrays, pairs):
+    ranks = arrays['ranks']
+    results = []
+    for (i, j) in pairs:
+        present = (ranks[:, i] >= 0) & (ranks[:, j] >= 0)
+        if present.sum() < 1:
+            results.append(((i, j), np.nan))
+            continue
+        pairRanks = np.column_stack([averageRanks(ranks[present, i]), averageRanks(ranks[present, j])])
+        results.append(((i, j), pearsonFromStatistics(pearsonStatistics(pairRanks - pairRanks[0]))[0, 1]))
+    return results
+
+
+# Kendall tau-b correlations of each pair of fields
+def kendallCorrelations(values, workers=1):
+    ranks = denseRanks(values)
+    present = ranks >= 0
+
+    # A field is fully correlated with itself, as DataFrame.corr
+    correlations = np.diag(np.where(present.any(axis=0), 1.0, np.nan))
+    pairs = [(i, j) for i in range(values.shape[1]) for j in range(i + 1, values.shape[1])]
+    for (pair, correlation) in mapPairBlocks(kendallPairBlock, ranks, pairs, workers):
+        correlations[pair] = correlations[pair[::-1]] = correlation
+    return correlations
+
+
+# Kendall tau-b of each pair of fields of a block on the records where both are present
+def kendallPairBlock(arrays, pairs):
+    ranks = arrays['ranks']
+    results = []
+    for (i, j) in pairs:
+        present = (ranks[:, i] >= 0) & (ranks[:, j] >= 0)
+        results.append(((i, j), kendallTau(ranks[present, i], ranks[present, j])))
+    return results
+
+
+# Kendall tau-b of 2 fields of dense ranks
+def kendallTau(xRanks, yRanks):
+    """
+    Compute Kendall's tau-b of 2 fields, as scipy.stats.kendalltau.
+
+    tau-b is (concordant - discordant) / sqrt((pairs - x ties) * (pairs - y ties)), where the concordant minus
+    discordant pairs are the pairs less the ties in x or y plus the ties in both less twice the discordant pairs.  The
+    ties are counted from the number of records of each value.  When the table of counts of each pair of values has at
+    most KENDALL_TABLE_CELLS_PER_RECORD cells per record, the discordant pairs are summed from the table, the records
+    with a greater x and a smaller y than each cell.  Otherwise scipy.stats.kendalltau counts them by merge sort.
+
+    Parameters
+    __________
+    xRanks : ndarray
+        The int64 dense ranks of the first field.
+    yRanks : ndarray
+        The int64 dense ranks of the second field, of the same records.
+
+    Return
+    _______
+    tau : float
+        The tau-b correlation, NaN when a field is constant or there are fewer than 2 records.
+    """
+    numberOfRecords = len(xRanks)
+    if numberOfRecords < 2:
+        return np.nan
+
+    totalPairs = numberOfRecords * (numberOfRecords - 1) // 2
+    xTies = tiedPairs(np.bincount(xRanks))
+    yTies = tiedPairs(np.bincount(yRanks))
+    if xTies == totalPairs or yTies == totalPairs:
+        return np.nan
+
+    # Fields with many values are sorted and their discordant pairs counted by merges in O(n log n).  Fields with few
+    # values, e.g. indicators and counts, are counted from the table of counts of each pair of values in O(n).
+    xValues = int(xRanks.max()) + 1
+    yValues = int(yRanks.max()) + 1
+    if xValues * yValues > KENDALL_TABLE_CELLS_PER_RECORD * numberOfRecords:
+        return kendalltau(xRanks, yRanks).statistic
+
+    pairCounts = np.bincount(xRanks * yValues + yRanks, minlength=xValues * yValues).reshape(xValues, yValues)
+    jointTies = tiedPairs(pairCounts)
+    discordant = discordantPairs(pairCounts)
+    concordantMinusDiscordant = totalPairs - xTies - yTies + jointTies - 2 * discordant
+    return min(1.0, max(-1.0, concordantMinusDiscordant / np.sqrt(totalPairs - xTies) / np.sqrt(totalPairs - yTies)))
+
+
+# Number of pairs of records with a greater x and a smaller y from the table of counts of the values of x and y
+def discordantPairs(pairCounts):
+    # Records with a greater x and a smaller y than each cell
+    greaterX = np.cumsum(pairCounts[::-1], axis=0)[::-1]
+    greaterXSmallerY = np.cumsum(np.pad(greaterX[1:, :-1], ((0, 1), (1, 0))), axis=1)
+    return int((pairCounts * greaterXSmallerY).sum())
+
+
+# Number of pairs of records with the same value from the number of records of each value
+def tiedPairs(counts):
+    return int((counts * (counts - 1) // 2).sum())
+
+
+# Apply a function to blocks of pairs of fields with the ranks shared by a pool of processes
+def mapPairBlocks(function, ranks, pairs, workers=1):
+    numberOfBlocks = max(1, min(len(pairs), workers * PAIR_BLOCKS_PER_WORKER)) if workers > 1 else 1
+    pairBlocks = [pairs[block::numberOfBlocks] for block in range(numberOfBlocks)]
+    return [result for blockResults in mapSharedArrays(function, {'ranks': ranks}, pairBlocks, workers)
+            for result in blockResults]
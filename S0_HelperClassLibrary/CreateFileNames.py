@@ -1,12 +1,21 @@
+# Extension of each storage format.  Parquet keeps the field types and is the default between the pipeline stages,
+# JSON lines is kept for interchange.
+STORAGE_EXTENSIONS = {'parquet': 'parquet', 'jsonl': 'jsonl'}
+DEFAULT_STORAGE_FORMAT = 'parquet'
+
+
 def createInputFileName(inputPath, dsName, dsNameExtension):
     # Detail inputFile, outputFile, and outputResults strings
     inputFile = str(inputPath + dsName + '.' + dsNameExtension)
     print("Input file is: " + inputFile)
     return inputFile
 
-def createOutputFileName(inputPath, dsName, dsNameExtension, additionalDescriptor, conversion=1):
+def createOutputFileName(inputPath, dsName, dsNameExtension, additionalDescriptor, conversion=1, storageFormat=None):
+    # When a storage format is passed, the last part of the extension is replaced with the extension of the format
+    if storageFormat is not None:
+        dsNameExtension = replaceStorageExtension(dsNameExtension, storageFormat)
     if conversion == 1:
-        outputFile = str(inputPath + dsName + '.jsonl')
+        outputFile = str(inputPath + dsName + '.' + (STORAGE_EXTENSIONS[storageFormat] if storageFormat else 'jsonl'))
     elif conversion == 0:
         outputFile = str(inputPath + dsName + '.' + additionalDescriptor + '.' + dsNameExtension)
     print("Output file is: " + outputFile)
@@ -15,4 +24,41 @@ def createOutputFileName(inputPath, dsName, dsNameExtension, additionalDescripto
 def createOutputResultsName(dsName, additionalDescriptor):
     outputResults = 'Output/Output.' + dsName + '.' + additionalDescriptor + '.txt'
     print("Output results are found here: " + outputResults)
-    return outputResults
\ No newline at end of file
+    return outputResults
+
+def createStateFileName(dsName, additionalDescriptor):
+    # State kept between runs so that a new batch of records can be added to the results of a dataset
+    stateFile = 'Output/State.' + dsName + '.' + additionalDescriptor + '.pkl'
+    print("State is saved here: " + stateFile)
+    return stateFile
+
+def createRiskTablesFileName(dsName):
+    # Risk tables learned from a dataset and applied to other datasets
+    riskTablesFile = 'Output/RiskTables.' + dsName + '.json'
+    print("Risk tables are saved here: " + riskTablesFile)
+    return riskTablesFile
+
+def createFeatureCacheName(inputPath, dsName, dsNameExtension):
+    # Feature matrix cache next to its dataset.  Example: withFraudInd.parquet becomes withFraudInd.parquet.featureCache
+    featureCacheDirectory = str(inputPath + dsName + '.' + dsNameExtension + '.featureCache')
+    print("Feature cache is found here: " + featureCacheDirectory)
+    return featureCacheDirectory
+
+def replaceStorageExtension(dsNameExtension, storageFormat):
+    # Example: withKey.jsonl with parquet becomes withKey.parquet
+    if storageFormat not in STORAGE_EXTENSIONS:
+        raise ValueError("Storage format needs to be one of: " + ', '.join(STORAGE_EXTENSIONS))
+    extensionParts = dsNameExtension.split('.')
+    extensionParts[-1] = STORAGE_EXTENSIONS[storageFormat]
+    return '.'.join(extensionParts)
+
+def detectStorageFormat(fileName):
+    # The storage format is determined by the last part of the file name.  JSON lines files can end in txt or json.
+    extension = fileName.rsplit('.', 1)[-1].lower()
+    if extension in ('parquet', 'pq'):
+        return 'parquet'
+    elif extension in ('jsonl', 'json', 'txt'):
+        return 'jsonl'
+    elif extension == 'csv':
+        return 'csv'
+    raise ValueError("Data set needs to be parquet, jsonl, or csv: " + fileName)
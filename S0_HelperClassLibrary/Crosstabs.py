@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from S0_HelperClassLibrary.ParallelColumns import mapColumns
+
+# Label of the row that adds up the values of a column beyond the top N
+OTHER_VALUES_LABEL = 'All other values'
+
+
+# Cross frequencies of each column with a segment field, e.g. the target
+def segmentCrosstabs(transactionData, columns, segmentField, workers=1, topN=0):
+    """
+    Compute the cross frequency of each column with the segment field, with the counts of pd.crosstab(column, segment).
+
+    The segment field is factorized once and each column is factorized once.  The counts of a column are a single
+    np.bincount of the combined codes, column code * number of segments + segment code, instead of a groupby of the
+    column and the segment.  Records with an empty column or segment are not counted, as pd.crosstab.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The dataset.
+    columns : list
+        The fields to cross with the segment field, in the order of the results.
+    segmentField : str
+        The field of the segments.  Example: 'isFraud'
+    workers : int
+        The number of processes the columns are spread across.
+    topN : int
+        The number of most frequent values of each column that are kept, the other values are added up in 1 row.  All
+        values are kept when 0.
+
+    Return
+    _______
+    crosstabs : list
+        The cross frequency of each column as a DataFrame with a row for each value of the column and a column for each
+        segment.
+    """
+    (segmentCodes, segmentValues) = factorizeField(transactionData[segmentField])
+    segmentCodes = segmentCodes.astype('int8' if len(segmentValues) < 128 else 'int32')
+    return mapColumns(columnCrosstab, transactionData, columns, workers,
+                      args=(segmentCodes, segmentValues, segmentField, topN))
+
+
+# Codes of the values of a field in sorted order, empty values are -1
+def factorizeField(field):
+    (codes, values) = pd.factorize(field, sort=True)
+    return codes, pd.Index(values)
+
+
+# Cross frequency of 1 column with the codes of the segments
+def columnCrosstab(transactionData, column, segmentCodes, segmentValues, segmentField, topN=0):
+    (codes, values) = factorizeField(transactionData[column])
+    counted = (codes >= 0) & (segmentCodes >= 0)
+    counts = np.bincount(codes[counted].astype('int64') * len(segmentValues) + segmentCodes[counted],
+                         minlength=len(values) * len(segmentValues)).reshape(len(values), len(segmentValues))
+
+    # Values and segments only found with empty values are left out, as pd.crosstab
+    rows = counts.any(axis=1)
+    segments = counts.any(axis=0)
+    crosstab = pd.DataFrame(counts[rows][:, segments], index=values[rows].rename(column),
+                            columns=segmentValues[segments].rename(segmentField))
+    if 0 < topN < len(crosstab.index):
+        crosstab = topValuesCrosstab(crosstab, topN)
+    return crosstab
+
+
+# Keep the most frequent values of a cross frequency and add up the others in 1 row
+def topValuesCrosstab(crosstab, topN):
+    totals = crosstab.sum(axis=1).to_numpy()
+    order = np.argsort(-totals, kind='stable')
+    topValues = crosstab.iloc[np.sort(order[:topN])]
+    otherValues = crosstab.iloc[order[topN:]].sum(axis=0)
+    otherLabel = OTHER_VALUES_LABEL + ' (' + str(len(crosstab.index) - topN) + ')'
+    return pd.concat([topValues, otherValues.to_frame(otherLabel).T.rename_axis(crosstab.index.name)])
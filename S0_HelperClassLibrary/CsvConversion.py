@@ -0,0 +1,223 @@
+import io
+import os
+import time
+import resource
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from S0_HelperClassLibrary.CreateFileNames import detectStorageFormat
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA
+
+# Number of bytes of csv read and converted at a time
+CSV_BLOCK_SIZE = 64 * 2 ** 20
+# Fields kept as strings as pd.read_csv reads them, the dates are parsed later with the formats of the schema
+STRING_FIELDS = list(TRANSACTION_SCHEMA['dates'])
+# Number of records of each json lines write, the json strings of a whole block would take several times its size
+JSONL_CHUNK_RECORDS = 100000
+# Number of records of the previews of the csv and the converted dataset
+PREVIEW_RECORDS = 5
+
+
+# Read in a csv dataset one block of records at a time, parsed on multiple threads
+def readCsvBlocks(inputFile, blockSize=CSV_BLOCK_SIZE, stringFields=STRING_FIELDS, threads=0, fieldTypes=None):
+    """
+    Read in a csv dataset one block of records at a time as arrow tables.
+
+    Each block is about blockSize bytes of whole records, so only one block is held in memory at a time.  The records of
+    a block are parsed by the pyarrow csv reader on multiple threads.  Without fieldTypes, the types of the fields are
+    inferred from each block on its own, and fields that are empty in the whole block have the null type, so the types
+    of the blocks are unified with unifyCsvTypes before they are written to the same file.  With fieldTypes, e.g. the
+    unified types of all blocks, every block is parsed with these types.  Empty values are missing.  Records are
+    expected on 1 line each, values with new lines are not supported.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input csv dataset including path and extension.
+    blockSize : int
+        The number of bytes of each block.
+    stringFields : list
+        The fields kept as strings, e.g. dates parsed later with their format.
+    threads : int
+        The number of threads that parse a block.  All cores are used when 0.
+    fieldTypes : dict
+        The arrow type of each field.  The types are inferred from each block when None.
+
+    Return
+    _______
+    table : Table
+        Generator of the blocks of the dataset.
+    """
+    if threads > 0:
+        pa.set_cpu_count(threads)
+    with open(inputFile, 'rb') as csvFile:
+        header = csvFile.readline()
+        columnNames = pacsv.read_csv(io.BytesIO(header)).column_names
+        readOptions = pacsv.ReadOptions(column_names=columnNames, use_threads=threads != 1)
+        columnTypes = {field: pa.string() for field in stringFields if field in columnNames}
+        if fieldTypes is not None:
+            columnTypes = dict(fieldTypes)
+        convertOptions = pacsv.ConvertOptions(column_types=columnTypes, strings_can_be_null=True)
+
+        while True:
+            # The block is completed with the rest of its last record
+            block = csvFile.read(blockSize)
+            if not block:
+                break
+            block += csvFile.readline()
+            yield pacsv.read_csv(io.BytesIO(block), read_options=readOptions, convert_options=convertOptions)
+
+
+# Type of a field that has the types type1 and type2 in different blocks, as pd.read_csv reads the whole field
+def unifyCsvTypes(type1, type2):
+    """
+    Fields empty in a block take the type of the other block, integers with empty values are float64.  Integers and
+    floats are float64.  Other fields with different types in different blocks, e.g. numbers in one block and text in
+    another, are strings.
+    """
+    if type1 == type2:
+        return type1
+    elif pa.types.is_null(type1) or pa.types.is_null(type2):
+        otherType = type2 if pa.types.is_null(type1) else type1
+        return pa.float64() if pa.types.is_integer(otherType) else otherType
+    elif all(pa.types.is_integer(fieldType) or pa.types.is_floating(fieldType) for fieldType in [type1, type2]):
+        return pa.float64()
+    return pa.string()
+
+
+# Type of a field as it is written, fields that are empty in every block are float64 as pd.read_csv reads them
+def writtenCsvType(fieldType):
+    return pa.float64() if pa.types.is_null(fieldType) else fieldType
+
+
+# Convert a csv dataset to parquet or json lines one block at a time
+def convertCsv(inputFile, outputFile, blockSize=CSV_BLOCK_SIZE, threads=0):
+    """
+    Convert a csv dataset to parquet or json lines with only one block of records in memory at a time.  The storage
+    format is determined by the extension of the output file.
+
+    Parquet blocks are written as row groups straight from the arrow tables.  Json lines blocks are written as
+    writeDataset writes them, JSONL_CHUNK_RECORDS records at a time.  The types of the fields are unified across the
+    blocks with unifyCsvTypes, so they are the same as pd.read_csv of the whole file except that fields with numbers and
+    text are strings.  Blocks are written as they are read while the types of the later blocks can be cast to the types
+    of the blocks already written, e.g. integers after a block where the field is empty.  When a later block changes the
+    written type of a field, e.g. text after numbers, the types of the remaining blocks are inferred and the csv is
+    converted again with the types of all blocks.  The previews are the first records in the written types, so the
+    output is not read back.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input csv dataset including path and extension.
+    outputFile : str
+        The name of the output dataset including path and extension.
+    blockSize : int
+        The number of bytes of csv of each block.
+    threads : int
+        The number of threads that parse a block.  All cores are used when 0.
+
+    Return
+    _______
+    conversion : dict
+        The first records of the csv and of the converted dataset, the number of records, input MB, seconds, MB per
+        second, and peak memory of the process in MB.
+    """
+    storageFormat = detectStorageFormat(outputFile)
+    if storageFormat not in ['parquet', 'jsonl']:
+        raise ValueError("Output data set needs to be parquet or jsonl: " + outputFile)
+
+    conversionStart = time.perf_counter()
+    (fieldTypes, typesChanged, numberOfRecords, previewTable) = writeCsvBlocks(
+        readCsvBlocks(inputFile, blockSize, threads=threads), outputFile, storageFormat)
+    if typesChanged:
+        fieldTypes = {name: writtenCsvType(fieldType) for (name, fieldType) in fieldTypes.items()}
+        (fieldTypes, typesChanged, numberOfRecords, previewTable) = writeCsvBlocks(
+            readCsvBlocks(inputFile, blockSize, threads=threads, fieldTypes=fieldTypes), outputFile, storageFormat)
+    conversionSeconds = time.perf_counter() - conversionStart
+
+    # The first records of the csv with missing values as pd.read_csv reads them, and as they are read back from the
+    # output file
+    csvPreview = pd.DataFrame()
+    convertedPreview = csvPreview
+    if previewTable is not None:
+        convertedPreview = previewTable.to_pandas()
+        csvPreview = convertedPreview.where(convertedPreview.notna(), np.nan)
+        if storageFormat == 'jsonl' and len(convertedPreview.index):
+            convertedPreview = pd.read_json(io.StringIO(convertedPreview.to_json(orient="records", lines=True)),
+                                            lines=True, dtype=False)
+
+    inputMB = os.path.getsize(inputFile) / 2 ** 20
+    return {'csvPreview': csvPreview, 'convertedPreview': convertedPreview, 'records': numberOfRecords,
+            'inputMB': round(inputMB, 1), 'seconds': round(conversionSeconds, 3),
+            'MBPerSecond': round(inputMB / conversionSeconds, 1) if conversionSeconds > 0 else None,
+            'peakMB': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+# Write the blocks of a csv dataset while their types can be cast to the types of the blocks already written
+def writeCsvBlocks(tables, outputFile, storageFormat):
+    """
+    Write the blocks to parquet or json lines in the unified types of the blocks so far.  Once a block changes the
+    written type of a field, nothing more is written and the types of the remaining blocks are unified.
+
+    Parameters
+    __________
+    tables : iterable of Table
+        The blocks of the csv dataset.  Example: readCsvBlocks(inputFile)
+    outputFile : str
+        The name of the output dataset including path and extension.
+    storageFormat : str
+        The storage format of the output dataset, parquet or jsonl.
+
+    Return
+    _______
+    fieldTypes : dict
+        The unified arrow type of each field of all blocks.
+    typesChanged : bool
+        A block changed the written type of a field, so the output is incomplete.
+    numberOfRecords : int
+        The number of records written out.
+    previewTable : Table
+        The first records in the written types, None when the csv has no records.
+    """
+    fieldTypes = None
+    typesChanged = False
+    numberOfRecords = 0
+    previewTable = None
+    parquetWriter = None
+    jsonlOutput = open(outputFile, 'w') if storageFormat == 'jsonl' else None
+    try:
+        for table in tables:
+            blockTypes = {field.name: field.type for field in table.schema}
+            if fieldTypes is None:
+                fieldTypes = blockTypes
+            else:
+                unifiedTypes = {name: unifyCsvTypes(fieldTypes[name], blockTypes[name]) for name in fieldTypes}
+                typesChanged |= any(writtenCsvType(unifiedTypes[name]) != writtenCsvType(fieldTypes[name])
+                                    for name in fieldTypes)
+                fieldTypes = unifiedTypes
+            if typesChanged:
+                continue
+
+            table = table.cast(pa.schema([(name, writtenCsvType(fieldType)) for (name, fieldType)
+                                          in fieldTypes.items()]))
+            if previewTable is None:
+                previewTable = table.slice(0, PREVIEW_RECORDS)
+            if storageFormat == 'parquet':
+                if parquetWriter is None:
+                    parquetWriter = pq.ParquetWriter(outputFile, table.schema)
+                parquetWriter.write_table(table)
+            else:
+                for batch in table.to_batches(max_chunksize=JSONL_CHUNK_RECORDS):
+                    jsonlOutput.write(batch.to_pandas().to_json(orient="records", lines=True))
+            numberOfRecords += table.num_rows
+    finally:
+        if parquetWriter is not None:
+            parquetWriter.close()
+        if jsonlOutput is not None:
+            jsonlOutput.close()
+    if previewTable is None and storageFormat == 'parquet':
+        pd.DataFrame().to_parquet(outputFile, index=False)
+
+    return fieldTypes, typesChanged, numberOfRecords, previewTable
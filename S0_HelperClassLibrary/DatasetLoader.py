@@ -0,0 +1,165 @@
+import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+from S0_HelperClassLibrary.CreateFileNames import detectStorageFormat
+from S0_HelperClassLibrary.DatasetStorage import readDataset
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+# Types of the fields of the transactions dataset.  Fields that are not in a dataset are skipped.
+#   - categories: low cardinality strings stored once with integer codes
+#   - dates: date strings and their format.  Dates written to json lines as epoch milliseconds are also converted.
+#   - compactInts: small integers and the smallest integer type that holds them
+TRANSACTION_SCHEMA = {
+    'categories': ['merchantCategoryCode', 'transactionType', 'acqCountry'],
+    'dates': {'transactionDateTime': '%Y-%m-%dT%H:%M:%S',
+              'accountOpenDate': '%Y-%m-%d',
+              'dateOfLastAddressChange': '%Y-%m-%d',
+              'currentExpDate': '%m/%Y',
+              'transactionDateTimeDtType': None,
+              'accountOpenDateDtType': None,
+              'dateOfLastAddressChangeDtType': None,
+              'currentExpDateDtType': None,
+              'gTransactionDateTime': None,
+              'gAccountOpenDate': None,
+              'gDateOfLastAddressChange': None,
+              'gDateFirstFraud': None},
+    'compactInts': {'cardCVV': 'int16', 'enteredCVV': 'int16', 'cardLast4Digits': 'int16'},
+}
+
+
+# Read in a dataset and apply the schema while parsing
+@timedStep('read')
+def loadDataset(inputFile, columns=None, schema=TRANSACTION_SCHEMA, chunksize=10000):
+    """
+    Read in a csv, json lines, or parquet dataset with the types of the schema.
+
+    The storage format is determined by the extension of the file.  Only the requested columns are read.  Csv and json
+    lines files are read in chunks and each chunk is converted to the types of the schema before the chunks are
+    appended, so the full dataset is never held with string dates and categories.  The json parser holds every record
+    of a chunk as a dictionary, so a small chunksize keeps the peak memory close to the size of the converted dataset.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input dataset including path and extension.
+    columns : list
+        The fields to read in.  All fields are read in when None.
+    schema : dict
+        The types of the fields.  Example: TRANSACTION_SCHEMA
+    chunksize : int
+        The number of records in each chunk of json lines and csv files.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The dataset with the types of the schema.
+    """
+    # Parquet keeps the types, fields written before the schema existed are converted
+    if detectStorageFormat(inputFile) == 'parquet':
+        return applySchema(readDataset(inputFile, columns=columns), schema)
+
+    # Append converted chunks into 1 data frame
+    return concatChunks(list(loadDatasetChunks(inputFile, columns, schema, chunksize)))
+
+
+# Read in a dataset one chunk at a time and apply the schema to each chunk
+def loadDatasetChunks(inputFile, columns=None, schema=TRANSACTION_SCHEMA, chunksize=10000):
+    """
+    Read in a csv, json lines, or parquet dataset one chunk at a time with the types of the schema.
+
+    Only one chunk is held in memory at a time, so datasets larger than memory can be processed.  The categories of
+    each chunk only contain the values of the chunk.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input dataset including path and extension.
+    columns : list
+        The fields to read in.  All fields are read in when None.
+    schema : dict
+        The types of the fields.  Example: TRANSACTION_SCHEMA
+    chunksize : int
+        The number of records in each chunk.
+
+    Return
+    _______
+    chunk : DataFrame
+        Generator of the chunks of the dataset with the types of the schema.
+    """
+    storageFormat = detectStorageFormat(inputFile)
+
+    if storageFormat == 'parquet':
+        import pyarrow.parquet as pq
+        parquetFile = pq.ParquetFile(inputFile)
+        chunkedData = (batch.to_pandas() for batch in parquetFile.iter_batches(batch_size=chunksize, columns=columns))
+    elif storageFormat == 'jsonl':
+        chunkedData = pd.read_json(inputFile, lines=True, chunksize=chunksize)
+    elif storageFormat == 'csv':
+        chunkedData = pd.read_csv(inputFile, usecols=columns, chunksize=chunksize)
+
+    # Keep the requested fields and convert each chunk
+    for chunk in chunkedData:
+        if columns is not None and storageFormat == 'jsonl':
+            chunk = chunk[columns].copy()
+        yield applySchema(chunk, schema)
+
+
+# Convert the fields of a dataset to the types of the schema
+def applySchema(transactionData, schema=TRANSACTION_SCHEMA):
+    """
+    Convert the fields of a dataset to the types of the schema.  Fields that already have the type are unchanged.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The dataset to convert.
+    schema : dict
+        The types of the fields.  Example: TRANSACTION_SCHEMA
+
+    Return
+    _______
+    transactionData : DataFrame
+        The converted dataset.
+    """
+    for column in schema.get('categories', []):
+        if column in transactionData and not isinstance(transactionData[column].dtype, pd.CategoricalDtype):
+            transactionData[column] = transactionData[column].astype('category')
+
+    for column, dateFormat in schema.get('dates', {}).items():
+        if column in transactionData:
+            transactionData[column] = parseDates(transactionData[column], dateFormat)
+
+    for column, intType in schema.get('compactInts', {}).items():
+        if column in transactionData:
+            transactionData[column] = compactInts(transactionData[column], intType)
+
+    return transactionData
+
+
+# Convert an integer field to a smaller integer type when every value fits
+def compactInts(intField, intType):
+    if intField.dtype.kind not in 'iu' or intField.dtype == np.dtype(intType):
+        return intField
+    typeInfo = np.iinfo(intType)
+    if len(intField.index) == 0 or (intField.min() >= typeInfo.min and intField.max() <= typeInfo.max):
+        return intField.astype(intType)
+    return intField
+
+
+# Append converted chunks into 1 data frame and keep the category types
+@timedStep('concat')
+def concatChunks(convertedChunks):
+    if len(convertedChunks) == 0:
+        return pd.DataFrame()
+
+    # Chunks have their own categories, so all chunks are given the sorted union of the categories before appending
+    for column in convertedChunks[0]:
+        if isinstance(convertedChunks[0][column].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[column] for chunk in convertedChunks], ignore_order=True).categories
+            categoryType = pd.CategoricalDtype(categories.sort_values())
+            for chunk in convertedChunks:
+                chunk[column] = chunk[column].astype(categoryType)
+
+    return pd.concat(convertedChunks, ignore_index=True)
@@ -0,0 +1,118 @@
+import pandas as pd
+from S0_HelperClassLibrary.CreateFileNames import detectStorageFormat
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+# Read in a dataset based on the storage format of the file
+def readDataset(inputFile, columns=None, chunksize=100000):
+    """
+    Read in a parquet, json lines, or csv dataset.  The storage format is determined by the extension of the file.
+
+    Parquet files keep the date, boolean and category types of the fields and only the requested columns are read.
+    JSON lines and csv files are read with chunksize to reduce CPU needs and the requested columns are kept.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input dataset including path and extension.
+    columns : list
+        The fields to read in.  All fields are read in when None.
+    chunksize : int
+        The number of records in each chunk of json lines and csv files.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The dataset.
+    """
+    storageFormat = detectStorageFormat(inputFile)
+
+    if storageFormat == 'parquet':
+        return pd.read_parquet(inputFile, columns=columns)
+    elif storageFormat == 'jsonl':
+        chunkedData = pd.read_json(inputFile, lines=True, chunksize=chunksize)
+    elif storageFormat == 'csv':
+        chunkedData = pd.read_csv(inputFile, usecols=columns, chunksize=chunksize)
+
+    # Keep the requested fields of each chunk and append chunked data into 1 data frame
+    if columns is not None:
+        chunkedData = (chunk[columns] for chunk in chunkedData)
+    return pd.concat(chunkedData, ignore_index=True)
+
+
+# Write out a dataset based on the storage format of the file
+@timedStep('write')
+def writeDataset(transactionData, outputFile):
+    """
+    Write out a dataset as parquet or json lines.  The storage format is determined by the extension of the file.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The dataset to write out.
+    outputFile : str
+        The name of the output dataset including path and extension.
+    """
+    storageFormat = detectStorageFormat(outputFile)
+
+    if storageFormat == 'parquet':
+        transactionData.to_parquet(outputFile, index=False)
+    elif storageFormat == 'jsonl':
+        transactionData.to_json(outputFile, orient="records", lines=True)
+    else:
+        raise ValueError("Output data set needs to be parquet or jsonl: " + outputFile)
+
+    return
+
+
+# Write out a dataset one chunk at a time based on the storage format of the file
+@timedStep('write')
+def writeDatasetChunks(chunkedData, outputFile):
+    """
+    Write out a dataset as parquet or json lines one chunk at a time.  The storage format is determined by the
+    extension of the file.
+
+    Only one chunk is held in memory at a time.  The file has the same records as writeDataset of the appended chunks.
+    Each parquet chunk is converted to the types of the first chunk, so category fields need the same categories in
+    every chunk.
+
+    Parameters
+    __________
+    chunkedData : iterable
+        The chunks of the dataset in the order of the records.
+    outputFile : str
+        The name of the output dataset including path and extension.
+
+    Return
+    _______
+    numberOfRecords : int
+        The number of records written out.
+    """
+    storageFormat = detectStorageFormat(outputFile)
+    numberOfRecords = 0
+
+    if storageFormat == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        parquetWriter = None
+        for chunk in chunkedData:
+            schema = None if parquetWriter is None else parquetWriter.schema
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if parquetWriter is None:
+                parquetWriter = pq.ParquetWriter(outputFile, table.schema)
+            parquetWriter.write_table(table)
+            numberOfRecords += len(chunk.index)
+        if parquetWriter is None:
+            pd.DataFrame().to_parquet(outputFile, index=False)
+        else:
+            parquetWriter.close()
+    elif storageFormat == 'jsonl':
+        with open(outputFile, 'w') as output:
+            for chunk in chunkedData:
+                output.write(chunk.to_json(orient="records", lines=True))
+                numberOfRecords += len(chunk.index)
+        output.close()
+    else:
+        raise ValueError("Output data set needs to be parquet or jsonl: " + outputFile)
+
+    return numberOfRecords
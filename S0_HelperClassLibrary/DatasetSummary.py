@@ -1,3 +1,7 @@
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+@timedStep('report')
 def datasetShapeInfo(dsName, inputFile, outputResults):
     with open(outputResults, 'w') as output:
         print('Input file is: ' + inputFile, file=output)
@@ -13,6 +17,7 @@ def datasetShapeInfo(dsName, inputFile, outputResults):
     return
 
 
+@timedStep('report')
 def datasetSummary(dsName, inputFile, outputResults):
     with open(outputResults, 'w') as output:
         print('Input file is: ' + inputFile, file=output)
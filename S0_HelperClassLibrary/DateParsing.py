@@ -0,0 +1,142 @@
+import os
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+# Formats parsed by the ISO 8601 parser of numpy without looking for repeated values, e.g. transactionDateTime
+ISO_DATETIME_FORMATS = ['%Y-%m-%dT%H:%M:%S']
+# Directory of the parsed values of date fields shared by the stages
+DATE_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'MSDCodeRepoExample', 'DateCache')
+# Size of the cache above which the least recently used parsed values are evicted, as the budget of StageCache
+DATE_CACHE_BUDGET_BYTES = 2 ** 30
+# Largest share of distinct values of a field that is cached, fields of mostly unique values gain nothing from the cache
+DATE_CACHE_DISTINCT_SHARE = 0.5
+
+
+# Parse a date field once for each distinct value
+def parseDates(dateField, dateFormat=None, cacheDirectory=DATE_CACHE_DIRECTORY,
+               cacheBudgetBytes=DATE_CACHE_BUDGET_BYTES):
+    """
+    Parse a date field with a fixed format, falling back to inference on a mismatch.
+
+    Date fields such as accountOpenDate have a few thousand distinct values across all transactions, so the field is
+    factorized and only its distinct values are parsed, then mapped back to the records with the codes.  The parsed
+    distinct values are saved in the cache directory under a hash of the values and the format, so the stages that read
+    the same field reuse the parse.  Fields with more than DATE_CACHE_DISTINCT_SHARE distinct values are not cached, and
+    the least recently used values are evicted when the cache is over its budget.  Fields of ISO_DATETIME_FORMATS with a
+    value per second are parsed directly by the ISO 8601 parser of numpy.
+
+    Parameters
+    __________
+    dateField : Series
+        The dates as strings.  Dates already parsed are unchanged and numbers are epoch milliseconds, as dates are
+        written to json lines.
+    dateFormat : str
+        The format of the dates.  Example: '%Y-%m-%d'.  The format is inferred when None.
+    cacheDirectory : str
+        The directory of the parsed distinct values.  The values are not cached when None.
+    cacheBudgetBytes : int
+        The size of the cache above which the least recently used parsed values are evicted.
+
+    Return
+    _______
+    dates : Series
+        The parsed dates, empty values are NaT.
+    """
+    # Dates already parsed are unchanged, dates written to json lines are epoch milliseconds
+    if dateField.dtype.kind == 'M':
+        return dateField
+    elif dateField.dtype.kind in 'iuf':
+        return pd.to_datetime(dateField, unit='ms')
+
+    if dateFormat in ISO_DATETIME_FORMATS:
+        dates = parseIsoDates(dateField)
+        if dates is not None:
+            return dates
+
+    (codes, distinctValues) = pd.factorize(dateField)
+    if len(distinctValues) > DATE_CACHE_DISTINCT_SHARE * len(codes):
+        cacheDirectory = None
+    distinctDates = loadDistinctDates(distinctValues, dateFormat, cacheDirectory, cacheBudgetBytes)
+    return pd.Series(distinctDates.take(codes, allow_fill=True, fill_value=pd.NaT), index=dateField.index,
+                     name=dateField.name)
+
+
+# Parse ISO 8601 date-times with numpy, None when a value is empty or is not a plain date-time
+def parseIsoDates(dateField):
+    try:
+        with warnings.catch_warnings():
+            # Time zones are left to pandas
+            warnings.simplefilter('error', DeprecationWarning)
+            dates = dateField.to_numpy(dtype=object).astype('datetime64[s]')
+    except (ValueError, TypeError, DeprecationWarning):
+        return None
+    return pd.Series(dates.astype('datetime64[ns]'), index=dateField.index, name=dateField.name)
+
+
+# Parsed distinct values of a date field from the cache, parsed and saved when they are not cached
+def loadDistinctDates(distinctValues, dateFormat, cacheDirectory, budgetBytes=DATE_CACHE_BUDGET_BYTES):
+    if cacheDirectory is None:
+        return parseDistinctDates(distinctValues, dateFormat)
+
+    cacheFile = os.path.join(cacheDirectory, distinctValuesKey(distinctValues, dateFormat) + '.npy')
+    try:
+        distinctDates = pd.DatetimeIndex(np.load(cacheFile))
+        # The modification time of a file is the last time it was used, so the most recently used files are kept
+        os.utime(cacheFile)
+        return distinctDates
+    except (OSError, ValueError):
+        pass
+
+    distinctDates = parseDistinctDates(distinctValues, dateFormat)
+    # Dates with a time zone are not cached, the npy file only keeps the time
+    if distinctDates.tz is None:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cacheDirectory, suffix='.npy', delete=False) as temporaryFile:
+            np.save(temporaryFile, distinctDates.to_numpy(dtype='datetime64[ns]'))
+        os.replace(temporaryFile.name, cacheFile)
+        evictDistinctDates(cacheDirectory, budgetBytes)
+    return distinctDates
+
+
+# Remove the least recently used parsed values until the cache is under the budget
+def evictDistinctDates(cacheDirectory, budgetBytes):
+    cacheFiles = []
+    for fileName in os.listdir(cacheDirectory):
+        try:
+            fileStat = os.stat(os.path.join(cacheDirectory, fileName))
+        except OSError:
+            continue
+        cacheFiles.append((fileStat.st_mtime, fileStat.st_size, os.path.join(cacheDirectory, fileName)))
+
+    cacheSize = sum(size for (lastUsed, size, cacheFile) in cacheFiles)
+    for (lastUsed, size, cacheFile) in sorted(cacheFiles):
+        if cacheSize <= budgetBytes:
+            break
+        try:
+            os.remove(cacheFile)
+        except OSError:
+            pass
+        cacheSize -= size
+
+    return cacheSize
+
+
+# Parse the distinct values of a date field with the format, falling back to inference on a mismatch
+def parseDistinctDates(distinctValues, dateFormat):
+    # The fixed format avoids inferring the format of every value
+    if dateFormat is not None:
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(distinctValues, format=dateFormat))
+        except ValueError:
+            pass
+    return pd.DatetimeIndex(pd.to_datetime(distinctValues))
+
+
+# Content hash of the distinct values of a date field and their format
+def distinctValuesKey(distinctValues, dateFormat):
+    valuesHash = hashlib.sha256(str(dateFormat).encode())
+    valuesHash.update(pd.util.hash_array(np.asarray(distinctValues, dtype=object)).tobytes())
+    return valuesHash.hexdigest()
@@ -0,0 +1,225 @@
+import os
+import tempfile
+import itertools
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from S0_HelperClassLibrary.DatasetLoader import loadDatasetChunks, concatChunks
+from S0_HelperClassLibrary.DatasetStorage import writeDatasetChunks
+
+
+# Position of each record in the input dataset, the last sort key of the runs so equal keys keep the input order
+SORT_POSITION = 'gSortPosition'
+
+
+# Sort a dataset larger than memory with sorted runs spilled to disk
+def externalSortDataset(inputFile, outputFile, sortKeys, runSize=1000000, batchSize=10000, spillDirectory=None):
+    """
+    Sort a csv, json lines, or parquet dataset in ascending order of the sort keys without holding it in memory.
+
+    The dataset is read in chunks of batchSize records.  Every runSize records are sorted and spilled to a parquet file
+    in a temporary directory.  The runs are then read back batchSize records at a time and merged into the output
+    dataset, so at most about runSize records are held in memory.  The sort is stable: records with equal keys keep
+    the order of the input dataset, which is the order of DataFrame.sort_values on the same keys.  Empty values are
+    placed last.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input dataset including path and extension.
+    outputFile : str
+        The name of the output dataset including path and extension.  Parquet or json lines.
+    sortKeys : list
+        The fields to sort by, in order.  Example: ["customerId", "accountNumber"]
+    runSize : int
+        The number of records sorted in memory in each run.
+    batchSize : int
+        The number of records read in and merged at a time from the input and from each run.
+    spillDirectory : str
+        The directory of the runs.  The directory of the output dataset when None.
+
+    Return
+    _______
+    firstRecords : DataFrame
+        The first 5 records of the input dataset.
+    sortedFirstRecords : DataFrame
+        The first 5 records of the output dataset, indexed by their position in the input dataset.
+    numberOfRuns : int
+        The number of sorted runs spilled to disk.
+    """
+    if spillDirectory is None:
+        spillDirectory = os.path.dirname(os.path.abspath(outputFile))
+
+    with tempfile.TemporaryDirectory(dir=spillDirectory) as directory:
+        (runFiles, categoryTypes, firstRecords) = writeSortedRuns(inputFile, directory, sortKeys, runSize, batchSize)
+
+        # Keep the first sorted records for the report while the merged chunks are written out
+        sortedChunks = mergeSortedRuns(runFiles, sortKeys, categoryTypes, batchSize)
+        firstChunk = next(sortedChunks, None)
+        if firstChunk is None:
+            writeDatasetChunks([], outputFile)
+            return firstRecords, firstRecords, 0
+        writeDatasetChunks(itertools.chain([firstChunk], sortedChunks), outputFile)
+
+    return firstRecords, firstChunk.head(), len(runFiles)
+
+
+# Sort runs of records in memory and spill each run to a parquet file
+def writeSortedRuns(inputFile, directory, sortKeys, runSize, batchSize):
+    """
+    Read in a dataset in chunks, sort every runSize records by the sort keys and their position in the dataset, and
+    write each sorted run to a parquet file.
+
+    Parameters
+    __________
+    inputFile : str
+        The name of the input dataset including path and extension.
+    directory : str
+        The directory of the runs.
+    sortKeys : list
+        The fields to sort by, in order.
+    runSize : int
+        The number of records in each run.
+    batchSize : int
+        The number of records in each chunk read in and in each row group of the runs.
+
+    Return
+    _______
+    runFiles : list
+        The names of the run files in the order of the dataset.
+    categoryTypes : dict
+        The sorted categories of every category field over all runs.
+    firstRecords : DataFrame
+        The first 5 records of the dataset.
+    """
+    runFiles = []
+    categories = {}
+    firstRecords = None
+    position = 0
+    runChunks = []
+
+    for chunk in itertools.chain(loadDatasetChunks(inputFile, chunksize=min(batchSize, runSize)), [None]):
+        if chunk is not None:
+            if firstRecords is None:
+                firstRecords = chunk.head()
+            chunk[SORT_POSITION] = np.arange(position, position + len(chunk.index))
+            position += len(chunk.index)
+            for column in chunk:
+                if isinstance(chunk[column].dtype, pd.CategoricalDtype):
+                    categories[column] = categories.get(column, pd.Index([])).union(chunk[column].cat.categories)
+            runChunks.append(chunk)
+
+        # Sort and spill a full run, and the last records at the end of the dataset
+        numberOfRecords = sum(len(runChunk.index) for runChunk in runChunks)
+        if numberOfRecords > 0 and (numberOfRecords >= runSize or chunk is None):
+            runData = concatChunks(runChunks).sort_values(sortKeys + [SORT_POSITION])
+            runFile = os.path.join(directory, 'run' + str(len(runFiles)) + '.parquet')
+            pq.write_table(pa.Table.from_pandas(runData, preserve_index=False), runFile, row_group_size=batchSize)
+            runFiles.append(runFile)
+            runChunks = []
+
+    categoryTypes = {column: pd.CategoricalDtype(categories[column].sort_values()) for column in categories}
+    return runFiles, categoryTypes, firstRecords
+
+
+# Merge sorted runs into sorted chunks
+def mergeSortedRuns(runFiles, sortKeys, categoryTypes, batchSize):
+    """
+    Merge sorted run files into sorted chunks with a k-way merge of 1 batch of records from each run.
+
+    At each step the bound is the smallest last key of the batches of the runs that have more records to read.  Every
+    record up to the bound in every batch is smaller than all the records not yet read, so these records are sorted
+    and returned as the next chunk.  The run holding the bound is then empty and its next batch is read in.
+
+    Parameters
+    __________
+    runFiles : list
+        The names of the run files, each sorted by the sort keys and SORT_POSITION.
+    sortKeys : list
+        The fields to sort by, in order.
+    categoryTypes : dict
+        The categories of every category field, so the chunks can be appended.
+    batchSize : int
+        The number of records read in at a time from each run.
+
+    Return
+    _______
+    sortedChunk : DataFrame
+        Generator of the sorted chunks, indexed by the position of the records in the input dataset.
+    """
+    runBatches = [pq.ParquetFile(runFile).iter_batches(batch_size=batchSize) for runFile in runFiles]
+    buffers = [None] * len(runFiles)
+    keys = [None] * len(runFiles)
+    hasMore = [True] * len(runFiles)
+
+    while True:
+        # Read in the next batch of each run that is empty
+        for run in range(len(runFiles)):
+            if hasMore[run] and (buffers[run] is None or len(buffers[run].index) == 0):
+                batch = next(runBatches[run], None)
+                if batch is None:
+                    hasMore[run] = False
+                else:
+                    buffers[run] = batch.to_pandas()
+                    for column, categoryType in categoryTypes.items():
+                        buffers[run][column] = buffers[run][column].astype(categoryType)
+                    keys[run] = sortKeyValues(buffers[run], sortKeys + [SORT_POSITION])
+
+        active = [run for run in range(len(runFiles)) if buffers[run] is not None and len(buffers[run].index) > 0]
+        if len(active) == 0:
+            return
+
+        # Records up to the bound in each batch, every record of a batch when all runs have been read
+        bounds = [recordKey(keys[run], len(buffers[run].index) - 1) for run in active if hasMore[run]]
+        cuts = {}
+        for run in active:
+            if len(bounds) == 0:
+                cuts[run] = len(buffers[run].index)
+            else:
+                cuts[run] = countRecordsUpTo(keys[run], min(bounds))
+
+        sortedChunk = pd.concat([buffers[run].iloc[:cuts[run]] for run in active], ignore_index=True)
+        for run in active:
+            buffers[run] = buffers[run].iloc[cuts[run]:]
+            keys[run] = [values[cuts[run]:] for values in keys[run]]
+
+        sortedChunk = sortedChunk.sort_values(sortKeys + [SORT_POSITION]).set_index(SORT_POSITION)
+        sortedChunk.index.name = None
+        yield sortedChunk
+
+
+# Values of the sort keys that compare as sort_values orders them
+def sortKeyValues(runData, sortKeys):
+    # Each key is an indicator of empty values, which are placed last, and the values with empty values filled
+    values = []
+    for column in sortKeys:
+        field = runData[column]
+        isMissing = field.isna().to_numpy()
+        if isinstance(field.dtype, pd.CategoricalDtype):
+            fieldValues = field.cat.codes.to_numpy()
+        elif field.dtype.kind in 'mM':
+            fieldValues = field.to_numpy().view('i8')
+        elif field.dtype.kind in 'biuf':
+            fieldValues = np.where(isMissing, 0, field.to_numpy())
+        else:
+            fieldValues = field.fillna('').to_numpy()
+        values += [isMissing, fieldValues]
+    return values
+
+
+# Sort keys of 1 record
+def recordKey(values, record):
+    return tuple(fieldValues[record] for fieldValues in values)
+
+
+# Number of sorted records with sort keys up to the bound, a binary search of the records
+def countRecordsUpTo(values, bound):
+    (low, high) = (0, len(values[0]))
+    while low < high:
+        middle = (low + high) // 2
+        if bound < recordKey(values, middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
@@ -0,0 +1,151 @@
+import os
+import json
+import numpy as np
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA, loadDataset
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.ScalableTraining import MODEL_FEATURE_SETS
+from S0_HelperClassLibrary.StageCache import fileHash
+
+# Features of the cache, all features of the models of BuildSvmModel.py
+CACHE_FEATURES = MODEL_FEATURE_SETS['X8']
+FEATURES_FILE = 'features.npy'
+LABELS_FILE = 'labels.npy'
+MANIFEST_FILE = 'manifest.json'
+
+
+# Load the feature cache of a dataset, and build it first when it is missing or out of date
+def loadOrBuildFeatureCache(inputFile, cacheDirectory, features=CACHE_FEATURES, targetField='isFraud'):
+    """
+    Load the feature matrix and the labels of a dataset from the cache, memory mapped without a copy.
+
+    The cache is built from the dataset when there is no cache, or when the hash of the dataset, the features, or the
+    target field of the manifest are not the ones of the request.  The dataset is then read, the model features are
+    added as in BuildSvmModel.py, and the cache is written.
+
+    Parameters
+    __________
+    inputFile : str
+        The jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFraudInd dataset.
+    cacheDirectory : str
+        The directory of the cache files.
+    features : list
+        The features of the columns of the matrix in order.
+    targetField : str
+        The field of the labels.
+
+    Return
+    _______
+    featureMatrix : memmap
+        The float32 features of each record, read only.
+    labels : memmap
+        The labels of each record, read only.
+    manifest : dict
+        The features, the target field, the number of records, the scaler parameters of each feature, and the hash
+        of the dataset.
+    """
+    sourceHash = fileHash(inputFile)
+    manifest = readManifest(cacheDirectory)
+    if manifest is None or manifest['sourceHash'] != sourceHash or manifest['features'] != list(features) or \
+            manifest['targetField'] != targetField:
+        print("Building feature cache: " + cacheDirectory)
+        transactionData = addModelFeatures(loadDataset(inputFile, columns=modelFields(features) + [targetField]))
+        writeFeatureCache(transactionData, features, targetField, cacheDirectory, inputFile, sourceHash)
+    else:
+        print("Feature cache is up to date: " + cacheDirectory)
+
+    return loadFeatureCache(cacheDirectory)
+
+
+# Write the feature matrix, the labels, and the manifest of a dataset
+def writeFeatureCache(transactionData, features, targetField, cacheDirectory, sourceFile, sourceHash):
+    """
+    Write the features as a contiguous float32 matrix and the labels as npy files, and the manifest as json.
+
+    The scaler parameters of the manifest are the mean and the standard deviation of each feature over all records, as
+    preprocessing.scale.  The manifest is written last, so a cache is only used when all its files are written.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The records with the features and the target field.
+    features : list
+        The features of the columns of the matrix in order.
+    targetField : str
+        The field of the labels.
+    cacheDirectory : str
+        The directory of the cache files.
+    sourceFile : str
+        The dataset of the records.
+    sourceHash : str
+        The hash of the dataset from fileHash.
+
+    Return
+    _______
+    manifest : dict
+        The manifest of the cache.
+    """
+    os.makedirs(cacheDirectory, exist_ok=True)
+    manifestFile = os.path.join(cacheDirectory, MANIFEST_FILE)
+    if os.path.exists(manifestFile):
+        os.remove(manifestFile)
+
+    featureMatrix = np.ascontiguousarray(transactionData[features].to_numpy(dtype='float32'))
+    np.save(os.path.join(cacheDirectory, FEATURES_FILE), featureMatrix)
+    np.save(os.path.join(cacheDirectory, LABELS_FILE), transactionData[targetField].to_numpy(dtype=bool))
+
+    # Features without variance are not scaled, as preprocessing.scale
+    mean = featureMatrix.mean(axis=0, dtype='float64')
+    scale = featureMatrix.std(axis=0, dtype='float64')
+    scale[scale == 0] = 1
+    manifest = {'features': list(features), 'targetField': targetField, 'numberOfRecords': len(featureMatrix),
+                'dtype': 'float32', 'scalerMean': mean.tolist(), 'scalerScale': scale.tolist(),
+                'sourceFile': sourceFile, 'sourceHash': sourceHash}
+    with open(manifestFile, 'w') as output:
+        json.dump(manifest, output, indent=1)
+    output.close()
+
+    return manifest
+
+
+# Memory map the feature matrix and the labels of the cache
+def loadFeatureCache(cacheDirectory):
+    featureMatrix = np.load(os.path.join(cacheDirectory, FEATURES_FILE), mmap_mode='r')
+    labels = np.load(os.path.join(cacheDirectory, LABELS_FILE), mmap_mode='r')
+    return featureMatrix, labels, readManifest(cacheDirectory)
+
+
+def readManifest(cacheDirectory):
+    manifestFile = os.path.join(cacheDirectory, MANIFEST_FILE)
+    if not os.path.exists(manifestFile):
+        return None
+    with open(manifestFile) as manifestInput:
+        return json.load(manifestInput)
+
+
+# Standardize the columns of features of the matrix with the scaler parameters of the manifest
+def scaleFeatures(featureMatrix, manifest, features):
+    columns = [manifest['features'].index(feature) for feature in features]
+    mean = np.array(manifest['scalerMean'])[columns]
+    scale = np.array(manifest['scalerScale'])[columns]
+    return (featureMatrix[:, columns] - mean) / scale
+
+
+# Features of the models that are computed from the fields of the dataset, as BuildSvmModel.py
+def addModelFeatures(transactionData):
+    if 'gMerchantCategoryCodeRiskTable' in transactionData:
+        transactionData['gMCCRiskTable'] = transactionData['gMerchantCategoryCodeRiskTable'].replace(np.nan, 1)
+    if 'transactionDateTime' in transactionData:
+        transactionData['gTransactionHour'] = parseDates(transactionData['transactionDateTime'],
+                                                      TRANSACTION_SCHEMA['dates']['transactionDateTime']).dt.hour
+
+    return transactionData
+
+
+# Fields of the dataset needed for the features
+def modelFields(features):
+    fields = [feature for feature in features if feature not in ('gMCCRiskTable', 'gTransactionHour')]
+    if 'gMCCRiskTable' in features:
+        fields.append('gMerchantCategoryCodeRiskTable')
+    if 'gTransactionHour' in features:
+        fields.append('transactionDateTime')
+    return fields
@@ -0,0 +1,129 @@
+import json
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+
+
+# Compute the bin counts of a field in 1 pass
+def computeHistogram(field, bins=10, weights=None, color=None, label=None):
+    """
+    Compute the bin counts of a field as matplotlib hist does, so a plot can be drawn from the counts only.
+
+    Numeric fields are counted with np.histogram in bins of equal width between the minimum and maximum.  Dates are
+    counted the same way in matplotlib date numbers.  Strings, categories, and booleans are counted with np.bincount
+    of their codes, in order of first appearance as matplotlib places them on the axis.  Empty values are not counted.
+    With weights, each value is counted with its weight, e.g. values and their frequencies.
+
+    Parameters
+    __________
+    field : Series
+        The values to count.
+    bins : int
+        The number of bins.
+    weights : array
+        The weight of each value.  Each value is counted once when None.
+    color : str
+        The color of the bars.  Example: 'b'
+    label : str
+        The label of the bars in the legend.
+
+    Return
+    _______
+    series : dict
+        The kind of field, the bin edges or the categories, the counts, and the style of the bars.
+    """
+    isValid = field.notna().to_numpy()
+    field = field[isValid]
+    if weights is not None:
+        weights = np.asarray(weights)[isValid]
+    series = {'bins': bins, 'color': color, 'label': label}
+
+    if field.dtype.kind in 'iuf' and not isinstance(field.dtype, pd.CategoricalDtype):
+        counts, edges = np.histogram(field.to_numpy(), bins=bins, weights=weights)
+        series.update({'kind': 'numeric', 'edges': edges.tolist(), 'counts': counts.tolist()})
+    elif field.dtype.kind == 'M':
+        counts, edges = np.histogram(mdates.date2num(field.to_numpy()), bins=bins, weights=weights)
+        series.update({'kind': 'date', 'edges': edges.tolist(), 'counts': counts.tolist()})
+    else:
+        codes, categories = pd.factorize(field.astype('str') if field.dtype == 'bool' else field.to_numpy(dtype=object))
+        counts = np.bincount(codes, weights=weights, minlength=len(categories))
+        series.update({'kind': 'categorical', 'categories': categories.tolist(), 'counts': counts.tolist()})
+    return series
+
+
+# Draw a histogram from bin counts, cache the counts, and save the plot
+def plotHistogram(series, plotFile, title, xlabel="Value", ylabel="Frequency", rotateTicks=False, legend=False):
+    """
+    Save the bin counts next to the plot as a json file and draw the plot from the counts.  The plot can be drawn again
+    or restyled from the json file with renderHistogram without reading the dataset.
+
+    Parameters
+    __________
+    series : list
+        The bin counts of each set of bars, drawn in order.  Example: [computeHistogram(transactionData[column])]
+    plotFile : str
+        The name of the png file including path.  The counts are saved with the extension json.
+    title : str
+        The title of the plot.
+    xlabel : str
+        The label of the x axis.
+    ylabel : str
+        The label of the y axis.
+    rotateTicks : bool
+        Rotate the labels of the x axis.
+    legend : bool
+        Show the labels of the bars in a legend.
+
+    Return
+    _______
+    histogram : dict
+        The bin counts and style of the plot.
+    """
+    histogram = {'series': series, 'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'rotateTicks': rotateTicks,
+                 'legend': legend}
+    saveHistogram(histogram, histogramFileName(plotFile))
+    renderHistogram(histogram, plotFile)
+    return histogram
+
+
+# Draw a histogram from bin counts and save the plot
+def renderHistogram(histogram, plotFile):
+    for series in histogram['series']:
+        style = {key: series[key] for key in ['color', 'label'] if series.get(key) is not None}
+        if series['kind'] == 'categorical':
+            plt.hist(series['categories'], bins=series['bins'], weights=series['counts'], **style)
+        else:
+            edges = np.array(series['edges'])
+            plt.hist(edges[:-1], bins=edges, weights=series['counts'], **style)
+            if series['kind'] == 'date':
+                plt.gca().xaxis_date()
+    plt.title(histogram['title'])
+    plt.xlabel(histogram['xlabel'])
+    if histogram['rotateTicks']:
+        plt.xticks(rotation='vertical')
+    plt.ylabel(histogram['ylabel'])
+    if histogram['legend']:
+        plt.legend()
+    plt.savefig(plotFile)
+    plt.clf()
+
+    return
+
+
+def saveHistogram(histogram, histogramFile):
+    with open(histogramFile, 'w') as output:
+        json.dump(histogram, output)
+    output.close()
+
+    return
+
+
+def loadHistogram(histogramFile):
+    with open(histogramFile) as histogramInput:
+        return json.load(histogramInput)
+
+
+# Name of the bin counts of a plot: Output/Histogram.transactionAmount.10bins.png -> .json
+def histogramFileName(plotFile):
+    return plotFile.rsplit('.', 1)[0] + '.json'
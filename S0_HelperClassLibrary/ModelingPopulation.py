@@ -0,0 +1,214 @@
+import numpy as np
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+# Exclusions from modeling in order of priority and the value of transactions that are kept
+EXCLUSIONS = ['1 - Not US Issuer', '2 - Duplicate Transaction', '3 - Reversal']
+NOT_EXCLUDED = '0 - Not excluded'
+
+
+# Exclude transactions, add the fraud customer fields, and select 1 transaction for each customer with column operations
+@timedStep()
+def selectModelingPopulation(transactionData, seed=0):
+    """
+    Add the exclusions from modeling, the first fraud fields, and a random number to a dataset, and select one
+    transaction for each customer.
+
+    Transactions are excluded when they are not from a US issuer, when they are duplicates, or when they are reversals.
+    The retained transactions are ordered by descending customer id, fraud indicator, and transaction date-time.  In
+    this order the first record of each customer is found by comparing each customer id with the one before it, so the
+    first fraud fields of every customer are taken from its first record without looping over the records:
+        - gIndFraudCustomer: the customer has a retained fraud transaction
+        - gDateFirstFraud: the date-time of the latest fraud transaction of a fraud customer
+        - gIndFirstFraud: the transaction is the first record of a fraud customer
+    The transaction of a fraud customer with gIndFirstFraud is selected.  For other customers, the transaction with
+    the highest gRandomNumber is selected, the first one in case of a tie.  The random numbers are drawn in the order
+    of the records with the seed, so the selection is reproducible.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Transactions with customerId, isFraud, transactionDateTime, acqCountry, transactionType, and
+        gIndDuplicateTransaction.  gExclusions is added to the dataset.
+    seed : int
+        The seed of the random number generator.
+
+    Return
+    _______
+    dataSorted : DataFrame
+        The retained transactions in order with gExclusions, gDateFirstFraud, gIndFraudCustomer, gIndFirstFraud, and
+        gRandomNumber.
+    dataFiltered : DataFrame
+        The selected transaction of each customer with gSelectedObservation.
+    """
+    # Identify transactions to be excluded from modeling, the first exclusion that applies is kept
+    acqCountry = transactionData['acqCountry'].to_numpy(dtype=object)
+    indDuplicateTransaction = transactionData['gIndDuplicateTransaction'].to_numpy(dtype=object)
+    transactionType = transactionData['transactionType'].to_numpy(dtype=object)
+    transactionData['gExclusions'] = np.select([acqCountry != 'US', indDuplicateTransaction == 'True',
+                                                transactionType == 'REVERSAL'], EXCLUSIONS, NOT_EXCLUDED).astype(object)
+
+    # Sort retained data with descending customerId, isFraud, transactionDateTime
+    exclusionsRemoved = transactionData[transactionData['gExclusions'] == NOT_EXCLUDED]
+    dataSorted = exclusionsRemoved.sort_values(["customerId", "isFraud", "transactionDateTime"], ascending=False)
+
+    customerId = dataSorted['customerId'].to_numpy()
+    isFraud = dataSorted['isFraud'].to_numpy(dtype=bool)
+    transactionDateTime = dataSorted['transactionDateTime'].to_numpy(dtype='datetime64[ns]')
+    numberOfRecords = len(customerId)
+
+    # Identify the first record of every customer, and the customer of every record
+    firstOfCustomer = np.ones(numberOfRecords, dtype=bool)
+    firstOfCustomer[1:] = customerId[1:] != customerId[:-1]
+    customerStart = np.flatnonzero(firstOfCustomer)
+    customerNumber = np.cumsum(firstOfCustomer) - 1
+
+    # Fraud is sorted first, so a customer with fraud has a fraud first record with the latest fraud date-time
+    fraudCustomer = isFraud[customerStart]
+    indFraudCustomer = fraudCustomer[customerNumber]
+    dateFirstFraud = np.where(indFraudCustomer, transactionDateTime[customerStart][customerNumber],
+                              np.datetime64('NaT'))
+
+    # As in the original loop, the flag is set on the first record of a fraud customer, cleared on the other records
+    # of a customer, and the first record of a customer without fraud keeps the flag of the record before it
+    setsFlag = ~firstOfCustomer | isFraud
+    lastSetter = np.maximum.accumulate(np.where(setsFlag, np.arange(numberOfRecords), -1))
+    indFirstFraud = np.where(lastSetter >= 0, (firstOfCustomer & isFraud)[np.maximum(lastSetter, 0)], False)
+
+    # Add fields to the dataframe, g fields are generated
+    dataSorted['gDateFirstFraud'] = dateFirstFraud
+    dataSorted['gIndFraudCustomer'] = indFraudCustomer.astype('int64')
+    dataSorted['gIndFirstFraud'] = indFirstFraud.astype('int64')
+    randomNumber = np.random.RandomState(seed).randint(0, 10000, numberOfRecords)
+    dataSorted['gRandomNumber'] = randomNumber
+
+    # Select the first record of fraud customers, and the first record with the highest random number of the others
+    selectedObservation = np.zeros(numberOfRecords, dtype='int64')
+    if numberOfRecords > 0:
+        highestRandomNumber = np.maximum.reduceat(randomNumber, customerStart)
+        candidates = np.where(randomNumber == highestRandomNumber[customerNumber], np.arange(numberOfRecords),
+                              numberOfRecords)
+        firstCandidate = np.minimum.reduceat(candidates, customerStart)
+        selectedObservation[np.where(fraudCustomer, customerStart, firstCandidate)] = 1
+
+    # Retain selected observations, the records stay in descending customer id
+    dataFiltered = dataSorted[selectedObservation == 1].copy()
+    dataFiltered['gSelectedObservation'] = selectedObservation[selectedObservation == 1]
+
+    return dataSorted, dataFiltered
+
+
+# Exclude transactions, add the fraud customer fields, and select 1 transaction for each customer with iterrows
+def selectModelingPopulationIterrows(transactionData, seed=0):
+    """
+    Reference implementation of selectModelingPopulation with the original loops over the records and 2 sorts.  It is
+    kept to validate and benchmark the vectorized implementation.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Transactions with customerId, isFraud, transactionDateTime, acqCountry, transactionType, and
+        gIndDuplicateTransaction.  gExclusions is added to the dataset.
+    seed : int
+        The seed of the random number generator.
+
+    Return
+    _______
+    dataSorted : DataFrame
+        The retained transactions in order with gExclusions, gDateFirstFraud, gIndFraudCustomer, gIndFirstFraud, and
+        gRandomNumber.
+    dataFiltered : DataFrame
+        The selected transaction of each customer with gSelectedObservation.
+    """
+    exclusionsList = []
+    # Identify transactions to be excluded from modeling
+    for index, row in transactionData.iterrows():
+        exclusions = '0 - Not excluded'
+        if row['acqCountry'] != 'US':
+            exclusions = '1 - Not US Issuer'
+        elif row['gIndDuplicateTransaction'] == 'True':
+            exclusions = '2 - Duplicate Transaction'
+        elif row['transactionType'] == 'REVERSAL':
+            exclusions = '3 - Reversal'
+
+        exclusionsList.append(exclusions)
+
+    transactionData['gExclusions'] = exclusionsList
+
+    # Removed excluded records from further processing
+    exclusionsRemoved = transactionData[transactionData['gExclusions'] == '0 - Not excluded']
+
+    # Sort data with descending customerId, isFraud, transactionDateTime
+    dataSorted = exclusionsRemoved.sort_values(["customerId", "isFraud", "transactionDateTime"], ascending=False)
+
+    # Identify first fraud for customer and tag which customers have a fraud
+    # Initialize lists and fields
+    dateFirstFraudList = []
+    indFraudCustomerList = []
+    indFirstFraudList = []
+    previousCustomerId = 0
+    firstFraud = 0
+
+    for index, row in dataSorted.iterrows():
+        # if customer id is new, then set previous to 0
+        if row['customerId'] != previousCustomerId:
+            previousCustomerId = row['customerId']
+            # No date of first fraud is empty so that the field has a single type in parquet
+            indFraudCustomer = 0
+            dateFirstFraud = None
+            previousIndFraudCustomer = 0
+            previousDateFirstFraud = None
+
+            # if transaction is fraud, the set customer and first fraud fields
+            if row['isFraud']:
+                indFraudCustomer = 1
+                previousIndFraudCustomer = 1
+
+                dateFirstFraud = row['transactionDateTime']
+                previousDateFirstFraud = dateFirstFraud
+
+                firstFraud = 1
+        else:
+            indFraudCustomer = previousIndFraudCustomer
+            dateFirstFraud = previousDateFirstFraud
+            firstFraud = 0
+
+            if row['isFraud'] and indFraudCustomer == 0:
+                print("Check sort")
+
+        # Append data to lists
+        dateFirstFraudList.append(dateFirstFraud)
+        indFraudCustomerList.append(indFraudCustomer)
+        indFirstFraudList.append(firstFraud)
+
+    # Add lists to the dataframe
+    dataSorted['gDateFirstFraud'] = dateFirstFraudList
+    dataSorted['gIndFraudCustomer'] = indFraudCustomerList
+    dataSorted['gIndFirstFraud'] = indFirstFraudList
+    dataSorted['gRandomNumber'] = np.random.RandomState(seed).randint(0, 10000, len(dataSorted.index))
+
+    # Sort data with descending customerId, isFraud, transactionDateTime
+    dataSortedByRandomNumber = dataSorted.sort_values(["customerId", "gRandomNumber"], ascending=False)
+
+    # Randomly select transaction to be used for each customer if non-fraud
+    # Select first fraud transaction for customers with fraud
+    selectedObservationList = []
+    previousCustomerId = 0
+    for index, row in dataSortedByRandomNumber.iterrows():
+        # If new customer and not a fraud customer, take the highest random value
+        if row['customerId'] != previousCustomerId and row['gIndFraudCustomer'] == 0:
+            previousCustomerId = row['customerId']
+            selectedObservation = 1
+        # If previous customer and not a fraud customer, take the highest random value
+        elif row['gIndFraudCustomer'] == 1 and row['gIndFirstFraud'] == 1:
+            selectedObservation = 1
+        else:
+            selectedObservation = 0
+
+        selectedObservationList.append(selectedObservation)
+
+    # Retain selected observations
+    dataSortedByRandomNumber['gSelectedObservation'] = selectedObservationList
+    dataFiltered = dataSortedByRandomNumber[dataSortedByRandomNumber['gSelectedObservation'] == 1]
+
+    return dataSorted, dataFiltered
@@ -0,0 +1,190 @@
+import os
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+# Apply a function to each field of a dataset with a pool of processes
+def mapColumns(function, transactionData, columns, workers=1, sharedColumns=(), args=()):
+    """
+    Apply function(transactionData, column, *args) to each column and return the results in the order of the columns.
+
+    With more than 1 worker the fields are written once, uncompressed, to an arrow file in shared memory (/dev/shm when
+    available).  Each worker memory maps the file and converts only the fields of its task, so the dataset is not
+    pickled for each task.  The results are returned in the order of the columns whatever the order in which the tasks
+    finish, so output written from the results is the same as with 1 worker.
+
+    The workers are forked, so the function can be defined in the calling script.
+
+    Parameters
+    __________
+    function : function
+        The function applied to each column.  It receives a data frame with the column and the shared columns.
+    transactionData : DataFrame
+        The dataset.
+    columns : list
+        The fields to apply the function to, in the order of the results.
+    workers : int
+        The number of processes.  The function is applied in this process when 1.
+    sharedColumns : list
+        The fields that every task needs in addition to its column.  Example: ['isFraud']
+    args : tuple
+        The additional arguments of the function.
+
+    Return
+    _______
+    results : list
+        The result of the function for each column.
+    """
+    if workers <= 1:
+        return [function(transactionData, column, *args) for column in columns]
+
+    # Write the fields once to shared memory
+    fields = list(columns) + [column for column in sharedColumns if column not in columns]
+    sharedDirectory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(dir=sharedDirectory) as directory:
+        sharedFile = os.path.join(directory, 'columns.arrow')
+        feather.write_feather(pa.Table.from_pandas(transactionData[fields], preserve_index=False), sharedFile,
+                              compression='uncompressed')
+
+        # One column per task, the results are in the order of the tasks
+        tasks = [(function, sharedFile, [column] + [field for field in sharedColumns if field != column], column, args)
+                 for column in columns]
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            return pool.starmap(applyToSharedColumns, tasks, chunksize=1)
+
+
+# Read the fields of a task from the shared file and apply the function
+def applyToSharedColumns(function, sharedFile, fields, column, args):
+    transactionData = feather.read_table(sharedFile, columns=fields, memory_map=True).to_pandas()
+    return function(transactionData, column, *args)
+
+
+# Name of the partition of each record in the shared file
+PARTITION_FIELD = 'gPartition'
+
+
+# Apply a function to each hash partition of the records of a dataset with a pool of processes
+def mapPartitions(function, transactionData, partitionKey, partitions, workers=1, columns=None, args=()):
+    """
+    Apply function(partitionData, *args) to each partition of the records and return the results in the order of the
+    partitions.
+
+    The records are assigned to partitions by a hash of the partition key, so all the records with the same key, e.g.
+    a customer, are in the same partition.  The records of a partition keep their order in the dataset and are indexed
+    by their position in the dataset, so the results can be put back in place.  With more than 1 worker the fields are
+    written once to shared memory as in mapColumns and each worker converts only the records of its partition.
+
+    Parameters
+    __________
+    function : function
+        The function applied to each partition.  It receives a data frame with the records of the partition.
+    transactionData : DataFrame
+        The dataset.
+    partitionKey : str
+        The field whose hash gives the partition of each record.  Example: 'customerId'
+    partitions : int
+        The number of partitions.
+    workers : int
+        The number of processes.  The function is applied in this process when 1.
+    columns : list
+        The fields the function needs.  All fields when None.
+    args : tuple
+        The additional arguments of the function.
+
+    Return
+    _______
+    results : list
+        The result of the function for each partition.
+    """
+    fields = list(transactionData.columns) if columns is None else list(columns)
+    partitionIds = hashPartitions(transactionData[partitionKey], partitions)
+
+    if workers <= 1:
+        results = []
+        for partition in range(partitions):
+            rows = np.flatnonzero(partitionIds == partition)
+            partitionData = transactionData[fields].iloc[rows]
+            partitionData.index = rows
+            results.append(function(partitionData, *args))
+        return results
+
+    # Write the fields and the partition of each record once to shared memory
+    sharedDirectory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(dir=sharedDirectory) as directory:
+        sharedFile = os.path.join(directory, 'partitions.arrow')
+        sharedTable = pa.Table.from_pandas(transactionData[fields], preserve_index=False)
+        feather.write_feather(sharedTable.append_column(PARTITION_FIELD, pa.array(partitionIds)), sharedFile,
+                              compression='uncompressed')
+        del sharedTable
+
+        # One partition per task, the results are in the order of the tasks
+        tasks = [(function, sharedFile, partition, args) for partition in range(partitions)]
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            return pool.starmap(applyToSharedPartition, tasks, chunksize=1)
+
+
+# Read the records of a partition from the shared file and apply the function
+def applyToSharedPartition(function, sharedFile, partition, args):
+    sharedTable = feather.read_table(sharedFile, memory_map=True)
+    rows = np.flatnonzero(sharedTable.column(PARTITION_FIELD).to_numpy() == partition)
+    partitionData = sharedTable.drop([PARTITION_FIELD]).take(rows).to_pandas()
+    partitionData.index = rows
+    return function(partitionData, *args)
+
+
+# Partition of each record from the hash of a field
+def hashPartitions(field, partitions):
+    return (pd.util.hash_array(field.to_numpy()) % partitions).astype('int32')
+
+
+# Apply a function to each task with arrays shared read only by a pool of processes
+def mapSharedArrays(function, arrays, tasks, workers=1, args=()):
+    """
+    Apply function(arrays, task, *args) to each task and return the results in the order of the tasks.
+
+    With more than 1 worker each array is written once to a npy file in shared memory (/dev/shm when available), and
+    each worker memory maps the files read only, so the arrays are neither pickled for each task nor copied in each
+    worker.
+
+    Parameters
+    __________
+    function : function
+        The function applied to each task.  It receives a dict with the arrays by name.
+    arrays : dict
+        The numpy arrays shared by all tasks by name.  Example: {'X_train': X_train, 'y_train': y_train}
+    tasks : list
+        The argument of the function that differs between tasks.
+    workers : int
+        The number of processes.  The function is applied in this process when 1.
+    args : tuple
+        The additional arguments of the function.
+
+    Return
+    _______
+    results : list
+        The result of the function for each task.
+    """
+    if workers <= 1:
+        return [function(arrays, task, *args) for task in tasks]
+
+    # Write the arrays once to shared memory
+    sharedDirectory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(dir=sharedDirectory) as directory:
+        sharedFiles = {}
+        for (name, array) in arrays.items():
+            sharedFiles[name] = os.path.join(directory, name + '.npy')
+            np.save(sharedFiles[name], array)
+
+        tasks = [(function, sharedFiles, task, args) for task in tasks]
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            return pool.starmap(applyToSharedArrays, tasks, chunksize=1)
+
+
+# Memory map the arrays of the shared files and apply the function
+def applyToSharedArrays(function, sharedFiles, task, args):
+    arrays = {name: np.load(sharedFile, mmap_mode='r') for (name, sharedFile) in sharedFiles.items()}
+    return function(arrays, task, *args)
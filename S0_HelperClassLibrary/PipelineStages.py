@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+from S0_HelperClassLibrary.TagDuplicates import tagDuplicateTransactions
+from S0_HelperClassLibrary.RiskTables import applyRiskTables
+from S0_HelperClassLibrary.TransactionKeys import KEY_COLUMNS, transactionKeys
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+# Sort keys of SortData.py in order
+SORT_KEYS = ["customerId", "accountNumber", "transactionAmount", "transactionDateTime"]
+# Fields with 100% missing values dropped by AddKeyIndsAndDropFields.py.  These fields were identified using the
+# GenerateFrequenciesHistograms_COPY.py script
+DROPPED_FIELDS = ['echoBuffer', 'merchantCity', 'merchantState', 'merchantZip', 'posOnPremises', 'recurringAuthInd']
+
+
+# Read in a csv dataset as ConvertCsvToJsonl.py
+@timedStep('read')
+def readCsvData(inputFile, chunksize=100000):
+    # Read in data with chunksize to reduce CPU needs and append chunked data into 1 data frame
+    return pd.concat(pd.read_csv(inputFile, chunksize=chunksize), ignore_index=True)
+
+
+# Add the transaction key and the indicators of AddKeyIndsAndDropFields.py and drop the empty fields
+@timedStep()
+def addKeyAndIndicators(transactionData):
+    """
+    Add the date typed copies of the date fields, the gTransactionKey and gTransactionKeyTime integer primary key of each
+    transaction, and the indicators of matching fields, and drop the fields with 100% missing values.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The transactions with the types of the transaction schema.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The transactions with the key and the indicators.
+    """
+    # Change date fields to have a type of date for easier processing later
+    # Note: Date fields of the transaction schema are already parsed when read in
+    for column in transactionData:
+        if (transactionData[column].dtype == 'object' or transactionData[column].dtype.kind == 'M') and \
+                ("Date" in column or "date" in column):
+            transactionData[column + "DtType"] = parseDates(transactionData[column],
+                                                            TRANSACTION_SCHEMA['dates'].get(column))
+
+    # Integer key of each transaction packed from customerId, accountNumber, and transactionDateTime
+    keys = transactionKeys(transactionData)
+    for column in KEY_COLUMNS:
+        transactionData[column] = keys[column]
+
+    # Add indicator when transaction information matches
+    transactionData['gIndCustIdEqAcctNum'] = np.where(transactionData['customerId'] == transactionData['accountNumber'], "Matched", "Not Matched")
+    transactionData['gIndCardCvvEqEnteredCVV'] = np.where(transactionData['cardCVV'] == transactionData['enteredCVV'], "Matched", "Not Matched")
+    transactionData['gIndDtAddrChangeEqAcctOpenDt'] = np.where(transactionData['dateOfLastAddressChange'] == transactionData['accountOpenDate'], "Matched", "Not Matched")
+
+    # Drop fields with 100% missing values
+    return transactionData.drop(DROPPED_FIELDS, axis=1)
+
+
+# Stable sort of SortData.py, records with the same keys keep the order of the input dataset
+@timedStep()
+def sortTransactions(transactionData):
+    return transactionData.sort_values(SORT_KEYS, kind='mergesort')
+
+
+# Differences from the previous transaction and duplicate tags of InvestigateAndTagDuplicates.py on sorted transactions
+@timedStep()
+def investigateDuplicates(transactionData):
+    # Convert transaction date time to a date type
+    transactionData['gTransactionDateTime'] = parseDates(transactionData['transactionDateTime'],
+                                                         TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+    return tagDuplicateTransactions(transactionData)
+
+
+# Add the features of AddFeatures.py that don't require previous transaction knowledge
+@timedStep()
+def addTransactionFeatures(transactionData, riskTables):
+    """
+    Add the days since the address change, the months open, and the risk tables of categorical fields.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The transactions with the duplicate tags.
+    riskTables : dict
+        The WOE of each category of each field.  Example: DEFAULT_RISK_TABLES
+
+    Return
+    _______
+    transactionData : DataFrame
+        The transactions with the features.
+    """
+    # Format dates
+    transactionData['gTransactionDateTime'] = parseDates(transactionData['transactionDateTime'],
+                                                         TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+    transactionData['gDateOfLastAddressChange'] = parseDates(transactionData['dateOfLastAddressChange'],
+                                                             TRANSACTION_SCHEMA['dates']['dateOfLastAddressChange'])
+    transactionData['gAccountOpenDate'] = parseDates(transactionData['accountOpenDate'],
+                                                     TRANSACTION_SCHEMA['dates']['accountOpenDate'])
+
+    # Calculate number of days since address change.  Default value = 365 which is higher than the maximum calculated value.
+    transactionData['gNumDaysSinceLastAddressChange'] = np.where(transactionData['dateOfLastAddressChange'] == transactionData['accountOpenDate'],
+                                                                 365, (transactionData['gTransactionDateTime'] - transactionData['gDateOfLastAddressChange']) / np.timedelta64(1, "D"))
+
+    # Calculate if move happened in last 30 days
+    transactionData['gIndLastAddressChangeWithin30Days'] = np.where(transactionData['gNumDaysSinceLastAddressChange'] <= 30, 1, 0)
+
+    # Calculate Months Open
+    transactionData['gNumMonthsOpen'] = (transactionData['gTransactionDateTime'] - transactionData['gAccountOpenDate']) / np.timedelta64(1, "M")
+
+    # Add risk tables of categorical fields.  Risk table value is a smoothed WOE looked up with the category codes.
+    return applyRiskTables(transactionData, riskTables)
@@ -1,6 +1,7 @@
 #! /usr/bin/python3
 import sys
 import getopt
+from S0_HelperClassLibrary.StageMetrics import METRICS_OPTIONS
 
 # Read in parameters
 def readArgs(argv):
@@ -186,4 +187,119 @@ def readArgsWithCorrelationAndTag(argv):
         elif opt in '--targetField':
             targetField = arg
 
-    return inputPath, dsName, dsNameExtension, correlationMethod, targetField
\ No newline at end of file
+    return inputPath, dsName, dsNameExtension, correlationMethod, targetField
+
+
+def readArgsBenchmark(argv):
+    """
+    Run script with following command:
+        <scriptName.py> -nrows <number of rows> -seed <seed>
+
+    Parameters
+    __________
+    nrows : int
+        The number of rows in the synthetic dataset.  Example: 10000000
+    seed : int
+        The seed of the random number generator.  Example: 0
+
+    Return
+    _______
+    nrows : int
+        The number of rows in the synthetic dataset.
+    seed : int
+        The seed of the random number generator.
+    """
+    nrows = 10000000
+    seed = 0
+
+    # Two parameters are expected and h for help is also available
+    try:
+        opts, args = getopt.getopt(argv, "h", ["nrows=", "seed="])
+        print("The input arguments are: ", opts, args)
+    except getopt.GetoptError as error:
+        print(readArgsBenchmark.__doc__)
+        print("Need passed parameters.  Code did not run.")
+        sys.exit()
+
+    # Set values for each parameter with the contents of the argument
+    for opt, arg in opts:
+        if opt in '-h':
+            print(readArgsBenchmark.__doc__)
+            sys.exit()
+        elif opt in '--nrows':
+            nrows = int(arg)
+        elif opt in '--seed':
+            seed = int(arg)
+
+    return nrows, seed
+
+
+def readArgsWithOptions(argv, optionDefaults):
+    """
+    Run script with following command:
+        <scriptName.py> -inputPath <path> -dsName <filename without extension> -dsNameExtension <extension> [-<option> <value>]
+
+    Parameters
+    __________
+    inputPath : str
+        The path of the input dataset.
+    dsName : str
+        The name of the dataset without it's extension.
+    dsNameExtension : str
+        The extension of the dataset name.  Example: withKey.parquet
+    optionDefaults : dict
+        The additional options of the script and their default values.  Example: {'storageFormat': 'parquet'}
+        A passed value is converted to the type of the default value.  The options of METRICS_OPTIONS, the profiler
+        and the metrics file of stageMetrics, are available to every script.
+
+    Return
+    _______
+    inputPath : str
+        The path of the input dataset.
+    dsName : str
+        The name of the dataset without it's extension.
+    dsNameExtension : str
+        The extension of the dataset name.  Example: withKey.parquet
+    options : dict
+        The value of each additional option.
+    """
+    inputPath = ''
+    dsName = ''
+    dsNameExtension = ''
+    optionDefaults = dict(METRICS_OPTIONS, **optionDefaults)
+    options = dict(optionDefaults)
+
+    # Three parameters plus the additional options are expected and h for help is also available
+    try:
+        opts, args = getopt.getopt(argv, "h", ["inputPath=", "dsName=", "dsNameExtension="] +
+                                   [option + "=" for option in optionDefaults])
+        print("The input arguments are: ", opts, args)
+    except getopt.GetoptError as error:
+        print(readArgsWithOptions.__doc__)
+        print("Options available: ", optionDefaults)
+        print("Need passed parameters.  Code did not run.")
+        sys.exit()
+
+    # Set values for each parameter with the contents of the argument
+    for opt, arg in opts:
+        if opt == '-h':
+            print(readArgsWithOptions.__doc__)
+            print("Options available: ", optionDefaults)
+            sys.exit()
+        elif opt == '--inputPath':
+            inputPath = arg
+        elif opt == '--dsName':
+            dsName = arg
+        elif opt == '--dsNameExtension':
+            dsNameExtension = arg
+        else:
+            option = opt[2:]
+            default = optionDefaults[option]
+            if isinstance(default, bool):
+                options[option] = arg.lower() in ('1', 'true', 'yes', 'y')
+            elif default is not None:
+                options[option] = type(default)(arg)
+            else:
+                options[option] = arg
+
+    return inputPath, dsName, dsNameExtension, options
@@ -0,0 +1,138 @@
+import json
+import pandas as pd
+import numpy as np
+
+
+# Smoothed WOE of the merchant category codes used before the risk tables were learned from the training population
+MERCHANT_CATEGORY_CODE_RISK_TABLE = {'airline': -0.807063458, 'auto': 0.224553926, 'cable / phone': 3.098851402,
+                                     'entertainment': 0.277485754, 'fastfood': 0.505350348, 'food': 0.163152711,
+                                     'food_delivery': 4.567079146, 'fuel': 5.949616458, 'furniture': 0.122767859,
+                                     'gym': 3.567859601, 'health': 1.209004407, 'hotels': 0.771717107,
+                                     'mobileapps': 5.482702989, 'online_gifts': -0.438095045,
+                                     'online_retail': -0.445288768, 'online_subscriptions': 5.179287384,
+                                     'personal care': 1.247408781, 'rideshare': -0.464512622,
+                                     'subscriptions': 0.517126236}
+DEFAULT_RISK_TABLES = {'merchantCategoryCode': MERCHANT_CATEGORY_CODE_RISK_TABLE}
+
+# Categorical fields with a risk table and the WOE of a category that is not in a learned risk table.  Categories that
+# are not in the default risk tables are missing, as before the risk tables were learned.
+RISK_TABLE_FIELDS = ['merchantCategoryCode', 'merchantCountryCode', 'posEntryMode', 'merchantName']
+UNSEEN_CATEGORY_WOE = 0.0
+DEFAULT_UNSEEN_CATEGORY_WOE = np.nan
+
+
+# Learn a smoothed weight of evidence risk table of a categorical field
+def computeRiskTable(field, target, smoothing=10.0):
+    """
+    Compute the weight of evidence (WOE) of each category of a field against a binary target.
+
+    The WOE of a category is ln(% of non-target records / % of target records), which is the log of the odds of the
+    category divided by the odds of all records.  The target rate of each category is smoothed towards the target rate
+    of all records with smoothing pseudo records, so rare categories and categories without a target record have a
+    finite WOE close to 0.  The counts are taken with one pass over the category codes.
+
+    Parameters
+    __________
+    field : Series
+        The categorical field.  The categories are converted to strings so that the table can be saved as json.
+    target : Series
+        The binary target with the same index.  Example: isFraud
+    smoothing : float
+        The number of pseudo records with the target rate of all records added to each category.
+
+    Return
+    _______
+    riskTable : dict
+        The WOE of each category in order of the categories.
+    """
+    if smoothing <= 0:
+        raise ValueError("Smoothing needs to be greater than 0: " + str(smoothing))
+    target = target.to_numpy(dtype='float64')
+    targetRate = target.mean()
+    if targetRate <= 0 or targetRate >= 1:
+        raise ValueError("Target needs to have records of both classes to compute a risk table")
+
+    # Count the records and target records of each category
+    (codes, categories) = pd.factorize(riskTableKeys(field), sort=True)
+    numberOfRecords = np.bincount(codes, minlength=len(categories))
+    numberOfTargets = np.bincount(codes, weights=target, minlength=len(categories))
+
+    # Smoothed log odds of each category relative to the log odds of all records
+    smoothedRate = (numberOfTargets + smoothing * targetRate) / (numberOfRecords + smoothing)
+    woe = np.log((1 - smoothedRate) / smoothedRate) - np.log((1 - targetRate) / targetRate)
+
+    return dict(zip(categories, woe.tolist()))
+
+
+# Learn the risk tables of several fields
+def computeRiskTables(transactionData, fields, targetField, smoothing=10.0):
+    return {field: computeRiskTable(transactionData[field], transactionData[targetField], smoothing)
+            for field in fields}
+
+
+# Look up the WOE of each record with the codes of the categories of the risk table
+def applyRiskTable(field, riskTable, unseenWoe=UNSEEN_CATEGORY_WOE):
+    """
+    Map each record of a field to the WOE of its category.
+
+    The field is coded with the categories of the risk table, and the WOE is taken from an array with the codes, so
+    the work per record does not depend on the number of categories.  Categories that are not in the risk table,
+    including missing values, have unseenWoe.
+
+    Parameters
+    __________
+    field : Series
+        The categorical field.
+    riskTable : dict
+        The WOE of each category.  Example: computeRiskTable output or MERCHANT_CATEGORY_CODE_RISK_TABLE
+    unseenWoe : float
+        The WOE of a category that is not in the risk table.  Example: unseenCategoryWoe(riskTables)
+
+    Return
+    _______
+    woe : ndarray
+        The WOE of each record.
+    """
+    codes = pd.Categorical(riskTableKeys(field), categories=list(riskTable)).codes
+    # Code -1 of a category that is not in the risk table takes the last value
+    woe = np.append(np.fromiter(riskTable.values(), dtype='float64', count=len(riskTable)), unseenWoe)
+    return woe[codes]
+
+
+# Add the risk table field of each risk table, g fields are generated
+def applyRiskTables(transactionData, riskTables):
+    unseenWoe = unseenCategoryWoe(riskTables)
+    for (field, riskTable) in riskTables.items():
+        transactionData[riskTableFieldName(field)] = applyRiskTable(transactionData[field], riskTable, unseenWoe)
+
+    return transactionData
+
+
+# WOE of a category that is not in the risk tables, missing for the default risk tables so that gMCCRiskTable is 1
+def unseenCategoryWoe(riskTables):
+    return DEFAULT_UNSEEN_CATEGORY_WOE if riskTables == DEFAULT_RISK_TABLES else UNSEEN_CATEGORY_WOE
+
+
+# Name of the risk table field: merchantCategoryCode -> gMerchantCategoryCodeRiskTable
+def riskTableFieldName(field):
+    return 'g' + field[0].upper() + field[1:] + 'RiskTable'
+
+
+# Keys of the risk tables are strings, the categories are converted once instead of every record
+def riskTableKeys(field):
+    if isinstance(field.dtype, pd.CategoricalDtype):
+        return field.cat.rename_categories(field.cat.categories.astype(str))
+    return field.astype(str)
+
+
+def saveRiskTables(riskTables, riskTablesFile, targetField, smoothing):
+    with open(riskTablesFile, 'w') as output:
+        json.dump({'targetField': targetField, 'smoothing': smoothing, 'riskTables': riskTables}, output, indent=1)
+    output.close()
+
+    return
+
+
+def loadRiskTables(riskTablesFile):
+    with open(riskTablesFile) as riskTablesInput:
+        return json.load(riskTablesInput)['riskTables']
@@ -0,0 +1,146 @@
+import numpy as np
+from sklearn import preprocessing
+from sklearn.svm import LinearSVC
+from sklearn.linear_model import SGDClassifier
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.utils.class_weight import compute_class_weight
+
+# Models that scale linearly with the number of records
+#   - sgd: linear SVM fitted by stochastic gradient descent on minibatches
+#   - linearSvc: linear SVM fitted by liblinear on all records at once
+#   - nystroem: RBF SVM approximated by a Nystroem feature map and a linear SVM fitted on minibatches
+#   - rff: RBF SVM approximated by random Fourier features and a linear SVM fitted on minibatches
+SCALABLE_MODELS = ['sgd', 'linearSvc', 'nystroem', 'rff']
+
+# Feature sets of the models of BuildSvmModel.py, compared by SweepSvmModels.py
+MODEL_FEATURE_SETS = {
+    'X8': ['gTransactionHour', 'availableMoney', 'gNumMonthsOpen', 'cardPresent', 'currentBalance',
+           'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable'],
+    'X7': ['availableMoney', 'gNumMonthsOpen', 'cardPresent', 'currentBalance', 'gIndLastAddressChangeWithin30Days',
+           'transactionAmount', 'gMCCRiskTable'],
+    'X6': ['cardPresent', 'currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable'],
+    'X5': ['currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable'],
+    'X4': ['gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable'],
+    'X3': ['transactionAmount', 'gMCCRiskTable'],
+    'X1': ['gMCCRiskTable'],
+}
+
+
+# Create the feature transformers and the linear classifier of a model
+def createScalableModel(modelType, components=500, gamma=None, alpha=0.0001, seed=0):
+    """
+    Create a model that replaces svm.SVC with a fit time and memory that grow linearly with the number of records.
+
+    The features are standardized as preprocessing.scale.  For the RBF kernel the features are mapped to --components
+    features whose dot products approximate the kernel, so that a linear SVM on them approximates the RBF SVM.  The
+    classes are weighted by the inverse of their frequency so that the few fraud records have the weight of the
+    non-fraud records.
+
+    Parameters
+    __________
+    modelType : str
+        One of SCALABLE_MODELS.
+    components : int
+        The number of features of the kernel approximation.
+    gamma : float
+        The RBF kernel coefficient.  None is gamma='scale' of svm.SVC, 1 / number of features on standardized
+        features.
+    alpha : float
+        The regularization of the SGD classifier.
+    seed : int
+        The seed of the kernel approximation and of the minibatches.
+
+    Return
+    _______
+    transformers : list
+        The unfitted feature transformers in order.
+    classifier : estimator
+        The unfitted linear classifier.
+    """
+    if modelType not in SCALABLE_MODELS:
+        raise ValueError("Model needs to be one of: " + ', '.join(SCALABLE_MODELS))
+
+    transformers = [preprocessing.StandardScaler()]
+    if modelType == 'nystroem':
+        transformers.append(Nystroem(kernel='rbf', gamma=gamma, n_components=components, random_state=seed))
+    elif modelType == 'rff':
+        transformers.append(RBFSampler(gamma=gamma if gamma else 'scale', n_components=components, random_state=seed))
+
+    if modelType == 'linearSvc':
+        classifier = LinearSVC(class_weight='balanced', random_state=seed)
+    else:
+        classifier = SGDClassifier(loss='hinge', alpha=alpha, random_state=seed)
+
+    return transformers, classifier
+
+
+# Fit the transformers and the classifier one minibatch at a time
+def fitMinibatches(transformers, classifier, X, y, batchSize=10000, epochs=5, seed=0):
+    """
+    Fit a model from createScalableModel.
+
+    The scaler is fitted on all records and the kernel approximation on a sample of the scaled records.  The SGD
+    classifier is fitted with --epochs passes over the records in shuffled minibatches of --batchSize records, and only
+    the kernel features of one minibatch are held in memory.  Each record is weighted by the balanced weight of its
+    class.  LinearSVC is fitted on all records at once with balanced class weights.
+
+    Parameters
+    __________
+    transformers : list
+        The feature transformers in order.
+    classifier : estimator
+        The linear classifier.
+    X : ndarray
+        The features of the training records.
+    y : ndarray
+        The fraud indicator of the training records.
+    batchSize : int
+        The number of records of a minibatch.
+    epochs : int
+        The number of passes over the training records.
+    seed : int
+        The seed of the order of the minibatches and of the sample of the kernel approximation.
+
+    Return
+    _______
+    transformers : list
+        The fitted feature transformers.
+    classifier : estimator
+        The fitted linear classifier.
+    """
+    random = np.random.RandomState(seed)
+    y = np.asarray(y)
+    numberOfRecords = len(y)
+
+    # The kernel approximation only needs a sample of the records
+    transformers[0].fit(X)
+    for transformer in transformers[1:]:
+        sample = random.choice(numberOfRecords, min(numberOfRecords, 10 * transformer.n_components), replace=False)
+        transformer.fit(transformFeatures(transformers[:1], X[sample]))
+
+    if not hasattr(classifier, 'partial_fit'):
+        classifier.fit(transformFeatures(transformers, X), y)
+        return transformers, classifier
+
+    classes = np.unique(y)
+    sampleWeights = compute_class_weight('balanced', classes=classes, y=y)[np.searchsorted(classes, y)]
+    for epoch in range(epochs):
+        order = random.permutation(numberOfRecords)
+        for batchStart in range(0, numberOfRecords, batchSize):
+            batch = order[batchStart:batchStart + batchSize]
+            classifier.partial_fit(transformFeatures(transformers, X[batch]), y[batch], classes=classes,
+                                   sample_weight=sampleWeights[batch])
+
+    return transformers, classifier
+
+
+# Predict one minibatch at a time so that only the kernel features of a minibatch are held in memory
+def predictMinibatches(transformers, classifier, X, batchSize=10000):
+    return np.concatenate([classifier.predict(transformFeatures(transformers, X[batchStart:batchStart + batchSize]))
+                           for batchStart in range(0, len(X), batchSize)])
+
+
+def transformFeatures(transformers, X):
+    for transformer in transformers:
+        X = transformer.transform(X)
+    return X
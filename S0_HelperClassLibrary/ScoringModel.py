@@ -0,0 +1,150 @@
+import pickle
+from datetime import datetime
+import numpy as np
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA
+from S0_HelperClassLibrary.RiskTables import DEFAULT_RISK_TABLES, riskTableFieldName, unseenCategoryWoe
+from S0_HelperClassLibrary.ScalableTraining import MODEL_FEATURE_SETS
+
+# Features of the model, the X7 features of BuildSvmModel.py
+SCORING_FEATURES = MODEL_FEATURE_SETS['X7']
+# Length of a month of np.timedelta64(1, "M") used for gNumMonthsOpen in AddFeatures.py, the average Gregorian month
+SECONDS_PER_DAY = 86400
+SECONDS_PER_MONTH = 365.2425 / 12 * SECONDS_PER_DAY
+
+
+# Features and score of a single transaction with the fitted scaler, risk tables, and model held in memory
+class TransactionScorer:
+    """
+    Score single transactions with the features of AddFeatures.py and BuildSvmModel.py.
+
+    The features of a transaction are computed from the fields of the transaction dict with plain Python, without a
+    data frame, so that a transaction is scored in well under a millisecond plus the time of the model.  The features
+    are the same as the features of the batch scripts for the same transaction.
+
+    Parameters
+    __________
+    scoringModel : dict
+        The fitted scaler and model, the risk tables, and the features from fitScoringModel or loadScoringModel.
+    """
+    def __init__(self, scoringModel):
+        self.features = scoringModel['features']
+        self.scaler = scoringModel['scaler']
+        self.model = scoringModel['model']
+        self.riskTables = scoringModel['riskTables']
+        self.fraudClass = list(self.model.classes_).index(True)
+
+    def transactionFeatures(self, transaction):
+        """
+        Compute the AddFeatures.py features of a transaction.
+
+        Parameters
+        __________
+        transaction : dict
+            The fields of a transaction as in the transactions dataset.  Dates are strings in the formats of the
+            transaction schema, epoch milliseconds, or datetimes.
+
+        Return
+        _______
+        features : dict
+            The fields of the transaction with the generated g fields.
+        """
+        features = dict(transaction)
+        transactionDateTime = toDateTime(transaction['transactionDateTime'], 'transactionDateTime')
+        accountOpenDate = toDateTime(transaction['accountOpenDate'], 'accountOpenDate')
+        dateOfLastAddressChange = toDateTime(transaction['dateOfLastAddressChange'], 'dateOfLastAddressChange')
+
+        # Default value = 365 which is higher than the maximum calculated value
+        if dateOfLastAddressChange == accountOpenDate:
+            features['gNumDaysSinceLastAddressChange'] = 365
+        else:
+            features['gNumDaysSinceLastAddressChange'] = \
+                (transactionDateTime - dateOfLastAddressChange).total_seconds() / SECONDS_PER_DAY
+        features['gIndLastAddressChangeWithin30Days'] = int(features['gNumDaysSinceLastAddressChange'] <= 30)
+        features['gNumMonthsOpen'] = (transactionDateTime - accountOpenDate).total_seconds() / SECONDS_PER_MONTH
+        features['gTransactionHour'] = transactionDateTime.hour
+
+        # Risk tables of categorical fields, the merchant category code risk table is also gMCCRiskTable with missing
+        # values replaced by 1
+        unseenWoe = unseenCategoryWoe(self.riskTables)
+        for (field, riskTable) in self.riskTables.items():
+            features[riskTableFieldName(field)] = riskTable.get(str(transaction.get(field)), unseenWoe)
+        mccRiskTable = features.get('gMerchantCategoryCodeRiskTable', 1)
+        features['gMCCRiskTable'] = 1 if np.isnan(mccRiskTable) else mccRiskTable
+
+        return features
+
+    def score(self, transaction):
+        """
+        Compute the fraud score of a transaction.
+
+        Parameters
+        __________
+        transaction : dict
+            The fields of a transaction as in the transactions dataset.
+
+        Return
+        _______
+        score : float
+            The probability of fraud of the transaction from the model.
+        """
+        features = self.transactionFeatures(transaction)
+        modelInput = np.array([[float(features[feature]) for feature in self.features]])
+        if self.scaler is not None:
+            modelInput = self.scaler.transform(modelInput)
+        return float(self.model.predict_proba(modelInput)[0, self.fraudClass])
+
+
+# Fit the scaler and the model on the features of the training records
+def fitScoringModel(modelingData, target, model, features=SCORING_FEATURES, riskTables=DEFAULT_RISK_TABLES,
+                    scaler=None):
+    """
+    Fit a scoring model that can be held in memory by TransactionScorer.
+
+    Parameters
+    __________
+    modelingData : DataFrame
+        The training records with the features.
+    target : Series
+        The fraud indicator of the training records.
+    model : estimator
+        A scikit-learn classifier with predict_proba.  Example: svm.SVC(kernel='rbf', probability=True)
+    features : list
+        The features of the model in order.
+    riskTables : dict
+        The risk tables of AddFeatures.py that produced the risk table features.
+    scaler : transformer
+        A scikit-learn scaler fitted with the model, e.g. preprocessing.StandardScaler(), or None.
+
+    Return
+    _______
+    scoringModel : dict
+        The fitted scaler and model, the risk tables, and the features.
+    """
+    modelInput = modelingData[features].to_numpy(dtype='float64')
+    if scaler is not None:
+        modelInput = scaler.fit_transform(modelInput)
+    model.fit(modelInput, target)
+
+    return {'features': features, 'scaler': scaler, 'model': model, 'riskTables': riskTables}
+
+
+def saveScoringModel(scoringModel, modelFile):
+    with open(modelFile, 'wb') as output:
+        pickle.dump(scoringModel, output)
+    output.close()
+
+    return
+
+
+def loadScoringModel(modelFile):
+    with open(modelFile, 'rb') as modelInput:
+        return pickle.load(modelInput)
+
+
+# Date of a field from a string in the format of the transaction schema, epoch milliseconds, or a datetime
+def toDateTime(value, field):
+    if isinstance(value, str):
+        return datetime.strptime(value, TRANSACTION_SCHEMA['dates'][field])
+    elif isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value / 1000)
+    return value
@@ -0,0 +1,259 @@
+import math
+import numpy as np
+import pandas as pd
+
+
+class HyperLogLog:
+    """
+    Approximate count of unique values in fixed memory.
+
+    Every value is hashed to 64 bits.  The first bits of the hash select a register and the register keeps the
+    highest position of the first 1 bit in the rest of the hash.  The count is estimated from the harmonic mean of the
+    registers.  The relative standard error is 1.04 / sqrt(number of registers).  Sketches with the same precision are
+    merged by taking the maximum of each register.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype='uint8')
+
+    @classmethod
+    def fromRelativeError(cls, relativeError):
+        # Smallest number of registers with a standard error below the requested error
+        precision = math.ceil(math.log2((1.04 / relativeError) ** 2))
+        return cls(min(max(precision, 4), 18))
+
+    def update(self, field):
+        """
+        Add the valid values of a field to the sketch.
+
+        Parameters
+        __________
+        field : Series
+            The values to add.
+        """
+        hashes = pd.util.hash_pandas_object(field.dropna(), index=False).to_numpy()
+        if len(hashes) == 0:
+            return self
+
+        # The first bits select the register, the position of the first 1 bit of the rest is the rank
+        remainingBits = 64 - self.precision
+        registerIndex = (hashes >> np.uint64(remainingBits)).astype('int64')
+        remainder = hashes & np.uint64(2 ** remainingBits - 1)
+        rank = remainingBits + 1 - bitLength(remainder)
+        np.maximum.at(self.registers, registerIndex, rank.astype('uint8'))
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog sketches need the same precision to merge: " + str(self.precision) +
+                             " and " + str(other.precision))
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        # Harmonic mean of the registers with linear counting for small counts
+        numRegisters = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / numRegisters)
+        rawEstimate = alpha * numRegisters ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype('int64')))
+        numEmpty = np.count_nonzero(self.registers == 0)
+        if rawEstimate <= 2.5 * numRegisters and numEmpty > 0:
+            return numRegisters * math.log(numRegisters / numEmpty)
+        return rawEstimate
+
+    def relativeError(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class TDigest:
+    """
+    Approximate quantiles in fixed memory.
+
+    The values are summarized by centroids, a mean and a weight.  Centroids are small near the minimum and maximum and
+    large near the median, so the tails stay accurate.  The size of the centroids is set by the compression: a centroid
+    spans at most about pi / (2 * compression) of the ranks, which bounds the error of a quantile in rank.  The minimum
+    and maximum are exact.  Digests are merged by combining their centroids and compressing again.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.array([], dtype='float64')
+        self.weights = np.array([], dtype='float64')
+        self.min = np.nan
+        self.max = np.nan
+
+    @classmethod
+    def fromRankError(cls, rankError):
+        # Compression with centroids spanning at most the requested error in rank
+        return cls(math.ceil(math.pi / (2 * rankError)))
+
+    def update(self, values):
+        """
+        Add values to the digest.
+
+        Parameters
+        __________
+        values : array
+            The float values to add.  Missing values are skipped.
+        """
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        other = TDigest(self.compression)
+        other.means = values
+        other.weights = np.ones(len(values))
+        other.min = values.min()
+        other.max = values.max()
+        return self.merge(other)
+
+    def merge(self, other):
+        if len(other.means) == 0:
+            return self
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.compress(means, weights)
+        return self
+
+    def compress(self, means, weights):
+        # Centroids in the same unit of the scale function k(q) = compression / (2 pi) * asin(2q - 1) are combined
+        order = np.argsort(means, kind='mergesort')
+        means = means[order]
+        weights = weights[order]
+        cumulativeWeights = np.cumsum(weights)
+        midRanks = (cumulativeWeights - weights / 2) / cumulativeWeights[-1]
+        scale = self.compression / (2 * np.pi) * np.arcsin(2 * midRanks - 1)
+        centroid = np.unique(np.floor(scale - scale[0]).astype('int64'), return_inverse=True)[1]
+
+        # Keep the centroids apart when nothing is combined
+        if centroid[-1] + 1 == len(means):
+            self.means, self.weights = means, weights
+            return
+        self.weights = np.bincount(centroid, weights=weights)
+        self.means = np.bincount(centroid, weights=weights * means) / self.weights
+
+    def count(self):
+        return self.weights.sum()
+
+    def quantile(self, q):
+        """
+        Quantile with linear interpolation between the centroids.  Matches numpy percentile when no centroids were
+        combined.
+
+        Parameters
+        __________
+        q : float
+            The quantile between 0 and 1.
+
+        Return
+        _______
+        value : float
+            The approximate quantile.
+        """
+        totalWeight = self.count()
+        if totalWeight == 0:
+            return np.nan
+
+        # The value of rank r (from 0) is at the middle of its centroid, r + 0.5
+        midRanks = np.cumsum(self.weights) - self.weights / 2
+        ranks = np.concatenate([[0.5], midRanks, [totalWeight - 0.5]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * (totalWeight - 1) + 0.5, ranks, values))
+
+    def centroids(self):
+        # Mean and weight of each centroid
+        return pd.Series(self.weights, index=self.means)
+
+
+class SpaceSaving:
+    """
+    Approximate most frequent values in fixed memory.
+
+    The sketch keeps the counts of at most capacity values.  A kept count is an upper bound of the true count and
+    overcounts by at most the number of values / capacity.  Values that are not kept have a count of at most the
+    threshold.  Sketches are merged by adding the counts, where a value missing from a sketch is given the threshold of
+    that sketch, and keeping the largest counts.  Every chunk is counted exactly before it is merged, so the bound
+    holds for every merge.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = pd.Series([], dtype='int64')
+        self.errors = pd.Series([], dtype='int64')
+        self.threshold = 0
+
+    @classmethod
+    def fromFrequencyError(cls, frequencyError):
+        # Capacity with an overcount of at most the requested fraction of the values
+        return cls(math.ceil(1 / frequencyError))
+
+    def update(self, field):
+        """
+        Add the valid values of a field to the sketch.
+
+        Parameters
+        __________
+        field : Series
+            The values to add.
+        """
+        other = SpaceSaving(self.capacity)
+        counts = field.value_counts(sort=False).astype('int64')
+        other.counts = counts[counts > 0]
+        other.errors = pd.Series(0, index=other.counts.index, dtype='int64')
+        other.truncate()
+        return self.merge(other)
+
+    def merge(self, other):
+        if len(self.counts.index) == 0 and self.threshold == 0:
+            self.counts, self.errors, self.threshold = other.counts, other.errors, other.threshold
+            return self
+
+        # Position of every value in each sketch, values missing from a sketch are given its threshold
+        values = self.counts.index.append(other.counts.index).unique()
+        selfPosition = self.counts.index.get_indexer(values)
+        otherPosition = other.counts.index.get_indexer(values)
+        counts = np.where(selfPosition >= 0, self.counts.to_numpy()[selfPosition], self.threshold) + \
+            np.where(otherPosition >= 0, other.counts.to_numpy()[otherPosition], other.threshold)
+        errors = np.where(selfPosition >= 0, self.errors.to_numpy()[selfPosition], self.threshold) + \
+            np.where(otherPosition >= 0, other.errors.to_numpy()[otherPosition], other.threshold)
+        self.counts = pd.Series(counts, index=values, dtype='int64')
+        self.errors = pd.Series(errors, index=values, dtype='int64')
+        self.threshold += other.threshold
+        self.truncate()
+        return self
+
+    def truncate(self):
+        # Keep the largest counts, the largest count dropped is the bound for the values that are not kept
+        if len(self.counts.index) > self.capacity:
+            order = np.argsort(-self.counts.to_numpy(), kind='mergesort')
+            self.threshold = max(self.threshold, int(self.counts.iloc[order[self.capacity]]))
+            self.counts = self.counts.iloc[order[:self.capacity]]
+            self.errors = self.errors.iloc[order[:self.capacity]]
+
+    def isExact(self):
+        # No value has been dropped, so every count is exact
+        return self.threshold == 0
+
+    def topK(self, k):
+        # The k largest counts in descending order
+        return self.counts.sort_values(ascending=False, kind='mergesort').head(k)
+
+    def maxError(self):
+        return int(self.errors.max()) if len(self.errors.index) > 0 else 0
+
+
+# Number of bits needed to hold each unsigned integer
+def bitLength(values):
+    # Integers below 2 ** 53 are exact as floats, so the exponent of the float is the number of bits
+    if len(values) == 0 or values.max() < np.uint64(2 ** 53):
+        return np.frexp(values.astype('float64'))[1].astype('int64')
+
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype='int64')
+    for shift in [32, 16, 8, 4, 2, 1]:
+        isLonger = values >= np.uint64(2 ** shift)
+        lengths[isLonger] += shift
+        values[isLonger] >>= np.uint64(shift)
+    return lengths + (values > 0)
@@ -0,0 +1,313 @@
+#! /usr/bin/python3
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import hashlib
+import subprocess
+
+# Cache of the outputs of the stage scripts, shared by the Makefiles of S1 to S5
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'MSDCodeRepoExample', 'StageCache')
+DEFAULT_BUDGET_GB = 20.0
+# Artifacts of the scripts, relative to the directory of the Makefile
+OUTPUT_DIRECTORY = 'Output'
+ENTRY_FILE = 'entry.json'
+FILE_HASHES_FILE = 'fileHashes.json'
+LIBRARY_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+
+
+# Run a stage script, or restore its outputs when the script, the library, the arguments, and the inputs are unchanged
+def runCachedStage(script, arguments, cacheDirectory=DEFAULT_CACHE_DIRECTORY, budgetBytes=DEFAULT_BUDGET_GB * 2 ** 30):
+    """
+    Run a stage script through a content addressed cache of its outputs.
+
+    The key of a run is the hash of the script source, the sources of S0_HelperClassLibrary, the arguments, and the
+    content of the input files: the dataset of --inputPath, --dsName (or --dsName1 and --dsName2), and
+    --dsNameExtension, as the scripts name it with createInputFileName, and any other argument that is an existing file.
+    On a hit the output datasets and the Output/ artifacts are copied back from the cache and the printed output of the
+    run is replayed, without running the script.  On a miss the script is run, and the files it creates or changes in
+    Output/ and the files of --dsName in --inputPath are stored in the cache.  The least recently used entries are then
+    evicted until the cache is under the size budget.
+
+    Only stages whose outputs depend on their inputs and arguments alone can be cached, e.g. not the --appendTo runs that
+    read the saved state of a previous run.
+
+    Parameters
+    __________
+    script : str
+        The script of the stage.  Example: ./InvestigateAndTagDuplicates.py
+    arguments : list
+        The command line arguments of the script.
+    cacheDirectory : str
+        The directory of the cache entries.
+    budgetBytes : float
+        The size of the cache above which the least recently used entries are evicted.
+
+    Return
+    _______
+    returnCode : int
+        The return code of the script, 0 on a hit.
+    """
+    os.makedirs(cacheDirectory, exist_ok=True)
+    inputFiles = stageInputFiles(arguments)
+    missingFiles = [inputFile for inputFile in inputFiles if not os.path.isfile(inputFile)]
+    if missingFiles:
+        print("Stage cache not used, input files not found: " + ', '.join(missingFiles))
+        return subprocess.call([sys.executable, script] + arguments)
+
+    key = stageKey(script, arguments, inputFiles, cacheDirectory)
+    entryDirectory = os.path.join(cacheDirectory, key)
+    if os.path.isfile(os.path.join(entryDirectory, ENTRY_FILE)):
+        restoreEntry(entryDirectory)
+        return 0
+
+    # Files created or changed by the run are its outputs
+    watchedFiles = stageWatchedFiles(arguments)
+    before = snapshotFiles(watchedFiles())
+    (returnCode, printedOutput) = runAndCapture(script, arguments)
+    if returnCode != 0:
+        return returnCode
+
+    after = snapshotFiles(watchedFiles())
+    outputFiles = sorted(fileName for fileName in after
+                         if before.get(fileName) != after[fileName] and fileName not in inputFiles)
+    storeEntry(entryDirectory, script, arguments, outputFiles, printedOutput, budgetBytes)
+    evictEntries(cacheDirectory, budgetBytes)
+
+    return returnCode
+
+
+# Input datasets named by the arguments as createInputFileName, and arguments that are existing files
+def stageInputFiles(arguments):
+    (opts, args) = getopt.getopt(arguments, "h", longOptions(arguments))
+    values = dict(opts)
+    inputFiles = [str(values.get('--inputPath', '') + values[dsNameOption] + '.' + values.get('--dsNameExtension', ''))
+                  for dsNameOption in ('--dsName', '--dsName1', '--dsName2') if dsNameOption in values]
+    inputFiles += [value for (opt, value) in opts if opt not in ('--inputPath', '--dsName', '--dsName1', '--dsName2',
+                                                                 '--dsNameExtension') and os.path.isfile(value)]
+    return list(dict.fromkeys(inputFiles))
+
+
+# Files that the outputs of a run can be among: the Output/ directory and the datasets of --dsName in --inputPath
+def stageWatchedFiles(arguments):
+    (opts, args) = getopt.getopt(arguments, "h", longOptions(arguments))
+    values = dict(opts)
+    inputPath = values.get('--inputPath', '')
+    prefixes = tuple(values[dsNameOption] + '.' for dsNameOption in ('--dsName', '--dsName1', '--dsName2')
+                     if dsNameOption in values)
+
+    def watchedFiles():
+        fileNames = []
+        for (directory, directoryNames, files) in os.walk(OUTPUT_DIRECTORY):
+            fileNames += [os.path.join(directory, fileName) for fileName in files]
+        if prefixes and os.path.isdir(inputPath or '.'):
+            fileNames += [inputPath + fileName for fileName in os.listdir(inputPath or '.')
+                          if fileName.startswith(prefixes) and os.path.isfile(inputPath + fileName)]
+        return fileNames
+
+    return watchedFiles
+
+
+def longOptions(arguments):
+    # Every --option of the arguments takes a value, as in readArgs and readArgsWithOptions
+    return [argument[2:].split('=')[0] + '=' for argument in arguments if argument.startswith('--')]
+
+
+def snapshotFiles(fileNames):
+    snapshot = {}
+    for fileName in fileNames:
+        fileStat = os.stat(fileName)
+        snapshot[fileName] = (fileStat.st_size, fileStat.st_mtime_ns)
+    return snapshot
+
+
+# Hash of the script, the library, the arguments, and the input files
+def stageKey(script, arguments, inputFiles, cacheDirectory):
+    libraryFiles = sorted(os.path.join(LIBRARY_DIRECTORY, fileName) for fileName in os.listdir(LIBRARY_DIRECTORY)
+                          if fileName.endswith('.py'))
+    fileHashes = loadFileHashes(cacheDirectory)
+    keyHash = hashlib.sha256()
+    keyHash.update(json.dumps({'script': os.path.basename(script), 'arguments': arguments}).encode())
+    for fileName in [script] + libraryFiles + inputFiles:
+        keyHash.update(memoizedFileHash(fileName, fileHashes).encode())
+    saveFileHashes(cacheDirectory, fileHashes)
+    return keyHash.hexdigest()
+
+
+# The hash of a large dataset is only computed again when its size or modification time change
+def memoizedFileHash(fileName, fileHashes):
+    fileStat = os.stat(fileName)
+    realName = os.path.realpath(fileName)
+    (size, modified, contentHash) = fileHashes.get(realName, (None, None, None))
+    if (size, modified) != (fileStat.st_size, fileStat.st_mtime_ns):
+        contentHash = fileHash(fileName)
+        fileHashes[realName] = (fileStat.st_size, fileStat.st_mtime_ns, contentHash)
+    return contentHash
+
+
+def loadFileHashes(cacheDirectory):
+    fileHashesFile = os.path.join(cacheDirectory, FILE_HASHES_FILE)
+    if not os.path.isfile(fileHashesFile):
+        return {}
+    with open(fileHashesFile) as fileHashesInput:
+        return {fileName: tuple(value) for (fileName, value) in json.load(fileHashesInput).items()}
+
+
+def saveFileHashes(cacheDirectory, fileHashes):
+    fileHashesFile = os.path.join(cacheDirectory, FILE_HASHES_FILE)
+    with open(fileHashesFile + '.tmp', 'w') as output:
+        json.dump(fileHashes, output)
+    output.close()
+    os.replace(fileHashesFile + '.tmp', fileHashesFile)
+
+
+# Hash of the content of a file read one block at a time
+def fileHash(fileName, blockSize=2 ** 20):
+    contentHash = hashlib.sha256()
+    with open(fileName, 'rb') as fileInput:
+        for block in iter(lambda: fileInput.read(blockSize), b''):
+            contentHash.update(block)
+    return contentHash.hexdigest()
+
+
+# Run the script and print its output as it is printed, keeping a copy to replay on a hit
+def runAndCapture(script, arguments):
+    printedOutput = []
+    process = subprocess.Popen([sys.executable, script] + arguments, stdout=subprocess.PIPE, text=True,
+                               env=dict(os.environ, PYTHONUNBUFFERED='1'))
+    for line in process.stdout:
+        sys.stdout.write(line)
+        printedOutput.append(line)
+    return process.wait(), ''.join(printedOutput)
+
+
+# Copy the outputs of a run into a new entry, written to a temporary directory first so that an entry is always whole
+def storeEntry(entryDirectory, script, arguments, outputFiles, printedOutput, budgetBytes):
+    entrySize = sum(os.path.getsize(fileName) for fileName in outputFiles) + len(printedOutput)
+    if entrySize > budgetBytes:
+        print("Stage cache not stored, outputs are larger than the budget: " + str(entrySize) + " bytes")
+        return
+
+    temporaryDirectory = entryDirectory + '.tmp' + str(os.getpid())
+    os.makedirs(temporaryDirectory)
+    outputs = []
+    for (position, fileName) in enumerate(outputFiles):
+        cachedName = str(position) + '.' + os.path.basename(fileName)
+        shutil.copy2(fileName, os.path.join(temporaryDirectory, cachedName))
+        outputs.append({'file': fileName, 'cachedFile': cachedName})
+
+    entry = {'script': script, 'arguments': arguments, 'outputs': outputs, 'printedOutput': printedOutput,
+             'size': entrySize, 'created': time.time(), 'lastUsed': time.time()}
+    with open(os.path.join(temporaryDirectory, ENTRY_FILE), 'w') as output:
+        json.dump(entry, output, indent=1)
+    output.close()
+    os.replace(temporaryDirectory, entryDirectory)
+    print("Stage cache stored " + str(len(outputs)) + " files: " + entryDirectory)
+
+
+# Copy the outputs of an entry back and replay the printed output of the run
+def restoreEntry(entryDirectory):
+    entry = readEntry(entryDirectory)
+    for output in entry['outputs']:
+        outputDirectory = os.path.dirname(output['file'])
+        if outputDirectory:
+            os.makedirs(outputDirectory, exist_ok=True)
+        shutil.copy2(os.path.join(entryDirectory, output['cachedFile']), output['file'])
+    sys.stdout.write(entry['printedOutput'])
+
+    # Most recently used entries are evicted last
+    entry['lastUsed'] = time.time()
+    writeEntry(entryDirectory, entry)
+    print("Stage cache restored " + str(len(entry['outputs'])) + " files: " + entryDirectory)
+
+
+def readEntry(entryDirectory):
+    with open(os.path.join(entryDirectory, ENTRY_FILE)) as entryInput:
+        return json.load(entryInput)
+
+
+def writeEntry(entryDirectory, entry):
+    entryFile = os.path.join(entryDirectory, ENTRY_FILE)
+    with open(entryFile + '.tmp', 'w') as output:
+        json.dump(entry, output, indent=1)
+    output.close()
+    os.replace(entryFile + '.tmp', entryFile)
+
+
+# Remove the least recently used entries until the cache is under the budget
+def evictEntries(cacheDirectory, budgetBytes):
+    entries = []
+    for key in os.listdir(cacheDirectory):
+        entryDirectory = os.path.join(cacheDirectory, key)
+        if os.path.isfile(os.path.join(entryDirectory, ENTRY_FILE)):
+            entry = readEntry(entryDirectory)
+            entries.append((entry['lastUsed'], entry['size'], entryDirectory))
+
+    cacheSize = sum(size for (lastUsed, size, entryDirectory) in entries)
+    for (lastUsed, size, entryDirectory) in sorted(entries):
+        if cacheSize <= budgetBytes:
+            break
+        shutil.rmtree(entryDirectory)
+        cacheSize -= size
+        print("Stage cache evicted: " + entryDirectory)
+
+    return cacheSize
+
+
+# Read in the options of the cache, followed by the script and its arguments
+def readArgsStageCache(argv):
+    """
+    Run script with following command:
+        StageCache.py [-cacheDirectory <directory>] [-budgetGB <size>] <scriptName.py> <arguments of the script>
+
+    Parameters
+    __________
+    cacheDirectory : str
+        The directory of the cache entries.  Example: ~/.cache/MSDCodeRepoExample/StageCache
+    budgetGB : float
+        The size of the cache in GB above which the least recently used entries are evicted.  Example: 20
+
+    Return
+    _______
+    cacheDirectory : str
+        The directory of the cache entries.
+    budgetGB : float
+        The size budget of the cache in GB.
+    script : str
+        The script of the stage.
+    arguments : list
+        The command line arguments of the script.
+    """
+    cacheDirectory = DEFAULT_CACHE_DIRECTORY
+    budgetGB = DEFAULT_BUDGET_GB
+
+    # The options of the cache end at the script
+    try:
+        opts, args = getopt.getopt(argv, "h", ["cacheDirectory=", "budgetGB="])
+    except getopt.GetoptError as error:
+        print(readArgsStageCache.__doc__)
+        print("Need passed parameters.  Code did not run.")
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(readArgsStageCache.__doc__)
+            sys.exit()
+        elif opt == '--cacheDirectory':
+            cacheDirectory = arg
+        elif opt == '--budgetGB':
+            budgetGB = float(arg)
+
+    if not args:
+        print(readArgsStageCache.__doc__)
+        print("Need a script to run.  Code did not run.")
+        sys.exit(2)
+
+    return cacheDirectory, budgetGB, args[0], args[1:]
+
+
+if __name__ == '__main__':
+    (cacheDirectory, budgetGB, script, arguments) = readArgsStageCache(sys.argv[1:])
+    sys.exit(runCachedStage(script, arguments, cacheDirectory, budgetGB * 2 ** 30))
@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import signal
+import pstats
+import cProfile
+import resource
+import functools
+import contextlib
+from datetime import datetime
+from collections import Counter
+
+# Metrics of the runs of the stage scripts, next to Output/ rather than in it: the stage cache stores the files a run
+# changes in Output/ and copies them back on a hit, which would overwrite the metrics appended since
+METRICS_FILE = os.path.join('Metrics', 'Metrics.jsonl')
+# Profilers of the profile option, cProfile of every call or samples of the stack every SAMPLE_INTERVAL of CPU time
+PROFILERS = ['cprofile', 'sample']
+SAMPLE_INTERVAL = 0.005
+# Number of functions of the profile summaries
+PROFILE_TOP_FUNCTIONS = 30
+# Options of every script that reads its arguments with readArgsWithOptions
+METRICS_OPTIONS = {'profile': '', 'metricsFile': METRICS_FILE}
+
+# Stage being measured in this process and its open steps
+stageState = {'stage': None, 'steps': []}
+
+
+# Measure a run of a stage script and its steps, with an optional profile of the run
+@contextlib.contextmanager
+def stageMetrics(script, dsName='', profile='', metricsFile=METRICS_FILE):
+    """
+    Measure a run of a stage script as a step named after the script, within which stageStep measures the steps of
+    the stage.  Example:
+        with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+            addKeyAndDropFields(inputPath, dsName, dsNameExtension, options['storageFormat'])
+
+    The record of each step is appended to the metrics file as a line of json when the step ends, so the steps of a
+    run that fails are kept.  With a profiler the run is profiled and the profile is saved next to the metrics file:
+    cProfile saves Profile.<stage>.<dsName>.prof for pstats and a summary of the functions with the most cumulative
+    time, sample saves the sampled stacks as Profile.<stage>.<dsName>.folded for flame graphs and a summary of the
+    functions with the most samples.
+
+    Parameters
+    __________
+    script : str
+        The script of the stage.  Example: __file__
+    dsName : str
+        The name of the dataset without it's extension.
+    profile : str
+        The profiler, one of PROFILERS.  The run is not profiled when empty.
+    metricsFile : str
+        The json lines file the records of the steps are appended to.
+
+    Return
+    _______
+    step : dict
+        The step of the run.  The number of records of the run can be set as step['rows'].
+    """
+    if profile and profile not in PROFILERS:
+        raise ValueError("Profiler needs to be one of: " + ', '.join(PROFILERS))
+
+    stageName = os.path.splitext(os.path.basename(script))[0]
+    stageState['stage'] = {'stage': stageName, 'dsName': dsName, 'metricsFile': metricsFile, 'pid': os.getpid(),
+                           'runId': stageName + '.' + datetime.now().strftime('%Y%m%dT%H%M%S') + '.' +
+                           str(os.getpid())}
+    stageState['steps'] = []
+    profiler = startProfiler(profile)
+    try:
+        with stageStep(stageName) as step:
+            yield step
+    finally:
+        profileFiles = stopProfiler(profiler, profile, os.path.dirname(metricsFile),
+                                    stageName + ('.' + dsName if dsName else ''))
+        stageState['stage'] = None
+        print("Metrics are found here: " + metricsFile)
+        for profileFile in profileFiles:
+            print("Profile is found here: " + profileFile)
+
+
+# Measure a named step of the stage being measured
+@contextlib.contextmanager
+def stageStep(name, rows=None):
+    """
+    Measure the wall time, CPU time, peak resident memory, and records per second of a step of the stage.  Example:
+        with stageStep('read') as step:
+            transactionData = loadDataset(inputFile)
+            step['rows'] = len(transactionData.index)
+
+    Steps are nested in the steps open when they start.  The peak memory of a step is measured by resetting the peak
+    resident memory of the process when the step starts, and the peak of a step also counts toward the steps it is
+    nested in.  Where the peak cannot be reset the peak is the peak of the process so far, and peakScope is 'process'.
+    The CPU time of the child processes, e.g. the workers of ParallelColumns, is counted when they have ended.  A step
+    without a number of records takes the number of records of its first nested step that has one, e.g. a stage the
+    records it reads.  Outside of stageMetrics, or in a child process, the step is not measured.
+
+    Parameters
+    __________
+    name : str
+        The name of the step.  Example: 'read'
+    rows : int
+        The number of records of the step.  It can also be set on the step as step['rows'].
+
+    Return
+    _______
+    step : dict
+        The step, whose number of records can be set as step['rows'].
+    """
+    step = {'rows': rows}
+    stage = stageState['stage']
+    if stage is None or stage['pid'] != os.getpid():
+        yield step
+        return
+
+    (startRss, peakRss) = residentMemory()
+    parent = stageState['steps'][-1] if stageState['steps'] else None
+    if parent is not None:
+        parent['peakRss'] = max(parent['peakRss'], peakRss)
+    peakScope = 'step' if resetPeakMemory() else 'process'
+    record = {'name': name, 'step': step, 'peakRss': startRss,
+              'started': datetime.now().isoformat(timespec='milliseconds')}
+    stageState['steps'].append(record)
+
+    status = 'failed'
+    wallStart = time.perf_counter()
+    cpuStart = time.process_time()
+    childCpuStart = childCpuTime()
+    try:
+        yield step
+        status = 'done'
+    finally:
+        wallSeconds = time.perf_counter() - wallStart
+        cpuSeconds = time.process_time() - cpuStart
+        childCpuSeconds = childCpuTime() - childCpuStart
+        stageState['steps'].pop()
+        (endRss, peakRss) = residentMemory()
+        record['peakRss'] = max(record['peakRss'], peakRss)
+        stepRows = step['rows']
+        if parent is not None:
+            parent['peakRss'] = max(parent['peakRss'], record['peakRss'])
+            if parent['step']['rows'] is None:
+                parent['step']['rows'] = stepRows
+        appendMetrics(stage['metricsFile'], {
+            'runId': stage['runId'], 'stage': stage['stage'], 'dsName': stage['dsName'], 'step': name,
+            'parent': parent['name'] if parent is not None else None, 'depth': len(stageState['steps']),
+            'status': status, 'started': record['started'], 'wallSeconds': round(wallSeconds, 4),
+            'cpuSeconds': round(cpuSeconds, 4), 'childCpuSeconds': round(childCpuSeconds, 4),
+            'startRssMB': round(startRss / 2 ** 20, 1), 'endRssMB': round(endRss / 2 ** 20, 1),
+            'peakRssMB': round(record['peakRss'] / 2 ** 20, 1), 'peakScope': peakScope, 'rows': stepRows,
+            'rowsPerSecond': round(stepRows / wallSeconds, 1) if stepRows is not None and wallSeconds > 0 else None})
+
+
+# Measure each call of a function as a step of the stage
+def timedStep(name=None):
+    """
+    Decorate a function so that each call is measured with stageStep.  The number of records of the step is the
+    number of records of the returned DataFrame, or of the first returned DataFrame of a tuple, or else of the first
+    DataFrame argument, e.g. the dataset of a report.
+
+    Parameters
+    __________
+    name : str
+        The name of the step.  The name of the function when None.
+
+    Return
+    _______
+    decorator : function
+        The decorator of the function.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def timedFunction(*args, **kwargs):
+            with stageStep(name or function.__name__) as step:
+                result = function(*args, **kwargs)
+                results = result if isinstance(result, tuple) else (result,)
+                step['rows'] = next((numberOfRows(value) for value in results + args
+                                     if numberOfRows(value) is not None), None)
+            return result
+        return timedFunction
+    return decorator
+
+
+# Number of records of a DataFrame, None for other values
+def numberOfRows(value):
+    return len(value.index) if hasattr(value, 'columns') and hasattr(value, 'index') else None
+
+
+# Current and peak resident memory of the process in bytes, from /proc where it is available
+def residentMemory():
+    try:
+        with open('/proc/self/status') as statusFile:
+            memory = {line.split(':')[0]: int(line.split()[1]) * 1024 for line in statusFile
+                      if line.startswith(('VmRSS:', 'VmHWM:'))}
+        return memory['VmRSS'], memory['VmHWM']
+    except (OSError, KeyError, ValueError):
+        peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return peakRss, peakRss
+
+
+# Reset the peak resident memory of the process to the current memory, False where Linux does not allow it
+def resetPeakMemory():
+    try:
+        with open('/proc/self/clear_refs', 'w') as clearRefs:
+            clearRefs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# CPU time of the child processes that have ended
+def childCpuTime():
+    childUsage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return childUsage.ru_utime + childUsage.ru_stime
+
+
+# Append a record to the metrics file
+def appendMetrics(metricsFile, record):
+    metricsDirectory = os.path.dirname(metricsFile)
+    if metricsDirectory:
+        os.makedirs(metricsDirectory, exist_ok=True)
+    with open(metricsFile, 'a') as output:
+        print(json.dumps(record), file=output)
+    output.close()
+
+
+# Start the profiler of the profile option, None when the run is not profiled
+def startProfiler(profile):
+    if profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    elif profile == 'sample':
+        samples = Counter()
+
+        # Count the stack of the main thread, from the outermost call, each time the interval of CPU time has passed
+        def sampleStack(signalNumber, frame):
+            stack = []
+            while frame is not None:
+                stack.append(os.path.basename(frame.f_code.co_filename) + ':' + frame.f_code.co_name)
+                frame = frame.f_back
+            samples[';'.join(reversed(stack))] += 1
+
+        signal.signal(signal.SIGPROF, sampleStack)
+        signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+        return samples
+    return None
+
+
+# Stop the profiler and save the profile and its summary, the files of the profile are returned
+def stopProfiler(profiler, profile, profileDirectory, profileName):
+    if profiler is None:
+        return []
+
+    if profileDirectory:
+        os.makedirs(profileDirectory, exist_ok=True)
+    profilePrefix = os.path.join(profileDirectory, 'Profile.' + profileName)
+    if profile == 'cprofile':
+        profiler.disable()
+        profiler.dump_stats(profilePrefix + '.prof')
+        with open(profilePrefix + '.txt', 'w') as output:
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        output.close()
+        return [profilePrefix + '.prof', profilePrefix + '.txt']
+
+    signal.setitimer(signal.ITIMER_PROF, 0, 0)
+    signal.signal(signal.SIGPROF, signal.SIG_DFL)
+    samples = profiler
+    with open(profilePrefix + '.folded', 'w') as output:
+        for (stack, count) in samples.most_common():
+            print(stack + ' ' + str(count), file=output)
+    output.close()
+
+    # Samples of each function anywhere on the stack and at the top of the stack
+    totalSamples = Counter()
+    ownSamples = Counter()
+    for (stack, count) in samples.items():
+        functions = stack.split(';')
+        for function in set(functions):
+            totalSamples[function] += count
+        ownSamples[functions[-1]] += count
+    numberOfSamples = sum(samples.values())
+    with open(profilePrefix + '.txt', 'w') as output:
+        print("Samples: " + str(numberOfSamples) + " every " + str(SAMPLE_INTERVAL) + " seconds of CPU time",
+              file=output)
+        print("---------Functions with the Most Samples--------", file=output)
+        print("{:>10} {:>10}  {}".format('total %', 'own %', 'function'), file=output)
+        for (function, count) in totalSamples.most_common(PROFILE_TOP_FUNCTIONS):
+            print("{:>10.1f} {:>10.1f}  {}".format(100 * count / numberOfSamples,
+                                                   100 * ownSamples[function] / numberOfSamples, function), file=output)
+    output.close()
+    return [profilePrefix + '.folded', profilePrefix + '.txt']
@@ -0,0 +1,536 @@
+import pickle
+import numpy as np
+import pandas as pd
+from S0_HelperClassLibrary.Sketches import HyperLogLog, TDigest, SpaceSaving
+
+
+class ColumnProfile:
+    """
+    Mergeable summary of a single field that is built one chunk at a time.
+
+    The profile of a chunk is created with fromField and profiles are combined with merge, so chunks and files can be
+    profiled separately.  The following is kept:
+        - Type, length, and count of valid values
+        - Frequency of every value in order of first appearance, used for unique values, frequencies, histograms,
+          and quantiles
+        - Count, mean, sum of squared differences from the mean, min and max of numeric fields
+
+    The frequencies are exact, so the memory used grows with the number of unique values of a field rather than with
+    the number of records, and ApproximateColumnProfile is the profile of fixed size.  The frequencies of the chunks
+    are only grouped once they add up to the frequencies grouped so far, so each value is grouped a logarithmic number
+    of times rather than once for every chunk.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.dtype = None
+        self.length = 0
+        self.count = 0
+        self.groupedCounts = pd.Series([], dtype='int64')
+        self.pendingCounts = []
+        self.categories = None
+        self.numCount = 0
+        self.numMean = 0.0
+        self.numM2 = 0.0
+        self.numMin = np.nan
+        self.numMax = np.nan
+
+    @classmethod
+    def fromField(cls, field, **options):
+        # Profile of one chunk of a field
+        profile = cls(field.name, **options)
+        profile.dtype = field.dtype
+        profile.length = len(field.index)
+        profile.count = int(field.count())
+        if isinstance(field.dtype, pd.CategoricalDtype):
+            profile.categories = field.cat.categories
+        profile.countValues(field)
+
+        # Moments of numeric fields
+        if profile.isNumeric():
+            values = numericValues(field)
+            profile.numCount = len(values)
+            if profile.numCount > 0:
+                profile.numMean = values.mean()
+                profile.numM2 = ((values - profile.numMean) ** 2).sum()
+                profile.numMin = values.min()
+                profile.numMax = values.max()
+        return profile
+
+    def countValues(self, field):
+        # Frequencies of categories are kept by value so chunks with different categories can be merged.  Categories
+        # without records are kept with a frequency of 0 as pandas value_counts.
+        if isinstance(field.dtype, pd.CategoricalDtype):
+            valueCounts = field.astype(object).value_counts(sort=False)
+            unusedCategories = field.cat.categories.difference(valueCounts.index)
+            self.groupedCounts = pd.concat([valueCounts, pd.Series(0, index=unusedCategories.astype(object))])
+        else:
+            self.groupedCounts = field.value_counts(sort=False)
+
+    def update(self, field):
+        self.merge(type(self).fromField(field, **self.options()))
+        return self
+
+    def options(self):
+        return {}
+
+    def merge(self, other):
+        """
+        Combine the profile of another chunk or file of the same field into this profile.
+
+        Parameters
+        __________
+        other : ColumnProfile
+            The profile to combine.
+
+        Return
+        _______
+        self : ColumnProfile
+            The combined profile.
+        """
+        self.dtype = mergeTypes(self.dtype, other.dtype)
+        self.length += other.length
+        self.count += other.count
+        self.mergeValues(other)
+
+        if other.categories is not None:
+            self.categories = other.categories if self.categories is None else \
+                self.categories.union(other.categories)
+
+        # Combine moments with the parallel algorithm of Chan et al.
+        if other.numCount > 0:
+            if self.numCount == 0:
+                self.numCount, self.numMean, self.numM2 = other.numCount, other.numMean, other.numM2
+                self.numMin, self.numMax = other.numMin, other.numMax
+            else:
+                totalCount = self.numCount + other.numCount
+                delta = other.numMean - self.numMean
+                self.numMean = self.numMean + delta * other.numCount / totalCount
+                self.numM2 = self.numM2 + other.numM2 + delta ** 2 * self.numCount * other.numCount / totalCount
+                self.numCount = totalCount
+                self.numMin = min(self.numMin, other.numMin)
+                self.numMax = max(self.numMax, other.numMax)
+        return self
+
+    def mergeValues(self, other):
+        # Frequencies of other chunks wait until they add up to the frequencies grouped so far
+        if len(other.valueCounts.index) > 0:
+            self.pendingCounts.append(other.valueCounts)
+        if sum(len(valueCounts.index) for valueCounts in self.pendingCounts) >= len(self.groupedCounts.index):
+            self.groupCounts()
+
+    def groupCounts(self):
+        # Frequencies keep the order of first appearance
+        valueCounts = [counts for counts in [self.groupedCounts] + self.pendingCounts if len(counts.index) > 0]
+        if len(valueCounts) == 1:
+            self.groupedCounts = valueCounts[0]
+        elif len(valueCounts) > 1:
+            self.groupedCounts = pd.concat(valueCounts).groupby(level=0, sort=False).sum()
+        self.pendingCounts = []
+
+    @property
+    def valueCounts(self):
+        # Frequency of each value with the frequencies of every chunk grouped
+        if self.pendingCounts:
+            self.groupCounts()
+        return self.groupedCounts
+
+    def __setstate__(self, state):
+        # Profiles saved before the frequencies of the chunks were grouped in batches
+        if 'valueCounts' in state:
+            state['groupedCounts'] = state.pop('valueCounts')
+            state['pendingCounts'] = []
+        self.__dict__.update(state)
+
+    def isNumeric(self):
+        # Numbers and durations, as pandas describe
+        return self.dtype is not None and self.dtype.kind in 'iufm' and not isinstance(self.dtype, pd.CategoricalDtype)
+
+    def nunique(self):
+        return int((self.valueCounts > 0).sum())
+
+    def value_counts(self):
+        # Frequency of each value with the index type of the field, sorted by count as pandas value_counts
+        return self.frequencies().sort_values(ascending=False, kind='mergesort')
+
+    def frequencies(self):
+        # Frequency of each value in order of first appearance
+        return self.typedCounts(self.valueCounts)
+
+    def typedCounts(self, valueCounts):
+        # Counts as integers with the values in the type of the field
+        valueCounts = valueCounts.astype('int64')
+        if self.dtype is not None and not isinstance(self.dtype, pd.CategoricalDtype) and self.dtype != 'object':
+            valueCounts.index = valueCounts.index.astype(self.dtype)
+        valueCounts.name = self.name
+        return valueCounts
+
+    def distribution(self):
+        # Weight of each value for histograms
+        return self.frequencies()
+
+    def quantile(self, q):
+        # Quantile with linear interpolation from the frequencies, as numpy percentile
+        sortedCounts = self.frequencies().sort_index()
+        if self.dtype.kind == 'm':
+            values = sortedCounts.index.asi8.astype('float64')
+        else:
+            values = sortedCounts.index.to_numpy(dtype='float64')
+        cumulativeCounts = np.cumsum(sortedCounts.to_numpy())
+        position = (self.numCount - 1) * q
+        previousPosition = np.floor(position)
+        lower = values[np.searchsorted(cumulativeCounts, previousPosition, side='right')]
+        upper = values[np.searchsorted(cumulativeCounts, min(previousPosition + 1, self.numCount - 1), side='right')]
+        gamma = position - previousPosition
+        if gamma >= 0.5:
+            return upper - (upper - lower) * (1 - gamma)
+        return lower + (upper - lower) * gamma
+
+    def describe(self):
+        """
+        Summary statistics of a numeric field as pandas describe: count, mean, std, min, 25%, 50%, 75%, max.
+
+        Return
+        _______
+        summary : Series
+            The summary statistics.
+        """
+        summary = [float(self.numCount), np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan]
+        if self.numCount > 0:
+            summary[1] = self.numMean
+            summary[2] = np.sqrt(self.numM2 / (self.numCount - 1)) if self.numCount > 1 else np.nan
+            summary[3] = self.numMin
+            summary[4:7] = [self.quantile(q) for q in (0.25, 0.5, 0.75)]
+            summary[7] = self.numMax
+        statistics = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+        # Durations are truncated to whole nanoseconds and the count stays an integer as pandas describe
+        if self.dtype.kind == 'm':
+            summary = [self.numCount] + [pd.NaT if np.isnan(value) else pd.Timedelta(int(value), unit='ns')
+                                         for value in summary[1:]]
+            return pd.Series(summary, index=statistics, name=self.name)
+        return pd.Series(summary, index=statistics, name=self.name, dtype='float64')
+
+    def memoryUsage(self):
+        # Memory usage of the field without the contents of objects, as pandas memory_usage(deep=False)
+        if isinstance(self.dtype, pd.CategoricalDtype):
+            numCategories = len(self.categories)
+            codeSize = 1 if numCategories < 127 else 2 if numCategories < 32767 else 4 if numCategories < 2 ** 31 - 1 else 8
+            # The categories of a category type are checked to be unique, which builds their lookup table
+            return codeSize * self.length + pd.CategoricalDtype(self.categories).categories.memory_usage()
+        return self.dtype.itemsize * self.length
+
+
+class ApproximateColumnProfile(ColumnProfile):
+    """
+    Mergeable summary of a single field that keeps sketches in place of the frequency of every value, so the memory used
+    is fixed whatever the number of unique values.  The type, counts, and moments are exact as in ColumnProfile.  The
+    following are approximate:
+        - Unique values: HyperLogLog with a relative standard error of distinctError
+        - Quantiles and histograms of numeric and date fields: t-digest with a rank error of about quantileError
+        - Frequencies: Space-Saving most frequent values, overcounting by at most frequencyError of the valid values
+
+    Unique values and frequencies are exact when the field has less unique values than 1 / frequencyError.
+    """
+
+    def __init__(self, name, distinctError=0.01, quantileError=0.01, frequencyError=0.001):
+        super().__init__(name)
+        self.distinctError = distinctError
+        self.quantileError = quantileError
+        self.frequencyError = frequencyError
+        self.distinct = HyperLogLog.fromRelativeError(distinctError)
+        self.digest = TDigest.fromRankError(quantileError)
+        self.heavyHitters = SpaceSaving.fromFrequencyError(frequencyError)
+
+    def options(self):
+        return {'distinctError': self.distinctError, 'quantileError': self.quantileError,
+                'frequencyError': self.frequencyError}
+
+    def countValues(self, field):
+        self.distinct.update(field)
+        if isinstance(field.dtype, pd.CategoricalDtype):
+            self.heavyHitters.update(field.astype(object))
+        else:
+            self.heavyHitters.update(field)
+            if field.dtype.kind in 'iufmM':
+                self.digest.update(numericValues(field))
+
+    def mergeValues(self, other):
+        self.distinct.merge(other.distinct)
+        self.digest.merge(other.digest)
+        self.heavyHitters.merge(other.heavyHitters)
+
+    def nunique(self):
+        # Exact when every value is kept by the most frequent values
+        if self.heavyHitters.isExact():
+            return len(self.heavyHitters.counts.index)
+        return int(round(self.distinct.estimate()))
+
+    def frequencies(self):
+        # Most frequent values, the counts are upper bounds
+        return self.typedCounts(self.heavyHitters.counts)
+
+    def distribution(self):
+        # Centroids of the digest with the values in the type of the field
+        if len(self.digest.means) == 0:
+            return self.frequencies()
+        centroids = self.digest.centroids()
+        if self.dtype.kind == 'M':
+            centroids.index = pd.to_datetime(centroids.index.astype('int64'))
+        elif self.dtype.kind == 'm':
+            centroids.index = pd.to_timedelta(centroids.index.astype('int64'))
+        centroids.name = self.name
+        return centroids
+
+    def quantile(self, q):
+        return self.digest.quantile(q)
+
+
+class DatasetProfile:
+    """
+    Mergeable summary of a dataset that is built one chunk at a time.
+
+    The profile keeps a ColumnProfile for every field and the first records.  It provides shape, info, describe, and
+    head as a DataFrame does, so it can be passed to datasetShapeInfo and datasetSummary in place of the full dataset.
+    With sketchErrors, an ApproximateColumnProfile is kept for every field instead.  The ids of the batches merged into
+    a saved profile are kept in appliedBatches.
+    """
+
+    def __init__(self, sketchErrors=None):
+        self.columnProfiles = {}
+        self.nrows = 0
+        self.headRecords = None
+        self.sketchErrors = sketchErrors
+        self.appliedBatches = []
+
+    @classmethod
+    def fromChunk(cls, chunk, sketchErrors=None):
+        profile = cls(sketchErrors)
+        profile.nrows = len(chunk.index)
+        profile.headRecords = chunk.head().reset_index(drop=True)
+        for column in chunk:
+            if sketchErrors is None:
+                profile.columnProfiles[column] = ColumnProfile.fromField(chunk[column])
+            else:
+                profile.columnProfiles[column] = ApproximateColumnProfile.fromField(chunk[column], **sketchErrors)
+        return profile
+
+    def update(self, chunk):
+        self.merge(DatasetProfile.fromChunk(chunk, self.sketchErrors))
+        return self
+
+    def merge(self, other):
+        """
+        Combine the profile of another chunk or file of the same dataset into this profile.
+
+        Parameters
+        __________
+        other : DatasetProfile
+            The profile to combine.
+
+        Return
+        _______
+        self : DatasetProfile
+            The combined profile.
+        """
+        for column, columnProfile in other.columnProfiles.items():
+            if column in self.columnProfiles:
+                self.columnProfiles[column].merge(columnProfile)
+            else:
+                self.columnProfiles[column] = columnProfile
+
+        # Keep the first 5 records
+        if self.headRecords is None:
+            self.headRecords = other.headRecords
+        elif len(self.headRecords.index) < 5 and other.headRecords is not None:
+            self.headRecords = pd.concat([self.headRecords, other.headRecords], ignore_index=True).head()
+        self.nrows += other.nrows
+        self.appliedBatches = self.appliedBatches + other.appliedBatches
+        return self
+
+    def __setstate__(self, state):
+        # Profiles saved before the batches were recorded
+        state.setdefault('appliedBatches', [])
+        self.__dict__.update(state)
+
+    def __iter__(self):
+        return iter(self.columnProfiles)
+
+    def __getitem__(self, column):
+        return self.columnProfiles[column]
+
+    @property
+    def shape(self):
+        return self.nrows, len(self.columnProfiles)
+
+    def head(self, n=5):
+        # First records with the types of the full dataset
+        headRecords = self.headRecords.head(n)
+        for column in headRecords:
+            dtype = self.columnProfiles[column].dtype
+            if not isinstance(dtype, pd.CategoricalDtype) and headRecords[column].dtype != dtype:
+                headRecords = headRecords.astype({column: dtype})
+        return headRecords
+
+    def describe(self):
+        # Summary statistics of the numeric fields
+        summaries = [profile.describe() for profile in self.columnProfiles.values() if profile.isNumeric()]
+        return pd.concat(summaries, axis=1)
+
+    def info(self, buf=None):
+        """
+        Print a summary of the dataset in the layout of pandas DataFrame.info: the index, the fields with their count
+        of valid values and type, the count of each type, and the memory usage.
+
+        Parameters
+        __________
+        buf : writable buffer
+            Where to send the output.  Defaults to sys.stdout.
+        """
+        lines = ["<class 'pandas.core.frame.DataFrame'>"]
+        if self.nrows > 0:
+            lines.append("RangeIndex: " + str(self.nrows) + " entries, 0 to " + str(self.nrows - 1))
+        else:
+            lines.append("RangeIndex: 0 entries")
+
+        columnProfiles = list(self.columnProfiles.values())
+        if len(columnProfiles) == 0:
+            lines.append("Empty DataFrame\n")
+        elif len(columnProfiles) > pd.get_option("display.max_info_columns"):
+            lines.append("Columns: " + str(len(columnProfiles)) + " entries, " + str(columnProfiles[0].name) +
+                         " to " + str(columnProfiles[-1].name))
+        else:
+            # Counts are only shown for datasets with less records than the pandas option, as DataFrame.info
+            lines.append("Data columns (total " + str(len(columnProfiles)) + " columns):")
+            withCounts = self.nrows <= pd.get_option("display.max_info_rows")
+            headers = [" # ", "Column", "Non-Null Count", "Dtype"] if withCounts else [" # ", "Column", "Dtype"]
+            rows = []
+            for number, profile in enumerate(columnProfiles):
+                row = [" " + str(number), str(profile.name)]
+                if withCounts:
+                    row.append(str(profile.count) + " non-null")
+                row.append(str(profile.dtype))
+                rows.append(row)
+            widths = [max(len(header), *[len(row[i]) for row in rows]) for i, header in enumerate(headers)]
+            lines.append("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+            lines.append("  ".join(("-" * len(header)).ljust(width) for header, width in zip(headers, widths)))
+            for row in rows:
+                lines.append("  ".join(value[:width].ljust(width) for value, width in zip(row, widths)))
+
+        if len(columnProfiles) > 0:
+            dtypeCounts = {}
+            for profile in columnProfiles:
+                dtypeCounts[profile.dtype.name] = dtypeCounts.get(profile.dtype.name, 0) + 1
+            lines.append("dtypes: " + ", ".join(name + "(" + str(count) + ")" for name, count in sorted(dtypeCounts.items())))
+            memoryUsage = pd.RangeIndex(self.nrows).memory_usage() + sum(profile.memoryUsage() for profile in columnProfiles)
+            lines.append("memory usage: " + sizeFormat(memoryUsage, "+" if "object" in dtypeCounts else "") + "\n")
+
+        if buf is None:
+            import sys
+            buf = sys.stdout
+        buf.write("\n".join(lines))
+        return
+
+
+# Profile a dataset one chunk at a time
+def profileDataset(chunkedData, sketchErrors=None, batchId=None):
+    """
+    Build the profile of a dataset from its chunks.  Only one chunk is held in memory at a time.
+
+    Parameters
+    __________
+    chunkedData : iterable of DataFrame
+        The chunks of the dataset.  Example: loadDatasetChunks(inputFile)
+    sketchErrors : dict
+        The errors of the sketches of an approximate profile.  The profile is exact when None.
+        Example: {'distinctError': 0.01, 'quantileError': 0.01, 'frequencyError': 0.001}
+    batchId : str
+        The id of the dataset kept in appliedBatches, so that it cannot be added again as a batch.  Example: the hash of
+        the file
+
+    Return
+    _______
+    profile : DatasetProfile
+        The profile of the dataset.
+    """
+    profile = DatasetProfile(sketchErrors)
+    for chunk in chunkedData:
+        profile.update(chunk)
+    if batchId is not None:
+        profile.appliedBatches.append(batchId)
+    return profile
+
+
+# Add a new batch of records to the saved profile of a dataset
+def appendToProfile(stateFile, chunkedData, sketchErrors=None, batchId=None):
+    """
+    Profile a new batch of records and merge it into the saved profile of the records before it.  The profile is the
+    same as the profile of the dataset with the batch appended, as the profiles of the chunks are merged in order.  A
+    batch whose id is already in the appliedBatches of the saved profile is refused.
+
+    Parameters
+    __________
+    stateFile : str
+        The file of the saved profile.  Example: Output/State.transactions.SummaryStats.pkl
+    chunkedData : iterable of DataFrame
+        The chunks of the new batch.  Example: loadDatasetChunks(inputFile)
+    sketchErrors : dict
+        The errors of the sketches of an approximate profile.  They have to be the errors of the saved profile.
+    batchId : str
+        The id of the batch.  Example: the hash of the batch file
+
+    Return
+    _______
+    profile : DatasetProfile
+        The profile of the dataset with the batch appended.
+    """
+    profile = loadProfile(stateFile)
+    if profile.sketchErrors != sketchErrors:
+        raise ValueError("The saved profile was built with other sketch errors: " + str(profile.sketchErrors))
+    if batchId is not None and batchId in profile.appliedBatches:
+        raise ValueError("The batch has already been added to the saved profile: " + batchId)
+    return profile.merge(profileDataset(chunkedData, sketchErrors, batchId))
+
+
+def saveProfile(profile, stateFile):
+    with open(stateFile, 'wb') as output:
+        pickle.dump(profile, output)
+    output.close()
+
+    return
+
+
+def loadProfile(stateFile):
+    with open(stateFile, 'rb') as stateInput:
+        return pickle.load(stateInput)
+
+
+# Values of a numeric, duration, or date field as floats, durations and dates in nanoseconds
+def numericValues(field):
+    values = field.dropna().to_numpy()
+    if field.dtype.kind in 'mM':
+        return values.view('int64').astype('float64')
+    return values.astype('float64')
+
+
+# Type of a field that is made of chunks with different types, as pandas concat
+def mergeTypes(dtype1, dtype2):
+    if dtype1 is None:
+        return dtype2
+    elif dtype2 is None or dtype1 == dtype2:
+        return dtype1
+    elif isinstance(dtype1, pd.CategoricalDtype) and isinstance(dtype2, pd.CategoricalDtype):
+        return pd.CategoricalDtype(dtype1.categories.union(dtype2.categories))
+    elif dtype1.kind in 'iuf' and dtype2.kind in 'iuf' and not isinstance(dtype1, pd.CategoricalDtype) \
+            and not isinstance(dtype2, pd.CategoricalDtype):
+        return np.result_type(dtype1, dtype2)
+    return np.dtype('object')
+
+
+# Size in human readable format, as pandas info
+def sizeFormat(num, sizeQualifier):
+    for unit in ["bytes", "KB", "MB", "GB", "TB"]:
+        if num < 1024.0:
+            return f"{num:3.1f}{sizeQualifier} {unit}"
+        num /= 1024.0
+    return f"{num:3.1f}{sizeQualifier} PB"
@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+
+
+MERCHANT_CATEGORY_CODES = ['airline', 'auto', 'cable / phone', 'entertainment', 'fastfood', 'food', 'food_delivery',
+                           'fuel', 'furniture', 'gym', 'health', 'hotels', 'mobileapps', 'online_gifts',
+                           'online_retail', 'online_subscriptions', 'personal care', 'rideshare', 'subscriptions']
+
+
+# Create a synthetic transactions dataset for benchmarking
+def createSyntheticTransactions(nrows, seed=0, sort=True):
+    """
+    Create a synthetic dataset with the fields of the transactions dataset used by the pipeline stages.
+
+    About 2% of the records are repeated as multi-swipes (same amount and merchant within a minute) and about 2% as
+    reversals (same amount and merchant within a month) so the duplicate logic has work to do.
+
+    Parameters
+    __________
+    nrows : int
+        The number of transactions to generate.
+    seed : int
+        The seed of the random number generator.
+    sort : bool
+        Sort by customer id, account number, transaction amount, and transaction date-time as SortData.py does.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The synthetic transactions.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Generate the base transactions, ~150 transactions per customer as in the transactions dataset
+    numBase = nrows - 2 * (nrows // 50)
+    numCustomers = max(1, nrows // 150)
+    customerId = rng.integers(100000000, 100000000 + numCustomers, numBase)
+    transactionDateTime = np.datetime64('2016-01-01T00:00:00') + \
+        rng.integers(0, 366 * 24 * 60 * 60, numBase).astype('timedelta64[s]')
+    baseData = pd.DataFrame({
+        'accountNumber': customerId,
+        'customerId': customerId,
+        'creditLimit': rng.choice([250, 500, 1000, 5000, 7500, 10000, 15000, 20000, 50000], numBase),
+        'availableMoney': np.round(rng.uniform(0, 50000, numBase), 2),
+        'transactionDateTime': transactionDateTime,
+        'transactionAmount': np.round(rng.exponential(100, numBase), 2),
+        'merchantName': np.char.add('Merchant #', rng.integers(0, 2500, numBase).astype(str)).astype(object),
+        'acqCountry': rng.choice(['US', 'US', 'US', 'US', 'MEX', 'CAN', 'PR', ''], numBase),
+        'merchantCountryCode': rng.choice(['US', 'US', 'US', 'US', 'MEX', 'CAN', 'PR', ''], numBase),
+        'posEntryMode': rng.choice(['02', '05', '09', '80', '90', ''], numBase),
+        'posConditionCode': rng.choice(['01', '08', '99', ''], numBase),
+        'merchantCategoryCode': rng.choice(MERCHANT_CATEGORY_CODES, numBase),
+        'currentExpDate': pd.Series(np.datetime64('2020-01') +
+                                    rng.integers(0, 180, numBase).astype('timedelta64[M]')).dt.strftime('%m/%Y'),
+        'accountOpenDate': pd.Series(np.datetime64('2010-01-01') +
+                                     rng.integers(0, 2190, numBase).astype('timedelta64[D]')).dt.strftime('%Y-%m-%d'),
+        'cardCVV': rng.integers(100, 1000, numBase),
+        'cardLast4Digits': rng.integers(0, 10000, numBase),
+        'transactionType': rng.choice(['PURCHASE'] * 30 + ['ADDRESS_VERIFICATION', ''], numBase),
+        'currentBalance': np.round(rng.uniform(0, 50000, numBase), 2),
+        'cardPresent': rng.random(numBase) < 0.45,
+        'expirationDateKeyInMatch': rng.random(numBase) < 0.01,
+        'isFraud': rng.random(numBase) < 0.016,
+    })
+    baseData['dateOfLastAddressChange'] = baseData['accountOpenDate']
+    baseData['enteredCVV'] = np.where(rng.random(numBase) < 0.99, baseData['cardCVV'], rng.integers(100, 1000, numBase))
+
+    # Repeat a sample of purchases as multi-swipes within a minute and as reversals within a month
+    multiSwipes = baseData.sample(nrows // 50, random_state=seed)
+    multiSwipes['transactionType'] = 'PURCHASE'
+    multiSwipes['transactionDateTime'] = multiSwipes['transactionDateTime'] + \
+        pd.to_timedelta(rng.integers(1, 60, len(multiSwipes)), unit='s')
+    reversals = baseData.sample(nrows // 50, random_state=seed + 1)
+    reversals['transactionType'] = 'REVERSAL'
+    reversals['transactionDateTime'] = reversals['transactionDateTime'] + \
+        pd.to_timedelta(rng.integers(60, 28 * 24 * 60 * 60, len(reversals)), unit='s')
+    transactionData = pd.concat([baseData, multiSwipes, reversals], ignore_index=True)
+
+    # Transaction date-time is a string in the transactions dataset
+    transactionData['transactionDateTime'] = transactionData['transactionDateTime'].dt.strftime('%Y-%m-%dT%H:%M:%S')
+
+    if sort:
+        transactionData = transactionData.sort_values(["customerId", "accountNumber", "transactionAmount",
+                                                       "transactionDateTime"], ignore_index=True)
+
+    return transactionData
@@ -0,0 +1,421 @@
+import pickle
+import pandas as pd
+import numpy as np
+from S0_HelperClassLibrary.ParallelColumns import mapPartitions
+from S0_HelperClassLibrary.DatasetLoader import concatChunks
+from S0_HelperClassLibrary.TransactionKeys import KEY_COLUMNS
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+# Order of the records compared by the duplicate logic, as sorted by SortData.py
+SORT_KEYS = ["customerId", "accountNumber", "transactionAmount", "transactionDateTime"]
+
+# Fields of the earlier records kept in the state of the incremental mode, the key identifies the records tagged again
+STATE_FIELDS = KEY_COLUMNS + SORT_KEYS + ['merchantName', 'transactionType', 'gTransactionDateTime']
+
+# Fields generated by the duplicate logic
+DUPLICATE_FIELDS = ['gIndChangeInCustomerId', 'gIndDuplicateTransaction', 'gIndMerchNameMatch',
+                    'gChangeInTransactionAmount', 'gChangeInTransactionTime', 'gChangeInTransactionTimeMonths',
+                    'gChangeInTransactionTimeDays', 'gChangeInTransactionTimeMinutes']
+
+
+# Tag duplicate transactions using column operations on the sorted data
+@timedStep()
+def tagDuplicateTransactions(transactionData):
+    """
+    Add the difference from previous transaction fields and the duplicate transaction tag to a dataset.
+
+    The dataset is expected to be sorted by customer id, account number, transaction amount, and transaction date-time.
+    Each transaction is compared with the record directly before it.  When the customer id changes, there is no
+    previous transaction and the difference fields are left empty.  The previous record is found with a shift of
+    each column, so the whole dataset is processed with a handful of vectorized operations.
+
+    Duplicates are defined as:
+        - Multiple swipes of purchases within 1 minute
+        - Reversals of purchase transactions within 1 month
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Sorted transactions with customerId, transactionAmount, merchantName, transactionType and
+        gTransactionDateTime.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The same dataset with the g fields for duplicate transactions added.
+    """
+    customerId = transactionData['customerId'].to_numpy()
+    transactionAmount = transactionData['transactionAmount'].to_numpy(dtype='float64')
+    merchantName = transactionData['merchantName'].to_numpy(dtype='object')
+    transactionDateTime = transactionData['gTransactionDateTime'].to_numpy(dtype='datetime64[ns]')
+    transactionType = transactionData['transactionType'].to_numpy(dtype='object')
+
+    # Identify the first record of every customer.  The first record has no previous customer.
+    sameCustomer = np.zeros(len(customerId), dtype=bool)
+    sameCustomer[1:] = customerId[1:] == customerId[:-1]
+
+    # Merchant name only matches when the previous record belongs to the same customer
+    merchNameMatch = np.zeros(len(merchantName), dtype=bool)
+    merchNameMatch[1:] = merchantName[1:] == merchantName[:-1]
+    merchNameMatch &= sameCustomer
+
+    # Calculate differences from the previous record, empty when customer id changes
+    changeInTransactionAmount = np.full(len(transactionAmount), np.nan)
+    changeInTransactionAmount[1:] = transactionAmount[1:] - transactionAmount[:-1]
+    changeInTransactionAmount[~sameCustomer] = np.nan
+
+    changeInTransactionTime = np.full(len(transactionDateTime), np.timedelta64('NaT'), dtype='timedelta64[ns]')
+    changeInTransactionTime[1:] = transactionDateTime[1:] - transactionDateTime[:-1]
+    changeInTransactionTime[~sameCustomer] = np.timedelta64('NaT')
+    changeInTransactionTime = pd.Series(changeInTransactionTime, index=transactionData.index)
+
+    changeInTransactionTimeMonths = (changeInTransactionTime / np.timedelta64(1, "M")).to_numpy()
+    changeInTransactionTimeDays = (changeInTransactionTime / np.timedelta64(1, "D")).to_numpy()
+    changeInTransactionTimeMinutes = (changeInTransactionTime / np.timedelta64(1, "m")).to_numpy()
+
+    # Comparisons against empty differences are false, so the first record of a customer is never a duplicate
+    sameAmountAndMerchant = sameCustomer & (changeInTransactionAmount == 0) & merchNameMatch
+
+    # Reversals are duplicates of purchases and can occur within 1 month
+    indReversalDuplicate = (transactionType == 'REVERSAL') & sameAmountAndMerchant & \
+        (changeInTransactionTimeMonths <= 1) & (changeInTransactionTimeMonths >= 0)
+
+    # Duplicate purchases are multiple swipes and occur within 1 minute
+    indPurchaseDuplicate = (transactionType == 'PURCHASE') & sameAmountAndMerchant & \
+        (changeInTransactionTimeMinutes <= 1) & (changeInTransactionTimeMinutes >= 0)
+
+    # Add fields to the dataframe, g fields are generated
+    transactionData['gIndChangeInCustomerId'] = np.where(sameCustomer, 'False', 'True').astype(object)
+    transactionData['gIndDuplicateTransaction'] = np.where(indReversalDuplicate | indPurchaseDuplicate, 'True', 'False').astype(object)
+    transactionData['gIndMerchNameMatch'] = np.where(merchNameMatch, 'True', 'False').astype(object)
+    transactionData['gChangeInTransactionAmount'] = changeInTransactionAmount
+    transactionData['gChangeInTransactionTime'] = changeInTransactionTime
+    transactionData['gChangeInTransactionTimeMonths'] = changeInTransactionTimeMonths
+    transactionData['gChangeInTransactionTimeDays'] = changeInTransactionTimeDays
+    transactionData['gChangeInTransactionTimeMinutes'] = changeInTransactionTimeMinutes
+
+    return transactionData
+
+
+# Sort and tag duplicate transactions of each customer partition with a pool of processes
+@timedStep()
+def tagDuplicateTransactionsPartitioned(transactionData, partitions, workers=1):
+    """
+    Sort a dataset by SORT_KEYS and add the duplicate transaction fields of tagDuplicateTransactions, with the
+    customers split into partitions that are sorted and tagged in separate processes.
+
+    Duplicates are only searched within a customer, so the records are hash partitioned by customer id and each
+    partition is sorted and tagged on its own.  The dataset does not need to be sorted beforehand.  Only the generated
+    fields are returned by the processes.  The partitions are appended and put in order of customer id with a stable
+    sort of the customer id alone, so the records are in the order of SortData.py and the fields are the same as
+    tagDuplicateTransactions of the sorted dataset.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Transactions with the SORT_KEYS, merchantName, transactionType and gTransactionDateTime.
+    partitions : int
+        The number of customer partitions.
+    workers : int
+        The number of processes.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The sorted dataset with the g fields for duplicate transactions added.
+    """
+    columns = SORT_KEYS + ['merchantName', 'transactionType', 'gTransactionDateTime']
+    duplicateFields = pd.concat(mapPartitions(tagPartition, transactionData, 'customerId', partitions, workers,
+                                              columns=columns))
+
+    # Customers are in a single partition, so ordering by customer id keeps the sorted records of each customer
+    customerId = transactionData['customerId'].to_numpy()[duplicateFields.index]
+    duplicateFields = duplicateFields.iloc[np.argsort(customerId, kind='stable')]
+
+    transactionData = transactionData.take(duplicateFields.index).reset_index(drop=True)
+    for column in DUPLICATE_FIELDS:
+        transactionData[column] = duplicateFields[column].to_numpy()
+
+    return transactionData
+
+
+# Sort and tag the records of 1 partition, the generated fields are returned with the position of each record
+def tagPartition(partitionData):
+    partitionData = tagDuplicateTransactions(partitionData.sort_values(SORT_KEYS, kind='mergesort'))
+    return partitionData[DUPLICATE_FIELDS]
+
+
+# Tag duplicates of a new batch of transactions with the state of the earlier records of its customers
+def appendDuplicateTransactions(duplicateState, batchData, batchId):
+    """
+    Tag duplicates of a new batch of transactions from the earlier records of its customers kept in a state, without
+    reading the earlier dataset again.
+
+    A transaction of the batch can be placed anywhere in the sorted records of its customer, as the records are
+    sorted by transaction amount before transaction date-time, so the state keeps the STATE_FIELDS of every earlier
+    record in sorted order rather than the last transaction of each customer.  The earlier records of the customers of
+    the batch are found in the state with a binary search of the customer id, and only they are sorted and tagged with
+    the batch.  The records of the batch are placed after the earlier records, so records with the same sort keys keep
+    the order of the dataset with the batch appended.
+
+    An earlier record is tagged again when a record of the batch is placed directly before it.  These records are
+    returned with their new g fields, so that with the batch they give the same g fields as SortData.py and
+    tagDuplicateTransactions of the dataset with the batch appended.  The batches added to the state are recorded by
+    batchId, and a batch that has already been added is refused.
+
+    Parameters
+    __________
+    duplicateState : dict
+        The state of the earlier records from duplicateStateOf or an earlier batch.
+    batchData : DataFrame
+        The new transactions with the fields of the dataset before tagging, including gTransactionDateTime.
+    batchId : str
+        The id of the batch.  Example: the hash of the batch file
+
+    Return
+    _______
+    batchData : DataFrame
+        The sorted batch with the g fields for duplicate transactions.
+    retaggedData : DataFrame
+        The STATE_FIELDS and g fields for duplicate transactions of the earlier records whose previous record is now a
+        record of the batch, in sorted order.
+    duplicateState : dict
+        The state with the batch added.
+    """
+    if batchId in duplicateState['appliedBatches']:
+        raise ValueError("The batch has already been added to the state: " + batchId)
+
+    stateRecords = duplicateState['records']
+    stateFields = [column for column in stateRecords if column in batchData]
+
+    # Positions of the earlier records of the customers of the batch, the state is sorted by customer id
+    stateCustomerId = stateRecords['customerId'].to_numpy()
+    batchCustomerId = np.unique(batchData['customerId'].to_numpy())
+    customerStart = np.searchsorted(stateCustomerId, batchCustomerId, side='left')
+    customerLength = np.searchsorted(stateCustomerId, batchCustomerId, side='right') - customerStart
+    earlierPositions = np.repeat(customerStart - np.cumsum(customerLength) + customerLength, customerLength) + \
+        np.arange(customerLength.sum())
+
+    # Sort and tag the customers of the batch with their earlier records
+    numberOfEarlier = len(earlierPositions)
+    batchCustomerData = concatChunks([stateRecords[stateFields].take(earlierPositions).reset_index(drop=True),
+                                      batchData[stateFields].reset_index(drop=True)])
+    batchCustomerData = tagDuplicateTransactions(batchCustomerData.sort_values(SORT_KEYS, kind='mergesort'))
+    origin = batchCustomerData.index.to_numpy()
+    isBatch = origin >= numberOfEarlier
+
+    # Earlier records directly after a record of the batch of the same customer have a new previous record
+    isRetagged = np.zeros(len(origin), dtype=bool)
+    isRetagged[1:] = ~isBatch[1:] & isBatch[:-1]
+    isRetagged &= (batchCustomerData['gIndChangeInCustomerId'] == 'False').to_numpy()
+    retaggedData = batchCustomerData[isRetagged].reset_index(drop=True)
+
+    # Batch records in sorted order with their g fields
+    sortedBatchData = batchData.take(origin[isBatch] - numberOfEarlier).reset_index(drop=True)
+    for column in DUPLICATE_FIELDS:
+        sortedBatchData[column] = batchCustomerData[column].to_numpy()[isBatch]
+
+    # Customers are in one of the 2 parts, so ordering by customer id keeps the sorted records of each customer
+    isBatchCustomer = np.zeros(len(stateCustomerId) + 1, dtype='int64')
+    np.add.at(isBatchCustomer, customerStart, 1)
+    np.add.at(isBatchCustomer, customerStart + customerLength, -1)
+    keptRecords = stateRecords[np.cumsum(isBatchCustomer)[:-1] == 0]
+    stateRecords = concatChunks([keptRecords.reset_index(drop=True),
+                                 batchCustomerData[stateFields].reset_index(drop=True)])
+    stateRecords = stateRecords.take(np.argsort(stateRecords['customerId'].to_numpy(), kind='stable')) \
+        .reset_index(drop=True)
+
+    return sortedBatchData, retaggedData, {'records': stateRecords,
+                                           'appliedBatches': duplicateState['appliedBatches'] + [batchId]}
+
+
+# Merge a sorted and tagged batch into the sorted chunks of the earlier records, with the records tagged again updated
+def mergeTaggedBatch(chunkedData, batchData, retaggedData=None):
+    """
+    Merge the sorted batch of appendDuplicateTransactions, e.g. with the features of AddFeatures.py added, into the
+    sorted chunks of a dataset of the earlier records, one chunk at a time.
+
+    The earlier records tagged again by the batch are found by their KEY_COLUMNS and take the g fields for duplicate
+    transactions of retaggedData.  Each chunk is merged with the records of the batch of the same customers, so the
+    records of the last customer of a chunk are held back until the next chunk.  The records of the batch are placed
+    after the earlier records with the same sort keys.  The appended chunks are the same as the dataset of SortData.py
+    and tagDuplicateTransactions of the dataset with the batch appended, with the fields of the batch.
+
+    Parameters
+    __________
+    chunkedData : iterable of DataFrame
+        The chunks of the dataset of the earlier records, sorted by SORT_KEYS.  Example: loadDatasetChunks(outputFile)
+    batchData : DataFrame
+        The sorted batch with the g fields for duplicate transactions and the same fields as the earlier records.
+    retaggedData : DataFrame
+        The KEY_COLUMNS and g fields for duplicate transactions of the earlier records tagged again.
+
+    Return
+    _______
+    transactionData : DataFrame
+        Generator of the sorted chunks of the dataset with the batch.
+    """
+    retaggedIndex = None
+    if retaggedData is not None and len(retaggedData.index) > 0:
+        retaggedIndex = pd.MultiIndex.from_frame(retaggedData[KEY_COLUMNS])
+
+    batchData = batchData.reset_index(drop=True)
+    batchCustomerId = batchData['customerId'].to_numpy()
+    batchStart = 0
+    heldData = None
+    for chunk in chunkedData:
+        if len(chunk.index) == 0:
+            continue
+        chunk = chunk.reset_index(drop=True)
+
+        # Earlier records tagged again take the g fields of the batch
+        if retaggedIndex is not None:
+            positions = retaggedIndex.get_indexer(pd.MultiIndex.from_frame(chunk[KEY_COLUMNS]))
+            isRetagged = positions >= 0
+            for column in DUPLICATE_FIELDS:
+                values = chunk[column].to_numpy(copy=True)
+                values[isRetagged] = retaggedData[column].to_numpy()[positions[isRetagged]]
+                chunk[column] = values
+
+        # The records of the last customer can continue in the next chunk
+        if heldData is not None:
+            chunk = concatChunks([heldData, chunk])
+        customerId = chunk['customerId'].to_numpy()
+        isComplete = customerId != customerId[-1]
+        heldData = chunk[~isComplete].reset_index(drop=True)
+        if isComplete.any():
+            batchStop = np.searchsorted(batchCustomerId, customerId[isComplete][-1], side='right')
+            yield mergeCustomers(chunk[isComplete].reset_index(drop=True), batchData.iloc[batchStart:batchStop])
+            batchStart = batchStop
+
+    earlierData = heldData if heldData is not None else batchData.iloc[:0]
+    yield mergeCustomers(earlierData, batchData.iloc[batchStart:])
+
+
+# Sorted records of the same customers from the earlier records and the batch, earlier records first
+def mergeCustomers(earlierData, batchData):
+    return concatChunks([earlierData, batchData.reset_index(drop=True)]).sort_values(SORT_KEYS, kind='mergesort') \
+        .reset_index(drop=True)
+
+
+# State of the sorted and tagged records needed to tag the duplicates of later batches
+def duplicateStateOf(transactionData, batchId):
+    stateFields = [column for column in STATE_FIELDS if column in transactionData]
+    return {'records': transactionData[stateFields].reset_index(drop=True), 'appliedBatches': [batchId]}
+
+
+def saveDuplicateState(duplicateState, stateFile):
+    with open(stateFile, 'wb') as output:
+        pickle.dump(duplicateState, output)
+    output.close()
+
+    return
+
+
+def loadDuplicateState(stateFile):
+    with open(stateFile, 'rb') as stateInput:
+        return pickle.load(stateInput)
+
+
+# Tag duplicate transactions by iterating over each record
+def tagDuplicateTransactionsIterrows(transactionData):
+    """
+    Reference implementation of tagDuplicateTransactions that retains information from the previous record with
+    iterrows.  It is kept to validate and benchmark the vectorized implementation.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Sorted transactions with customerId, transactionAmount, merchantName, transactionType and
+        gTransactionDateTime.
+
+    Return
+    _______
+    transactionData : DataFrame
+        The same dataset with the g fields for duplicate transactions added.
+    """
+    # Create empty lists
+    indChangeInCustomerIdList = []
+    indDuplicateTransactionList = []
+    indMerchNameMatchList = []
+    changeInTransactionAmountList = []
+    changeInTransactionTimeList = []
+    changeInTransactionTimeMonthsList = []
+    changeInTransactionTimeDaysList = []
+    changeInTransactionTimeMinutesList = []
+
+    # Initialize customer references
+    previousCustomerId = 0
+
+    for index, row in transactionData.iterrows():
+        # If customer id from this row doesn't match previous customer id, no changes exist in fields of interest.
+        if row['customerId'] != previousCustomerId:
+            indChangeInCustomerId = 'True'
+            indMerchNameMatch = 'False'
+            changeInTransactionAmount = None
+            changeInTransactionTime = None
+            changeInTransactionTimeMonths = None
+            changeInTransactionTimeDays = None
+            changeInTransactionTimeMinutes = None
+        # If customer id from this row does match previous customer id, calculate differences in fields of interest.
+        elif row['customerId'] == previousCustomerId:
+            indChangeInCustomerId = 'False'
+            changeInTransactionAmount = row['transactionAmount'] - previousTransactionAmount
+            if row['merchantName'] == previousMerchantName:
+                indMerchNameMatch = 'True'
+            else:
+                indMerchNameMatch = 'False'
+            changeInTransactionTime = row['gTransactionDateTime'] - previousTransactionDateTime
+            changeInTransactionTimeMonths = changeInTransactionTime / np.timedelta64(1, "M")
+            changeInTransactionTimeDays = changeInTransactionTime / np.timedelta64(1, "D")
+            changeInTransactionTimeMinutes = changeInTransactionTime / np.timedelta64(1, "m")
+
+        # Transaction processed, set previous values for processing of next record
+        previousCustomerId = row['customerId']
+        previousTransactionAmount = row['transactionAmount']
+        previousMerchantName = row['merchantName']
+        previousTransactionDateTime = row['gTransactionDateTime']
+
+        # Flag duplicate transactions, set default to false
+        indDuplicateTransaction = 'False'
+
+        # Reversals are duplicates of purchases and can occur within 1 month
+        if row['transactionType'] == 'REVERSAL':
+            if indChangeInCustomerId == 'False' and \
+                changeInTransactionAmount == 0 and \
+                indMerchNameMatch == 'True' and \
+                changeInTransactionTimeMonths <= 1 and \
+                changeInTransactionTimeMonths >= 0:
+                indDuplicateTransaction = 'True'
+
+        # Duplicate purchases are multiple swipes and occur within 1 minute
+        elif row['transactionType'] == 'PURCHASE':
+            if indChangeInCustomerId == 'False' and \
+                changeInTransactionAmount == 0 and \
+                indMerchNameMatch == 'True' and \
+                changeInTransactionTimeMinutes <= 1 and \
+                changeInTransactionTimeMinutes >= 0:
+                indDuplicateTransaction = 'True'
+
+        # Append this transactions information to the lists
+        indChangeInCustomerIdList.append(indChangeInCustomerId)
+        indDuplicateTransactionList.append(indDuplicateTransaction)
+        indMerchNameMatchList.append(indMerchNameMatch)
+        changeInTransactionAmountList.append(changeInTransactionAmount)
+        changeInTransactionTimeList.append(changeInTransactionTime)
+        changeInTransactionTimeMonthsList.append(changeInTransactionTimeMonths)
+        changeInTransactionTimeDaysList.append(changeInTransactionTimeDays)
+        changeInTransactionTimeMinutesList.append(changeInTransactionTimeMinutes)
+
+    # Add lists to the dataframe, g fields are generated
+    transactionData['gIndChangeInCustomerId'] = indChangeInCustomerIdList
+    transactionData['gIndDuplicateTransaction'] = indDuplicateTransactionList
+    transactionData['gIndMerchNameMatch'] = indMerchNameMatchList
+    transactionData['gChangeInTransactionAmount'] = changeInTransactionAmountList
+    transactionData['gChangeInTransactionTime'] = changeInTransactionTimeList
+    transactionData['gChangeInTransactionTimeMonths'] = changeInTransactionTimeMonthsList
+    transactionData['gChangeInTransactionTimeDays'] = changeInTransactionTimeDaysList
+    transactionData['gChangeInTransactionTimeMinutes'] = changeInTransactionTimeMinutesList
+
+    return transactionData
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Fields of a transaction that make up its key, as in the string key of customerId, accountNumber, and
+# transactionDateTime to the second
+KEY_FIELDS = ['customerId', 'accountNumber', 'transactionDateTime']
+# Fields of the packed key: customerId in the high 32 bits and accountNumber in the low 32 bits, and the epoch seconds
+# of transactionDateTime
+KEY_FIELD = 'gTransactionKey'
+KEY_TIME_FIELD = 'gTransactionKeyTime'
+KEY_COLUMNS = [KEY_FIELD, KEY_TIME_FIELD]
+KEY_FIELD_BITS = 32
+
+
+# Integer key of each transaction packed from the native values of the key fields
+def transactionKeys(transactionData):
+    """
+    Compute the key of each transaction as 2 int64 fields packed from the customerId, accountNumber, and
+    transactionDateTime in seconds.
+
+    customerId and accountNumber take 32 bits each, so they are packed into gTransactionKey, and the epoch seconds of
+    transactionDateTime are gTransactionKeyTime.  The packing is exact, so the same transaction has the same key in
+    every dataset and batch, different transactions have different keys, keys can be compared and joined as integers,
+    and decodeTransactionKeys gives back the key fields of a key without the dataset.
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        The transactions with the key fields.
+
+    Return
+    _______
+    keys : DataFrame
+        The KEY_COLUMNS of each transaction.
+    """
+    (customerId, accountNumber, transactionDateTime) = [keyFieldValues(transactionData[field]) for field in KEY_FIELDS]
+    for (field, values) in zip(KEY_FIELDS, [customerId, accountNumber, transactionDateTime]):
+        if len(values) and (values.min() < 0 or values.max() >= 2 ** KEY_FIELD_BITS):
+            raise ValueError("Key field needs to fit in " + str(KEY_FIELD_BITS) + " bits: " + field)
+
+    return pd.DataFrame({KEY_FIELD: (customerId << KEY_FIELD_BITS) | accountNumber,
+                         KEY_TIME_FIELD: transactionDateTime}, index=transactionData.index)
+
+
+# Integer value of a key field, date-times are truncated to the second as in the string key
+def keyFieldValues(keyField):
+    if keyField.dtype.kind == 'M' or keyField.dtype == 'object' and 'Date' in str(keyField.name):
+        return pd.to_datetime(keyField).to_numpy(dtype='datetime64[s]').view('int64')
+    return pd.to_numeric(keyField).to_numpy(dtype='int64')
+
+
+# Key fields of each key unpacked from the key
+def decodeTransactionKeys(keys):
+    """
+    Decode the customerId, accountNumber, and transactionDateTime of keys.
+
+    Parameters
+    __________
+    keys : DataFrame
+        The KEY_COLUMNS of the keys, e.g. of any dataset after AddKeyIndsAndDropFields.py.
+
+    Return
+    _______
+    keyFields : DataFrame
+        The key fields of each key in order, with transactionDateTime as datetime64[ns].
+    """
+    packedKey = keys[KEY_FIELD].to_numpy(dtype='int64')
+    return pd.DataFrame({'customerId': packedKey >> KEY_FIELD_BITS,
+                         'accountNumber': packedKey & (2 ** KEY_FIELD_BITS - 1),
+                         'transactionDateTime': keys[KEY_TIME_FIELD].to_numpy(dtype='int64')
+                         .astype('datetime64[s]').astype('datetime64[ns]')}, index=keys.index)
+
+
+# Number of transactions that share their key with an earlier transaction, e.g. transactions in the same second
+def countSharedKeys(transactionData):
+    return int(transactionData.duplicated(KEY_COLUMNS).sum())
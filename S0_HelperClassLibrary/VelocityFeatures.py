@@ -0,0 +1,213 @@
+import pickle
+import pandas as pd
+import numpy as np
+from S0_HelperClassLibrary.StageMetrics import timedStep
+
+
+# Rolling windows of the velocity features.  A window ends with the transaction and includes it.
+VELOCITY_WINDOWS = {'1h': np.timedelta64(1, 'h'), '24h': np.timedelta64(24, 'h'), '7d': np.timedelta64(7, 'D'),
+                    '30d': np.timedelta64(30, 'D')}
+# Fields used by the velocity features and kept in the state of the incremental mode
+VELOCITY_FIELDS = ['customerId', 'gTransactionDateTime', 'transactionAmount', 'merchantName', 'cardPresent']
+HISTORY_FIELD = 'gVelocityHistory'
+
+
+# Rolling window features of the earlier transactions of each customer
+def velocityFeatures(transactionData, windows=VELOCITY_WINDOWS):
+    """
+    Compute the velocity features of each transaction from the transactions of the same customer in rolling windows.
+
+    The transactions are ordered by customer id and transaction date-time, keeping the order of the dataset for the
+    same date-time.  In this order the start of the window of every transaction is found with one search of the
+    sorted keys, and the counts and sums come from the differences of cumulative sums, of the amounts in cents.  The
+    distinct merchants are counted from the previous transaction with the same merchant.  For each window:
+        - gNumTransactions<window>: number of transactions of the customer in the window
+        - gSumTransactionAmount<window>: total transaction amount of the customer in the window
+        - gNumDistinctMerchants<window>: number of distinct merchant names of the customer in the window
+    In addition:
+        - gHoursSincePreviousCardNotPresent: hours since the previous card not present transaction of the customer,
+          empty when there is none
+
+    Parameters
+    __________
+    transactionData : DataFrame
+        Transactions with customerId, gTransactionDateTime, transactionAmount, merchantName, and cardPresent.
+    windows : dict
+        The name and length of each window as a timedelta.  Example: VELOCITY_WINDOWS
+
+    Return
+    _______
+    features : DataFrame
+        The velocity features with the index of the dataset.
+    """
+    numberOfRecords = len(transactionData.index)
+    (customerCodes, customers) = pd.factorize(transactionData['customerId'])
+    transactionDateTime = transactionData['gTransactionDateTime'].to_numpy(dtype='datetime64[s]').view('int64')
+    order = np.lexsort((transactionDateTime, customerCodes))
+
+    # Seconds since the first transaction, with the transactions of each customer after those of the customer before
+    # it so that the keys of the windows of all customers are searched at once
+    seconds = transactionDateTime[order] - (transactionDateTime.min() if numberOfRecords > 0 else 0)
+    longestWindow = max(int(window / np.timedelta64(1, 's')) for window in windows.values())
+    customerSpan = (int(seconds.max()) if numberOfRecords > 0 else 0) + longestWindow + 1
+    if len(customers) * customerSpan >= np.iinfo('int64').max:
+        raise ValueError("Date-times and number of customers are too large for the velocity keys")
+    keys = customerCodes[order].astype('int64') * customerSpan + seconds
+
+    # Amounts are summed in cents so that the sums of a window do not depend on the transactions before it
+    transactionAmount = transactionData['transactionAmount'].to_numpy(dtype='float64')[order]
+    cumulativeAmount = np.concatenate([[0], np.cumsum(np.rint(np.nan_to_num(transactionAmount) * 100).astype('int64'))])
+    merchantCodes = pd.factorize(transactionData['merchantName'])[0][order]
+    positions = np.arange(numberOfRecords)
+
+    features = {}
+    for (windowName, window) in windows.items():
+        # The window of a transaction starts with the first transaction of the customer after its date-time - window
+        windowStart = np.searchsorted(keys, keys - int(window / np.timedelta64(1, 's')), side='right')
+        features['gNumTransactions' + windowName] = positions - windowStart + 1
+        features['gSumTransactionAmount' + windowName] = (cumulativeAmount[positions + 1] -
+                                                          cumulativeAmount[windowStart]) / 100
+        features['gNumDistinctMerchants' + windowName] = countDistinctInWindows(merchantCodes, windowStart)
+
+    # Latest card not present transaction before each transaction, of the same customer
+    cardNotPresent = ~transactionData['cardPresent'].to_numpy(dtype=bool)[order]
+    latestCardNotPresent = np.maximum.accumulate(np.where(cardNotPresent, positions, -1)) if numberOfRecords > 0 \
+        else positions
+    previousCardNotPresent = np.concatenate([[-1], latestCardNotPresent[:-1]])[:numberOfRecords]
+    sameCustomer = (previousCardNotPresent >= 0) & \
+        (customerCodes[order] == customerCodes[order][np.maximum(previousCardNotPresent, 0)])
+    features['gHoursSincePreviousCardNotPresent'] = np.where(
+        sameCustomer, (seconds - seconds[np.maximum(previousCardNotPresent, 0)]) / 3600, np.nan)
+
+    # Back to the order of the dataset
+    inverseOrder = np.empty(numberOfRecords, dtype='int64')
+    inverseOrder[order] = positions
+    return pd.DataFrame({name: feature[inverseOrder] for (name, feature) in features.items()},
+                        index=transactionData.index)
+
+
+# Number of distinct values from the window start to each record with the previous record of each value
+def countDistinctInWindows(values, windowStart):
+    """
+    Count the distinct values of each window of the records.
+
+    A record repeats a value in a window when the previous record with the same value is also in the window.  As the
+    window starts never decrease, which holds for windows that do not cross the start of the records of a customer,
+    the windows in which a record is a repeat are the windows from the record up to the first window that starts after
+    its previous record, found from the number of windows that start at each record.  The number of repeats of each
+    window is then a cumulative sum, and the number of distinct values is the number of records of the window less its
+    repeats.
+
+    Parameters
+    __________
+    values : ndarray
+        The integer codes of the values, from 0.
+    windowStart : ndarray
+        The position of the first record of the window of each record.
+
+    Return
+    _______
+    numberDistinct : ndarray
+        The number of distinct values of the window of each record.
+    """
+    numberOfRecords = len(values)
+    positions = np.arange(numberOfRecords)
+    if numberOfRecords == 0:
+        return positions
+
+    # Each record that repeats a value and the previous record with the value, in order of the values.  The codes are
+    # sorted in the smallest integer type, which is a radix sort for up to 65536 values.
+    valueOrder = np.argsort(values.astype(np.min_scalar_type(values.max())), kind='stable')
+    sameValue = np.diff(values[valueOrder]) == 0
+    repeatRecord = valueOrder[1:][sameValue]
+    previousRecord = valueOrder[:-1][sameValue]
+
+    # A record is a repeat in the windows from the record up to the first window that starts after its previous record.
+    # The window starts are positions, so the first window that starts after each position is the number of windows
+    # that start at or before it.
+    windowsStarted = np.cumsum(np.bincount(windowStart, minlength=numberOfRecords))
+    repeatEnd = np.maximum(windowsStarted[previousRecord], repeatRecord)
+    repeats = np.cumsum(np.bincount(repeatRecord, minlength=numberOfRecords + 1) -
+                        np.bincount(repeatEnd, minlength=numberOfRecords + 1))[:numberOfRecords]
+
+    return (positions - windowStart + 1 - repeats).astype('int64')
+
+
+# Add the velocity features to the dataset, g fields are generated
+@timedStep()
+def addVelocityFeatures(transactionData, windows=VELOCITY_WINDOWS):
+    features = velocityFeatures(transactionData, windows)
+    for column in features:
+        transactionData[column] = features[column]
+
+    return transactionData
+
+
+# Add the velocity features to a new batch of transactions with the state of the earlier transactions
+def appendVelocityFeatures(velocityState, batchData, windows=VELOCITY_WINDOWS):
+    """
+    Add the velocity features to a new batch of transactions from the earlier transactions kept in a state, without
+    reading the earlier transactions again.
+
+    The state has the transactions of each customer within the longest window of its latest transaction and its latest
+    card not present transaction.  The batch is placed after them, so the features of the batch are the same as
+    addVelocityFeatures of the dataset with the batch appended when the batch transactions are not earlier than the
+    earlier transactions of their customer.
+
+    Parameters
+    __________
+    velocityState : DataFrame
+        The state of the earlier transactions from velocityStateOf, or None for the first batch.
+    batchData : DataFrame
+        The new transactions with the velocity fields.
+    windows : dict
+        The name and length of each window as a timedelta.  Example: VELOCITY_WINDOWS
+
+    Return
+    _______
+    batchData : DataFrame
+        The batch with the velocity features.
+    velocityState : DataFrame
+        The state with the batch added.
+    """
+    batchHistory = batchData[VELOCITY_FIELDS].assign(**{HISTORY_FIELD: False})
+    if velocityState is not None:
+        batchHistory = pd.concat([velocityState.assign(**{HISTORY_FIELD: True}), batchHistory], ignore_index=True)
+
+    features = velocityFeatures(batchHistory, windows)
+    isBatch = ~batchHistory[HISTORY_FIELD].to_numpy()
+    for column in features:
+        batchData[column] = features[column].to_numpy()[isBatch]
+
+    return batchData, velocityStateOf(batchHistory.drop(columns=HISTORY_FIELD), windows)
+
+
+# Transactions needed for the velocity features of later transactions
+def velocityStateOf(transactionData, windows=VELOCITY_WINDOWS):
+    longestWindow = max(windows.values())
+    transactionDateTime = transactionData['gTransactionDateTime']
+    latestOfCustomer = transactionDateTime.groupby(transactionData['customerId']).transform('max')
+
+    # Transactions in the longest window of the latest transaction of the customer, and the latest card not present
+    inLongestWindow = (transactionDateTime > latestOfCustomer - longestWindow).to_numpy()
+    cardNotPresent = transactionData.loc[~transactionData['cardPresent'].astype(bool), ['customerId',
+                                                                                        'gTransactionDateTime']]
+    latestCardNotPresent = np.zeros(len(transactionData.index), dtype=bool)
+    if len(cardNotPresent.index) > 0:
+        latestIndex = cardNotPresent.groupby('customerId', sort=False)['gTransactionDateTime'].idxmax()
+        latestCardNotPresent[transactionData.index.get_indexer(latestIndex)] = True
+
+    return transactionData.loc[inLongestWindow | latestCardNotPresent, VELOCITY_FIELDS].reset_index(drop=True)
+
+
+def saveVelocityState(velocityState, stateFile):
+    with open(stateFile, 'wb') as output:
+        pickle.dump(velocityState, output)
+    output.close()
+
+    return
+
+
+def loadVelocityState(stateFile):
+    with open(stateFile, 'rb') as stateInput:
+        return pickle.load(stateInput)
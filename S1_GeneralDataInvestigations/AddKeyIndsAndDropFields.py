@@ -4,17 +4,24 @@ import os
 import sys
 import getopt
 import pandas as pd
-import numpy as np
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetStorage import writeDataset
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.PipelineStages import addKeyAndIndicators
+from S0_HelperClassLibrary.TransactionKeys import KEY_COLUMNS, countSharedKeys
 
 """AddKeyIndsAndDropFields.py is a script to add fields needed for use in further investigations.
 
-This script expects a jsonl dataset.  It is used to generate indicators and create a primary key for each transaction
-in the file.  The indicators that are calculated are:
+This script expects a jsonl or parquet dataset.  It is used to generate indicators and create a primary key for each transaction
+in the file.  The key is 2 int64 fields: gTransactionKey packs the 32 bit customerId and accountNumber, and
+gTransactionKeyTime is the epoch seconds of transactionDateTime.  decodeTransactionKeys of
+S0_HelperClassLibrary/TransactionKeys.py decodes the fields of a key.  The indicators that are calculated are:
     - gIndCustIdEqAcctNum to understand the uniqueness across the two fields of customerId and accountNumber
     - gIndCardCvvEqEnteredCVV to understand the difference between the actual and entered CVV
     - gIndDtAddrChangeEqAcctOpenDt to investigate the presences of DtAddrChange being 100% present
@@ -37,51 +44,25 @@ startTime = datetime.now()
 os.nice(5)
 
 # Add key and drop fields
-def addKeyAndDropFields(inputPath, dsName, dsNameExtension):
+def addKeyAndDropFields(inputPath, dsName, dsNameExtension, storageFormat):
     # Concatenate arguments to obtain input and output file locations.
     inputFile = str(inputPath + dsName + '.' + dsNameExtension)
     print("Input file is: " + inputFile)
-    outputFile = str(inputPath + dsName + '.withKey.' + dsNameExtension)
-    print("Output file is: " + outputFile)
+    outputFile = createOutputFileName(inputPath, dsName, dsNameExtension, "withKey", conversion=0, storageFormat=storageFormat)
     outputResults = 'Output/Output.AddKeyAndDropFields.' + dsName + '.txt'
     print("Output results are found here: " + outputResults)
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
 
-    # Read in data with chunksize to reduce CPU needs
-    # For testing set chunksize and nrows to desired row count
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=10, nrows=10)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
-
-    # Change date fields to have a type of date for easier processing later
-    for column in transactionData:
-        if np.dtype(transactionData[column]) == 'object' and ("Date" in column or "date" in column):
-            transactionData[column + "DtType"] = pd.to_datetime(transactionData[column])
-
-    # Convert customerId and accountNumber and transactionDateTime to strings
-    transactionData['custString'] = transactionData['customerId'].astype(str)
-    transactionData['acctString'] = transactionData['accountNumber'].astype(str)
-    transactionData['dttmString'] = transactionData['transactionDateTime'].astype(str)
-
-    # Append three string fields created above to get a unique transaction id
-    transactionData['gTransactionKey'] = transactionData['custString'].str.cat(transactionData['acctString'])
-    transactionData['gTransactionKey'] = transactionData['gTransactionKey'].str.cat(transactionData['dttmString'])
-
-    # Add indicator when transaction information matches
-    transactionData['gIndCustIdEqAcctNum'] = np.where(transactionData['customerId'] == transactionData['accountNumber'], "Matched", "Not Matched")
-    transactionData['gIndCardCvvEqEnteredCVV'] = np.where(transactionData['cardCVV'] == transactionData['enteredCVV'], "Matched", "Not Matched")
-    transactionData['gIndDtAddrChangeEqAcctOpenDt'] = np.where(transactionData['dateOfLastAddressChange'] == transactionData['accountOpenDate'], "Matched", "Not Matched")
-
-    # Drop fields with 100% missing values and intermediate variables
-    # These fields were identified using the GenerateFrequenciesHistograms_COPY.py script
-    transactionData = transactionData.drop(['echoBuffer', 'merchantCity', 'merchantState', 'merchantZip',
-                                        'posOnPremises', 'recurringAuthInd', 'custString', 'acctString', 'dttmString'], axis=1)
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
+
+    # Add date typed fields, the transaction key, and the indicators, and drop fields with 100% missing values
+    transactionData = addKeyAndIndicators(transactionData)
 
     # Write out dataset
-    transactionData.to_json(outputFile, orient="records", lines=True)
+    writeDataset(transactionData, outputFile)
 
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
@@ -94,7 +75,9 @@ def addKeyAndDropFields(inputPath, dsName, dsNameExtension):
     with open(outputResults, 'a+') as output:
         # Print number of unique
         print("---------Unique Trans Keys--------", file=output)
-        print(transactionData['gTransactionKey'].nunique(), file=output)
+        print(len(transactionData[KEY_COLUMNS].drop_duplicates().index), file=output)
+        print("---------Transactions Sharing the Key of an Earlier Transaction--------", file=output)
+        print(countSharedKeys(transactionData), file=output)
         print("---------Unique Customer Id--------", file=output)
         print(transactionData['customerId'].nunique(), file=output)
 
@@ -111,10 +94,11 @@ def addKeyAndDropFields(inputPath, dsName, dsNameExtension):
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-addKeyAndDropFields(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    addKeyAndDropFields(inputPath, dsName, dsNameExtension, options['storageFormat'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -6,14 +6,23 @@ import pandas as pd
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.CsvConversion import convertCsv, CSV_BLOCK_SIZE
 
-"""ConvertCvsToJsonl.py is a script to convert a dataset from CSV to JSONL for further processing.
+"""ConvertCvsToJsonl.py is a script to convert a dataset from CSV to JSONL or parquet for further processing.
 
 This script is the first script in General Data Investigations.  It is used to read in a csv dataset and convert to a 
-json lines dataset.  The output results are saved in the same path as the input data, and named the same as the input
-file with a .jsonl extension.
+json lines or parquet dataset based on the storageFormat argument (default parquet).  The output results are saved in
+the same path as the input data, and named the same as the input file with a .jsonl or .parquet extension.
+
+The csv is converted one block of records at a time (--blockSizeMB, default 64), so the memory used does not grow with
+the size of the dataset.  The records of each block are parsed on multiple threads (--threads, all cores when 0).  The
+types of the fields are unified across the blocks as pd.read_csv types the whole file, fields with numbers and text are
+strings, and the csv is converted a second time only when a later block changes the type of a block already written.
+The first records of the csv and of the converted dataset are printed in the types written, and the conversion time and
+peak memory of the process are saved in the output results.
 """
 print(__doc__)
 
@@ -24,41 +33,44 @@ startTime = datetime.now()
 os.nice(5)
 
 # Generate Summary Statistics: Info, Shape, Description, Head
-def readCsvConvertToJsonl(inputPath, dsName, dsNameExtension):
+def readCsvConvertToJsonl(inputPath, dsName, dsNameExtension, storageFormat, blockSizeMB, threads):
     # Detail inputFile, outputFile, and outputResults strings
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputFile = createOutputFileName(inputPath, dsName, dsNameExtension, "none", conversion=1)
+    outputFile = createOutputFileName(inputPath, dsName, dsNameExtension, "none", conversion=1, storageFormat=storageFormat)
     outputResults = createOutputResultsName(dsName, "ConvertCsvToJsonl")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    chunkedData = pd.read_csv(inputFile, chunksize=100000)
-    # Append chunked data into 1 data frame
-    fullData = pd.concat(chunkedData, ignore_index=True)
-
+    # Convert to jsonl or parquet one block of records at a time
+    conversion = convertCsv(inputFile, outputFile, int(blockSizeMB * 2 ** 20), threads)
 
     with open(outputResults, 'w') as output:
         # Print the head of the csv file
         print("First records of CSV", file=output)
-        print(fullData.head(), file=output)
-
-        # Convert to jsonl
-        fullData.to_json (outputFile, orient='records', lines=True)
+        print(conversion['csvPreview'], file=output)
 
-        # Print the head of the jsonl file
-        fullConvertedData = pd.read_json(outputFile, lines=True)
+        # Print the head of the converted file
+        print("First records of " + storageFormat.upper(), file=output)
+        print(conversion['convertedPreview'], file=output)
 
-        print("First records of JSONL", file=output)
-        print(fullConvertedData.head(), file=output)
+        print("---------Conversion--------", file=output)
+        print("Number of records: " + str(conversion['records']), file=output)
+        print("Size of the csv (MB): " + str(conversion['inputMB']), file=output)
+        print("Conversion time (seconds): " + str(conversion['seconds']), file=output)
+        print("Conversion rate (MB per second): " + str(conversion['MBPerSecond']), file=output)
+        print("Peak memory of the process (MB): " + str(conversion['peakMB']), file=output)
     output.close()
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT,
+                                                                                   'blockSizeMB': CSV_BLOCK_SIZE // 2 ** 20,
+                                                                                   'threads': 0})
 
 # Execute generateSummaryStats with the passed in arguments
-readCsvConvertToJsonl(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    readCsvConvertToJsonl(inputPath, dsName, dsNameExtension, options['storageFormat'], options['blockSizeMB'],
+                          options['threads'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -1,30 +1,58 @@
 #! /usr/bin/python3
 # Import statements
+import io
 import os
 import sys
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA, loadDataset, loadDatasetChunks
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.StreamingProfile import profileDataset, appendToProfile, saveProfile
+from S0_HelperClassLibrary.StageCache import fileHash
+from S0_HelperClassLibrary.ParallelColumns import mapColumns
+from S0_HelperClassLibrary.Histograms import computeHistogram, plotHistogram
 
 """GenerateFrequenciesHistograms.py is a script that produces frequencies and histograms for every field.
 
-This script expects a json lines dataset and produces the following information for each field:
+This script expects a json lines or parquet dataset and produces the following information for each field:
     - Type of the field
     - Count of valid values
     - Unique number of values
     - Frequency
-    - Histograms with a maximum of 20 unique values for strings, and by year for dates
+    - Histograms with a maximum of 20 unique values for strings, and by year for dates.  The bin counts of each
+      histogram are saved next to the plot as Output/Histogram.*.json, so plots can be redrawn without the dataset.
 
 There are some type conversions that are performed prior to producing the above information.
     - Booleans are converted to strings.
     - Object fields that have the word 'date' or 'Date' in the field name are converted to a date type.
 
+With --streaming 1 the dataset is read one chunk at a time and the count, frequencies, and moments of each field are
+accumulated in a profile, so datasets larger than memory can be profiled.  The histograms are drawn from the
+frequencies.  The memory used is bounded by the chunk size and the number of unique values of each field.  The report
+is the same as without streaming.
+
+With --approximate 1 the profile keeps fixed size sketches in place of the frequency of every value, for fields with
+many unique values such as gTransactionKey, merchantName, and customerId:
+    - Approximate number of unique values (HyperLogLog, relative standard error of --distinctError)
+    - Top --topK frequencies (Space-Saving, counts overcount by at most --frequencyError of the valid values)
+    - Approximate quartiles and histograms of numeric and date fields (t-digest, rank error of about --quantileError)
+The sketches are mergeable, so they are built one chunk at a time as with --streaming 1.
+
+The profile of a streamed dataset is saved in Output/State.<dsName>.Frequencies.pkl, or FrequenciesApproximate.pkl.
+With --appendTo <dsName of the dataset> the input dataset is a new batch of records of that dataset: only the batch is
+read, its profile is added to the saved profile, and the report and histograms of the dataset are produced again.  The
+output is the same as streaming the dataset with the batch appended.  The hash of each file added to the profile is saved
+with it, and a batch that has already been added is refused.
+
+With --workers N the frequencies and histograms of the fields are produced by a pool of N processes.  The dataset is
+shared with the processes through a memory mapped file, and the output is the same as with 1 worker.
+
 The output results are saved in the Output/ directory.
 """
 print(__doc__)
@@ -37,92 +65,167 @@ os.nice(5)
 
 
 # Generate Frequencies
-def generateFrequenciesHistograms(inputPath, dsName, dsNameExtension):
-    # Detail inputFile, outputFile, and outputResults strings
+def generateFrequenciesHistograms(inputPath, dsName, dsNameExtension, streaming, sketchErrors, topK, workers, appendTo):
+    # Detail inputFile, outputFile, and outputResults strings.  A batch is reported with the dataset it is appended to.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputResults = createOutputResultsName(dsName, "Frequencies")
+    outputResults = createOutputResultsName(appendTo or dsName, "Frequencies")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    # For testing use nrows=100000
-    chunkedData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # Append chunked data into 1 data frame
-    fullData = pd.concat(chunkedData, ignore_index=True)
 
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
         os.makedirs('Output')
 
+    # When streaming or approximate, produce the frequencies from the profile of each field
+    if streaming or sketchErrors is not None or appendTo:
+        generateFrequenciesHistogramsStreaming(inputFile, appendTo or dsName, outputResults, sketchErrors, topK,
+                                               appendTo != '')
+        return
+
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    fullData = loadDataset(inputFile)
+
     # Produce General Stats on Dataset
     datasetShapeInfo(fullData, inputFile, outputResults)
 
-    # Produce Frequencies on each field in the dataset
+    # Produce Frequencies on each field in the dataset.  With more than 1 worker the fields are spread across a pool of
+    # processes and the frequencies are written in the order of the fields.
+    fieldFrequencies = mapColumns(fieldFrequenciesHistograms, fullData, list(fullData.columns), workers, args=(dsName,))
+    with open(outputResults, 'a+') as output:
+        print('Output histograms are found here: Output/Histogram.*.png', file=output)
+        for frequencies in fieldFrequencies:
+            output.write(frequencies)
+    output.close()
+
+
+# Generate Frequencies and Histogram of 1 field
+def fieldFrequenciesHistograms(fullData, column, dsName):
+    output = io.StringIO()
+
+    # Produce type, count, unique, and frequency information regardless of data type
+    print("---------" + column + "--------", file=output)
+    print("Type of " + column + " is: ", fullData[column].dtype, file=output)
+    print("Count of " + column + " is: " + str(fullData[column].count()), file=output)
+    print("Number of unique values of " + column + " is: ", fullData[column].nunique(), file=output)
+    print("Frequency of " + column + " is:", file=output)
+    print(fullData[column].value_counts().sort_index(0), file=output)
+
+    # For numeric, produce summary stats and histograms with 10 bins
+    # Note: The descriptive stats are duplicates from the Generate Summary Stata, but aligned with other info
+    # that will be contained in the appendix in the technical review.
+    if fullData[column].dtype.kind in 'iuf':
+        print(fullData[column].describe(), file=output)
+        # if fullData.count(column) != 0:
+        if fullData[column].count() != 0:
+            plotHistogram([computeHistogram(fullData[column], bins=10)],
+                          "Output/Histogram." + dsName + '_' + column + ".png", column)
+        else:
+            print("No histogram for " + column + " as data is all null.", file=output)
+    # For Date fields, change type to Date, extract year and plot histogram.
+    # Note: There is a dependency on the field to have 'Date' in it's name.  Date fields of the transaction
+    # schema are already a date type.
+    elif (fullData[column].dtype == 'object' or fullData[column].dtype.kind == 'M') and \
+            ("Date" in column or "date" in column):
+        fullData[column] = parseDates(fullData[column], TRANSACTION_SCHEMA['dates'].get(column))
+        print("NEW Type of " + column + " is: ", fullData[column].dtype, file=output)
+        fullData[column + '_year'] = pd.DatetimeIndex(fullData[column]).year
+        plotHistogram([computeHistogram(fullData[column + '_year'], bins=10)],
+                      "Output/Histogram." + dsName + '_' + column + ".png", column + '_year', xlabel="Year",
+                      rotateTicks=True)
+    # For remaining objects - strings and categories, produce summary stats and histograms.
+    elif (fullData[column].dtype == 'object' or fullData[column].dtype == 'category') and \
+            fullData[column].nunique() < 20:
+        plotHistogram([computeHistogram(fullData[column])], "Output/Histogram." + dsName + '_' + column + ".png",
+                      column, rotateTicks=True)
+    # For boolean fields, change type to string, and plot histogram.
+    elif fullData[column].dtype == 'bool':
+        fullData[column + "_str"] = fullData[column].astype('str')
+        plotHistogram([computeHistogram(fullData[column + "_str"])], "Output/Histogram." + dsName + '_' + column + ".png",
+                      column + '_str')
+    return output.getvalue()
+
+
+# Generate Frequencies one chunk at a time
+def generateFrequenciesHistogramsStreaming(inputFile, dsName, outputResults, sketchErrors, topK, append):
+    # Read in data one chunk at a time and accumulate the profile or the sketches of each field.  A batch is added to
+    # the saved profile of the dataset.  The profile is saved for the next batch.
+    stateFile = createStateFileName(dsName, "Frequencies" if sketchErrors is None else "FrequenciesApproximate")
+    if append:
+        profile = appendToProfile(stateFile, loadDatasetChunks(inputFile), sketchErrors, fileHash(inputFile))
+    else:
+        profile = profileDataset(loadDatasetChunks(inputFile), sketchErrors, fileHash(inputFile))
+    saveProfile(profile, stateFile)
+
+    # Produce General Stats on Dataset
+    datasetShapeInfo(profile, inputFile, outputResults)
+
+    # Produce Frequencies on each field in the dataset.  The histograms are weighted by the frequency of each value,
+    # or by the weight of each centroid of the digest when approximate.
     with open(outputResults, 'a+') as output:
         print('Output histograms are found here: Output/Histogram.*.png', file=output)
-        for column in fullData:
+        for column in profile:
             # Produce type, count, unique, and frequency information regardless of data type
+            frequencies = profile[column].frequencies()
+            distribution = profile[column].distribution()
             print("---------" + column + "--------", file=output)
-            print("Type of " + column + " is: ", np.dtype(fullData[column]), file=output)
-            print("Count of " + column + " is: " + str(fullData[column].count()), file=output)
-            print("Number of unique values of " + column + " is: ", fullData[column].nunique(), file=output)
-            print("Frequency of " + column + " is:", file=output)
-            print(fullData[column].value_counts().sort_index(0), file=output)
+            print("Type of " + column + " is: ", profile[column].dtype, file=output)
+            print("Count of " + column + " is: " + str(profile[column].count), file=output)
+            if sketchErrors is None:
+                print("Number of unique values of " + column + " is: ", profile[column].nunique(), file=output)
+                print("Frequency of " + column + " is:", file=output)
+                print(frequencies.sort_index(), file=output)
+            else:
+                print("Approximate number of unique values of " + column + " is: ", profile[column].nunique(),
+                      file=output)
+                print("Top " + str(topK) + " frequencies of " + column + " are (counts overcount by at most " +
+                      str(profile[column].heavyHitters.maxError()) + "):", file=output)
+                print(frequencies.sort_values(ascending=False, kind='mergesort').head(topK), file=output)
 
             # For numeric, produce summary stats and histograms with 10 bins
-            # Note: The descriptive stats are duplicates from the Generate Summary Stata, but aligned with other info
-            # that will be contained in the appendix in the technical review.
-            if np.dtype(fullData[column]) == 'int64' or np.dtype(fullData[column]) == 'float64':
-                print(fullData[column].describe(), file=output)
-                # if fullData.count(column) != 0:
-                if fullData[column].count() != 0:
-                    plt.hist(fullData[column], bins=10)
-                    plt.title(column)
-                    plt.xlabel("Value")
-                    plt.ylabel("Frequency")
-                    plt.savefig("Output/Histogram." + dsName + '_' + column + ".png")
-                    plt.clf()
+            if profile[column].dtype.kind in 'iuf':
+                print(profile[column].describe(), file=output)
+                if profile[column].count != 0:
+                    plotHistogram([computeHistogram(distribution.index.to_series(), bins=10, weights=distribution)],
+                                  "Output/Histogram." + dsName + '_' + column + ".png", column)
                 else:
                     print("No histogram for " + column + " as data is all null.", file=output)
-            # For Date fields, change type to Date, extract year and plot histogram.
-            # Note: There is a dependency on the field to have 'Date' in it's name.
-            elif np.dtype(fullData[column]) == 'object' and ("Date" in column or "date" in column):
-                fullData[column] = pd.to_datetime(fullData[column])
-                print("NEW Type of " + column + " is: ", np.dtype(fullData[column]), file=output)
-                fullData[column + '_year'] = pd.DatetimeIndex(fullData[column]).year
-                plt.hist(fullData[column + '_year'], bins=10)
-                plt.title(column + '_year')
-                plt.xlabel("Year")
-                plt.xticks(rotation='vertical')
-                plt.ylabel("Frequency")
-                plt.savefig("Output/Histogram." + dsName + '_' + column + ".png")
-                plt.clf()
-            # For remaining objects - strings, produce summary stats and histograms.
-            elif np.dtype(fullData[column]) == 'object' and fullData[column].nunique() < 20:
-                plt.hist(fullData[column])
-                plt.title(column)
-                plt.xlabel("Value")
-                plt.xticks(rotation='vertical')
-                plt.ylabel("Frequency")
-                plt.savefig("Output/Histogram." + dsName + '_' + column + ".png")
-                plt.clf()
+            # For Date fields, extract year from the frequencies and plot histogram.
+            elif (profile[column].dtype == 'object' or profile[column].dtype.kind == 'M') and \
+                    ("Date" in column or "date" in column):
+                distribution.index = pd.to_datetime(distribution.index)
+                print("NEW Type of " + column + " is: ", distribution.index.dtype, file=output)
+                yearFrequencies = distribution.groupby(distribution.index.year).sum()
+                plotHistogram([computeHistogram(yearFrequencies.index.to_series(), bins=10, weights=yearFrequencies)],
+                              "Output/Histogram." + dsName + '_' + column + ".png", column + '_year', xlabel="Year",
+                              rotateTicks=True)
+            # For remaining objects - strings and categories, produce histograms in order of first appearance.
+            elif (profile[column].dtype == 'object' or profile[column].dtype == 'category') and \
+                    profile[column].nunique() < 20:
+                frequencies = frequencies[frequencies > 0]
+                plotHistogram([computeHistogram(frequencies.index.astype('str').to_series(), weights=frequencies)],
+                              "Output/Histogram." + dsName + '_' + column + ".png", column, rotateTicks=True)
             # For boolean fields, change type to string, and plot histogram.
-            elif np.dtype(fullData[column]) == 'bool':
-                fullData[column + "_str"] = fullData[column].astype('str')
-                plt.hist(fullData[column + "_str"])
-                plt.title(column + '_str')
-                plt.xlabel("Value")
-                plt.ylabel("Frequency")
-                plt.savefig("Output/Histogram." + dsName + '_' + column + ".png")
-                plt.clf()
+            elif profile[column].dtype == 'bool':
+                plotHistogram([computeHistogram(frequencies.index.astype('str').to_series(), weights=frequencies)],
+                              "Output/Histogram." + dsName + '_' + column + ".png", column + '_str')
     output.close()
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {
+    'streaming': False, 'approximate': False, 'distinctError': 0.01, 'quantileError': 0.01, 'frequencyError': 0.001,
+    'topK': 20, 'workers': 1, 'appendTo': ''})
+if options['approximate']:
+    sketchErrors = {'distinctError': options['distinctError'], 'quantileError': options['quantileError'],
+                    'frequencyError': options['frequencyError']}
+else:
+    sketchErrors = None
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-generateFrequenciesHistograms(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    generateFrequenciesHistograms(inputPath, dsName, dsNameExtension, options['streaming'], sketchErrors,
+                                  options['topK'], options['workers'], options['appendTo'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -7,19 +7,33 @@ import pandas as pd
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetSummary
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset, loadDatasetChunks
+from S0_HelperClassLibrary.StreamingProfile import profileDataset, appendToProfile, saveProfile
+from S0_HelperClassLibrary.StageCache import fileHash
 
 """GenerateSummaryStats.py is a script to find out more about the dataset quickly.
 
-This script is the first script in General Data Investigations.  It is used to read in a json lines dataset and produce
-standard information about the dataset for the first view of a new dataset, including:
+This script is the first script in General Data Investigations.  It is used to read in a csv, json lines, or parquet dataset and
+produce standard information about the dataset for the first view of a new dataset, including:
     - File Info (Lists fields and field types)
     - File Shape (Number of rows and columns)
     - File Description (Provides count, mean, std, min, 25%, 50%, 75%, and max for numeric values)
     - File Header (Prints first 5 records)
 
+With --streaming 1 the dataset is read one chunk at a time and the statistics are accumulated in a profile of each
+field, so datasets larger than memory can be summarized.  The memory used is bounded by the chunk size and the number of
+unique values of each field.  The report is the same as without streaming.
+
+The profile of a streamed dataset is saved in Output/State.<dsName>.SummaryStats.pkl.  With --appendTo <dsName of the
+dataset> the input dataset is a new batch of records of that dataset: only the batch is read, its profile is added to
+the saved profile, and the report of the dataset is written again.  The report is the same as streaming the dataset
+with the batch appended.  The hash of each file added to the profile is saved with it, and a batch that has already been
+added is refused.
+
 The output results are saved in the Output/ directory.
 """
 print(__doc__)
@@ -31,38 +45,40 @@ startTime = datetime.now()
 os.nice(5)
 
 # Generate Summary Statistics: Info, Shape, Description, Head
-def generateSummaryStats(inputPath, dsName, dsNameExtension):
-    # Detail inputFile, outputFile, and outputResults strings
+def generateSummaryStats(inputPath, dsName, dsNameExtension, streaming, appendTo):
+    # Detail inputFile, outputFile, and outputResults strings.  A batch is reported with the dataset it is appended to.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputResults = createOutputResultsName(dsName, "SummaryStats")
+    outputResults = createOutputResultsName(appendTo or dsName, "SummaryStats")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
 
-    # Read in data with chunksize to reduce CPU needs
-    if dsNameExtension == "jsonl":
-        chunkedData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    elif dsNameExtension == "csv":
-        chunkedData = pd.read_csv(inputFile, chunksize=100000)
-    else:
-        print("Data set needs to be csv or jsonl.")
-
-    # Append chunked data into 1 data frame
-    fullData = pd.concat(chunkedData, ignore_index=True)
-
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
         os.makedirs('Output')
 
+    # Read in data based on the extension (csv, jsonl, or parquet) with the types of the transaction schema.  When
+    # streaming, only the profile of the fields is kept and saved for the next batch.
+    if appendTo:
+        fullData = appendToProfile(createStateFileName(appendTo, "SummaryStats"), loadDatasetChunks(inputFile),
+                                   batchId=fileHash(inputFile))
+        saveProfile(fullData, createStateFileName(appendTo, "SummaryStats"))
+    elif streaming:
+        fullData = profileDataset(loadDatasetChunks(inputFile), batchId=fileHash(inputFile))
+        saveProfile(fullData, createStateFileName(dsName, "SummaryStats"))
+    else:
+        fullData = loadDataset(inputFile)
+
     # Produce Summary Stats on the dataset
     datasetSummary(fullData, inputFile, outputResults)
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'streaming': False, 'appendTo': ''})
 
 # Execute generateSummaryStats with the passed in arguments
-generateSummaryStats(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    generateSummaryStats(inputPath, dsName, dsNameExtension, options['streaming'], options['appendTo'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
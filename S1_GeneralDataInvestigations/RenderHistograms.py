@@ -0,0 +1,51 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import glob
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.Histograms import loadHistogram, renderHistogram
+
+"""RenderHistograms.py is a script that draws the histograms again from their saved bin counts.
+
+The scripts that produce histograms save the bin counts and style of each plot next to the plot as a json file, e.g.
+Output/Histogram.transactionAmount.10bins.json.  This script reads the json files matching
+<inputPath><dsName>.*.<dsNameExtension> and draws each plot again without reading the dataset.  The plots can be
+restyled by editing the json files, and drawn in another format with --plotExtension, e.g. svg or pdf.
+
+The plots are saved next to the json files.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Render Histograms
+def renderHistograms(inputPath, dsName, dsNameExtension, plotExtension):
+    histogramFiles = sorted(glob.glob(inputPath + dsName + '.*.' + dsNameExtension))
+    print("Number of histograms found: " + str(len(histogramFiles)))
+
+    for histogramFile in histogramFiles:
+        plotFile = histogramFile.rsplit('.', 1)[0] + '.' + plotExtension
+        renderHistogram(loadHistogram(histogramFile), plotFile)
+        print("Histogram drawn: " + plotFile)
+
+
+# Read in the location of the bin counts
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'plotExtension': 'png'})
+
+# Execute renderHistograms with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    renderHistograms(inputPath, dsName, dsNameExtension, options['plotExtension'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
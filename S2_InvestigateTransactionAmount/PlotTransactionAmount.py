@@ -4,22 +4,31 @@ import os
 import sys
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.Histograms import computeHistogram, plotHistogram
+from S0_HelperClassLibrary.Crosstabs import segmentCrosstabs
 
 """ PlotTransactionAmount.py performs a simple histogram and explores when behaviors when transaction amount = 0.
 
-This script expects a json lines datasets.  It produces histograms of the raw transaction amount field in bins of 10 and
+This script expects a json lines or parquet dataset.  It produces histograms of the raw transaction amount field in bins of 10 and
 40.  For further analysis of transaction amount, an indicator variable gIndTransAmtEq0 is created to separate
 transactions with 0 amounts from those with positive amounts.  With this indicator, the following exhibits are produced:
     - Histogram of Transaction Type by Indicator
     - Cross tabs of each field with the Indicator
     - Frequency of merchants with transaction amounts = 0
 
+The bin counts of each histogram are saved next to the plot as Output/Histogram.*.json.
+
+The cross tabs of all fields are counted in 1 pass of each field.  With --workers N the fields are spread across a pool of
+N processes, and with --topN N only the N most frequent values of each field are listed, the other values are added up
+in 1 row.
+
 The output results are saved in the Output/ directory.
 """
 print(__doc__)
@@ -31,7 +40,7 @@ startTime = datetime.now()
 os.nice(5)
 
 # Generate Histograms
-def evaluateTransactionAmount(inputPath, dsName, dsExtension):
+def evaluateTransactionAmount(inputPath, dsName, dsExtension, workers, topN):
     # Detail inputFile, outputFile, and outputResults strings
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
     outputResults = createOutputResultsName(dsName, "Histograms")
@@ -42,27 +51,16 @@ def evaluateTransactionAmount(inputPath, dsName, dsExtension):
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    # For testing use nrows=100000
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
 
     # Plot transaction amount with 10 bins
-    plt.hist(transactionData['transactionAmount'], bins=10)
-    plt.title('Transaction Amount')
-    plt.xlabel("Value")
-    plt.ylabel("Frequency")
-    plt.savefig("Output/Histogram.transactionAmount.10bins.png")
-    plt.clf()
+    plotHistogram([computeHistogram(transactionData['transactionAmount'], bins=10)],
+                  "Output/Histogram.transactionAmount.10bins.png", 'Transaction Amount')
 
     # Plot transaction amount with 40 bins
-    plt.hist(transactionData['transactionAmount'], bins=40)
-    plt.title('Transaction Amount')
-    plt.xlabel("Value")
-    plt.ylabel("Frequency")
-    plt.savefig("Output/Histogram.transactionAmount.40bins.png")
-    plt.clf()
+    plotHistogram([computeHistogram(transactionData['transactionAmount'], bins=40)],
+                  "Output/Histogram.transactionAmount.40bins.png", 'Transaction Amount')
 
     # Add indicator when transaction information matches
     transactionData['gIndTransAmtEq0'] = np.where(transactionData['transactionAmount'] == 0, "Zero", "Positive")
@@ -70,25 +68,22 @@ def evaluateTransactionAmount(inputPath, dsName, dsExtension):
     # Plot transaction type when transaction amount = 0 and positive
     x1 = transactionData.loc[transactionData.gIndTransAmtEq0 == 'Zero', 'transactionType']
     x2 = transactionData.loc[transactionData.gIndTransAmtEq0 == 'Positive', 'transactionType']
-    plt.hist(x1, color='b', label='TranAmt=Zero')
-    plt.hist(x2, color='r', label='TranAmt=Positive')
-    plt.title('Transaction Type by Transaction Amount Indicator')
-    plt.xlabel("Value")
-    plt.ylabel("Frequency")
-    plt.legend()
-    plt.savefig("Output/Histogram.transactionAmount.transactionType.png")
-    plt.clf()
+    plotHistogram([computeHistogram(x1, color='b', label='TranAmt=Zero'),
+                   computeHistogram(x2, color='r', label='TranAmt=Positive')],
+                  "Output/Histogram.transactionAmount.transactionType.png",
+                  'Transaction Type by Transaction Amount Indicator', legend=True)
 
 
     # Produce cross-tabs of each field with transaction amount grouped (0, Positive)
+    fieldCrosstabs = segmentCrosstabs(transactionData, list(transactionData.columns), 'gIndTransAmtEq0', workers, topN)
     with open(outputResults, 'w') as output:
         print('Input file is: ' + inputFile, file=output)
         print('Output results are found here: ' + outputResults, file=output)
         print('Output histograms are found here: Output/Histogram.*.png', file=output)
-        for column in transactionData:
+        for (column, crosstab) in zip(transactionData.columns, fieldCrosstabs):
             # Produce frequency
             print("---------" + column + "--------", file=output)
-            print(pd.crosstab(transactionData[column], transactionData['gIndTransAmtEq0']), file=output)
+            print(crosstab, file=output)
 
         # Select merchants that have transaction values = 0
         x3 = transactionData.loc[transactionData.gIndTransAmtEq0 == 'Zero', 'merchantName']
@@ -100,10 +95,11 @@ def evaluateTransactionAmount(inputPath, dsName, dsExtension):
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'workers': 1, 'topN': 0})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-evaluateTransactionAmount(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    evaluateTransactionAmount(inputPath, dsName, dsNameExtension, options['workers'], options['topN'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -0,0 +1,140 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import tempfile
+import subprocess
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.SyntheticTransactions import createSyntheticTransactions
+from S0_HelperClassLibrary.DatasetStorage import writeDatasetChunks
+
+"""BenchmarkSortData.py is a script that compares the in-memory and external sort of SortData.py.
+
+This script generates unsorted synthetic transactions datasets of --nrows times each of --scales records, by default
+1x, 10x and 50x the size of the transactions dataset.  Each dataset is sorted by SortData.py in memory and with
+--externalSort 1 in a separate process.  The following is produced:
+    - Run time and peak memory of each sort
+    - Check that both sorts write the same records in the same order
+
+The in-memory sort of the largest datasets may run out of memory, it is then reported as failed.  The datasets are
+written to a temporary directory in the current directory and removed at the end.
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Benchmark the in-memory and external sort
+def benchmarkSortData(nrows, seed, scales, runSize):
+    outputResults = 'Output/Output.BenchmarkSortData.' + str(nrows) + '.txt'
+    print("Output results are found here: " + outputResults)
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    with open(outputResults, 'w') as output, tempfile.TemporaryDirectory(dir='.') as directory:
+        for scale in scales:
+            # Generate the dataset nrows records at a time
+            inputFile = os.path.join(directory, 'transactions.' + str(scale) + 'x.parquet')
+            chunkedData = (createSyntheticTransactions(nrows, seed + block, sort=False) for block in range(scale))
+            numberOfRecords = writeDatasetChunks(chunkedData, inputFile)
+
+            print("---------Synthetic Dataset " + str(scale) + "x--------", file=output)
+            print("Number of rows: " + str(numberOfRecords), file=output)
+
+            sortResults = {}
+            for externalSort in [False, True]:
+                sortDirectory = os.path.join(directory, 'external' if externalSort else 'inMemory')
+                os.makedirs(sortDirectory, exist_ok=True)
+                os.symlink(os.path.abspath(inputFile), os.path.join(sortDirectory, 'transactions.parquet'))
+                sortResults[externalSort] = runSortData(sortDirectory, externalSort, runSize)
+                os.remove(os.path.join(sortDirectory, 'transactions.parquet'))
+
+                (runTime, peakMemory, returnCode) = sortResults[externalSort]
+                sortName = "external (runSize " + str(runSize) + ")" if externalSort else "in-memory"
+                if returnCode == 0:
+                    print(sortName + ": " + str(runTime) + ", peak memory " + str(peakMemory // 1024) + " MB",
+                          file=output)
+                else:
+                    print(sortName + ": failed with return code " + str(returnCode) + " after " + str(runTime) +
+                          ", peak memory " + str(peakMemory // 1024) + " MB", file=output)
+
+            # Both sorts have to write the same records in the same order
+            if sortResults[False][2] == 0 and sortResults[True][2] == 0:
+                print("Run time of the external sort / in-memory sort: " +
+                      str(sortResults[True][0] / sortResults[False][0]), file=output)
+                print("Peak memory of the in-memory sort / external sort: " + str(sortResults[False][1] / sortResults[True][1]),
+                      file=output)
+                outputsMatch = datasetsMatch(os.path.join(directory, 'inMemory', 'transactions.Sorted.parquet'),
+                                             os.path.join(directory, 'external', 'transactions.Sorted.parquet'))
+                print("Sorted datasets match: " + str(outputsMatch), file=output)
+            output.flush()
+
+            # Remove the datasets before the next scale
+            os.remove(inputFile)
+            for sortDirectory in ['inMemory', 'external']:
+                sortedFile = os.path.join(directory, sortDirectory, 'transactions.Sorted.parquet')
+                if os.path.exists(sortedFile):
+                    os.remove(sortedFile)
+    output.close()
+
+
+# Run SortData.py in a separate process and measure its run time and peak memory
+def runSortData(sortDirectory, externalSort, runSize):
+    # The results of SortData.py are written to the Output/ directory of the sort directory
+    runStart = datetime.now()
+    process = subprocess.Popen([sys.executable, os.path.join(DIR, 'S3_InvestigateDuplicateTransactions', 'SortData.py'),
+                                '--inputPath', './', '--dsName', 'transactions', '--dsNameExtension', 'parquet',
+                                '--storageFormat', 'parquet', '--externalSort', str(int(externalSort)),
+                                '--runSize', str(runSize)], cwd=sortDirectory, stdout=subprocess.DEVNULL)
+    (pid, status, resourceUsage) = os.wait4(process.pid, 0)
+    runTime = datetime.now() - runStart
+
+    # Peak resident memory of the process in KB
+    return runTime, resourceUsage.ru_maxrss, os.waitstatus_to_exitcode(status)
+
+
+# Compare 2 parquet datasets one field at a time
+def datasetsMatch(firstFile, secondFile):
+    firstSchema = pq.read_schema(firstFile)
+    if firstSchema.names != pq.read_schema(secondFile).names:
+        return False
+    for column in firstSchema.names:
+        # The row groups and the categories of each file can differ, the values are compared
+        firstField = pq.read_table(firstFile, columns=[column]).column(0)
+        secondField = pq.read_table(secondFile, columns=[column]).column(0)
+        if pa.types.is_dictionary(firstField.type):
+            firstField = firstField.cast(firstField.type.value_type)
+        if pa.types.is_dictionary(secondField.type):
+            secondField = secondField.cast(secondField.type.value_type)
+        if not firstField.equals(secondField):
+            return False
+    return True
+
+
+# Read in the size of the synthetic datasets, by default the size of the transactions dataset
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'nrows': 786363, 'seed': 0,
+                                                                                   'scales': '1,10,50',
+                                                                                   'runSize': 1000000})
+
+# Execute benchmarkSortData with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    benchmarkSortData(options['nrows'], options['seed'], [int(scale) for scale in options['scales'].split(',')],
+                      options['runSize'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
@@ -0,0 +1,88 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import pandas as pd
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsBenchmark
+from S0_HelperClassLibrary.SyntheticTransactions import createSyntheticTransactions
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.TagDuplicates import tagDuplicateTransactions, tagDuplicateTransactionsIterrows
+
+"""BenchmarkTagDuplicates.py is a script that compares the vectorized and iterrows duplicate tagging.
+
+This script generates a synthetic sorted transactions dataset and tags duplicates with both implementations.  The
+following is produced:
+    - Run time of each implementation and the speed up
+    - Check that every generated field matches between the two implementations
+    - Number of duplicate records by transaction type
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Benchmark duplicate tagging
+def benchmarkTagDuplicates(nrows, seed):
+    outputResults = 'Output/Output.BenchmarkTagDuplicates.' + str(nrows) + '.txt'
+    print("Output results are found here: " + outputResults)
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Generate sorted synthetic data and convert transaction date time to a date type
+    transactionData = createSyntheticTransactions(nrows, seed)
+    transactionData['gTransactionDateTime'] = parseDates(transactionData['transactionDateTime'],
+                                                         TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+
+    # Time both implementations on their own copy of the data
+    vectorizedStart = datetime.now()
+    vectorizedData = tagDuplicateTransactions(transactionData.copy())
+    vectorizedTime = datetime.now() - vectorizedStart
+
+    iterrowsStart = datetime.now()
+    iterrowsData = tagDuplicateTransactionsIterrows(transactionData.copy())
+    iterrowsTime = datetime.now() - iterrowsStart
+
+    with open(outputResults, 'w') as output:
+        print("---------Synthetic Dataset--------", file=output)
+        print("Number of rows: " + str(len(transactionData.index)), file=output)
+        print("Number of customers: " + str(transactionData['customerId'].nunique()), file=output)
+
+        print("---------Run Time--------", file=output)
+        print("iterrows: " + str(iterrowsTime), file=output)
+        print("vectorized: " + str(vectorizedTime), file=output)
+        print("Speed up: " + str(iterrowsTime / vectorizedTime), file=output)
+
+        # Every g field has to match, empty values are treated as equal
+        print("---------Fields Match--------", file=output)
+        for column in vectorizedData:
+            if column.startswith('gIndChange') or column.startswith('gIndDuplicate') or \
+                    column.startswith('gIndMerch') or column.startswith('gChange'):
+                fieldsMatch = vectorizedData[column].equals(iterrowsData[column].astype(vectorizedData[column].dtype))
+                print(column + ": " + str(fieldsMatch), file=output)
+
+        print("---------Number of Duplicate Records By Transaction Type--------", file=output)
+        print(pd.crosstab(vectorizedData['gIndDuplicateTransaction'], vectorizedData['transactionType']), file=output)
+    output.close()
+
+
+# Read in the size of the synthetic dataset
+(nrows, seed) = readArgsBenchmark(sys.argv[1:])
+
+# Execute benchmarkTagDuplicates with the passed in arguments
+benchmarkTagDuplicates(nrows, seed)
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
@@ -3,24 +3,44 @@
 import os
 import sys
 import pandas as pd
-import numpy as np
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetStorage import writeDataset
+from S0_HelperClassLibrary.DatasetLoader import TRANSACTION_SCHEMA, loadDataset
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.StageCache import fileHash
+from S0_HelperClassLibrary.TagDuplicates import tagDuplicateTransactions, tagDuplicateTransactionsPartitioned, \
+    appendDuplicateTransactions, duplicateStateOf, saveDuplicateState, loadDuplicateState
 
 """InvestigateAndTagDuplicates.py is a script that explores and identifies reversals and duplicate transactions.
 
-This script expects a jsonl dataset sorted by customer id, account number, transaction amount, and transaction date-time.
+This script expects a jsonl or parquet dataset sorted by customer id, account number, transaction amount, and transaction date-time.
 There are multiple calculations to determine the difference from the previous transaction in amount, time, and other
-critical fields.
+critical fields.  The differences are calculated on whole columns by comparing each record with the previous record.
 
 The script identifies transactions that are considered duplicates.  Duplicates are defined as:
     - Multiple swipes of purchases within 1 minute
     - Reversals of purchase transactions within 1 month
 
+With --partitions N the customers are hash partitioned into N partitions that are sorted and tagged by --workers
+processes.  The dataset does not need to be sorted by SortData.py first, e.g. the withKey dataset can be passed in.
+The output dataset is the same as SortData.py followed by this script.
+
+The sort keys, merchant name, transaction type, and key of the sorted records are saved in
+Output/State.<dsName>.DuplicatesIdentified.pkl.  With --appendTo <dsName of the dataset> the input dataset is a new
+batch of transactions of that dataset, e.g. the withKey dataset of a day, and does not need to be sorted.  Only the
+batch is read.  The earlier records of the customers of the batch are taken from the saved state, and only these
+customers are sorted and tagged.  The output dataset is the sorted batch, e.g. transactionsBatch.DuplicatesIdentified,
+and the earlier records whose previous record is now a record of the batch are written with their new g fields to the
+DuplicatesRetagged dataset of the batch.  Together they have the same g fields as running SortData.py and this script
+on the dataset with the batch appended.  The hash of each batch file is kept in the state, and a batch that has already
+been added is refused.
+
 The output results are saved in the Output/ directory.
 """
 print(__doc__)
@@ -31,119 +51,45 @@ startTime = datetime.now()
 os.nice(5)
 
 # Generate Histograms
-def investigateAndTagDuplicates(inputPath, dsName, dsNameExtension):
-    # Concatenate arguments to obtain input and output file locations.
+def investigateAndTagDuplicates(inputPath, dsName, dsNameExtension, storageFormat, partitions, workers, appendTo):
+    # Concatenate arguments to obtain input and output file locations.  A batch is added to the state of the dataset it
+    # is appended to.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputFile = createOutputFileName(inputPath, dsName, "jsonl", "DuplicatesIdentified", conversion=0)
+    outputFile = createOutputFileName(inputPath, dsName, "jsonl", "DuplicatesIdentified", conversion=0, storageFormat=storageFormat)
     outputResults = createOutputResultsName(dsName, "DuplicatesIdentified")
+    stateFile = createStateFileName(appendTo or dsName, "DuplicatesIdentified")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    # For testing use nrows=100000
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=10000, nrows=10000)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
 
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
         os.makedirs('Output')
 
     # Convert transaction date time to a date type
-    transactionData['gTransactionDateTime'] = pd.to_datetime(transactionData['transactionDateTime'])
-
-    # Create empty lists
-    indChangeInCustomerIdList = []
-    indDuplicateTransactionList = []
-    indMerchNameMatchList = []
-    changeInTransactionAmountList = []
-    changeInTransactionTimeList = []
-    changeInTransactionTimeMonthsList = []
-    changeInTransactionTimeDaysList = []
-    changeInTransactionTimeMinutesList = []
-    customerIndexList = []
-
-    # Initialize customer references
-    customerIndex = 1
-    previousCustomerId = 0
-
-    for index, row in transactionData.iterrows():
-        # If customer id from this row doesn't match previous customer id, no changes exist in fields of interest.
-        if row['customerId'] != previousCustomerId:
-            customerIndex = customerIndex + 1
-            indChangeInCustomerId = 'True'
-            indMerchNameMatch = 'False'
-            changeInTransactionAmount = None
-            changeInTransactionTime = None
-            changeInTransactionTimeMonths = None
-            changeInTransactionTimeDays = None
-            changeInTransactionTimeMinutes = None
-        # If customer id from this row does match previous customer id, calculate differences in fields of interest.
-        elif row['customerId'] == previousCustomerId:
-            customerIndex = previousCustomerIndex
-            indChangeInCustomerId = 'False'
-            changeInTransactionAmount = row['transactionAmount'] - previousTransactionAmount
-            if row['merchantName'] == previousMerchantName:
-                indMerchNameMatch = 'True'
-            else:
-                indMerchNameMatch = 'False'
-            changeInTransactionTime = row['gTransactionDateTime'] - previousTransactionDateTime
-            changeInTransactionTimeMonths = changeInTransactionTime / np.timedelta64(1, "M")
-            changeInTransactionTimeDays = changeInTransactionTime / np.timedelta64(1, "D")
-            changeInTransactionTimeMinutes = changeInTransactionTime / np.timedelta64(1, "m")
-
-        # Transaction processed, set previous values for processing of next record
-        previousCustomerId = row['customerId']
-        previousCustomerIndex = customerIndex
-        previousTransactionAmount = row['transactionAmount']
-        previousMerchantName = row['merchantName']
-        previousTransactionDateTime = row['gTransactionDateTime']
-
-        # Flag duplicate transactions, set default to false
-        indDuplicateTransaction = 'False'
-
-        # Reversals are duplicates of purchases and can occur within 1 month
-        if row['transactionType'] == 'REVERSAL':
-            if indChangeInCustomerId == 'False' and \
-                changeInTransactionAmount == 0 and \
-                indMerchNameMatch == 'True' and \
-                changeInTransactionTimeMonths <= 1 and \
-                changeInTransactionTimeMonths >= 0:
-                indDuplicateTransaction = 'True'
-
-        # Duplicate purchases are multiple swipes and occur within 1 minute
-        elif row['transactionType'] == 'PURCHASE':
-            if indChangeInCustomerId == 'False' and \
-                changeInTransactionAmount == 0 and \
-                indMerchNameMatch == 'True' and \
-                changeInTransactionTimeMinutes <= 1 and \
-                changeInTransactionTimeMinutes >= 0:
-                indDuplicateTransaction = 'True'
-
-        # Append this transactions information to the lists
-        indChangeInCustomerIdList.append(indChangeInCustomerId)
-        indDuplicateTransactionList.append(indDuplicateTransaction)
-        indMerchNameMatchList.append(indMerchNameMatch)
-        changeInTransactionAmountList.append(changeInTransactionAmount)
-        changeInTransactionTimeList.append(changeInTransactionTime)
-        changeInTransactionTimeMonthsList.append(changeInTransactionTimeMonths)
-        changeInTransactionTimeDaysList.append(changeInTransactionTimeDays)
-        changeInTransactionTimeMinutesList.append(changeInTransactionTimeMinutes)
-        customerIndexList.append(customerIndex)
-
-    # Add lists to the dataframe, g fields are generated
-    transactionData['gIndChangeInCustomerId'] = indChangeInCustomerIdList
-    transactionData['gIndDuplicateTransaction'] = indDuplicateTransactionList
-    transactionData['gIndMerchNameMatch'] = indMerchNameMatchList
-    transactionData['gChangeInTransactionAmount'] = changeInTransactionAmountList
-    transactionData['gChangeInTransactionTime'] = changeInTransactionTimeList
-    transactionData['gChangeInTransactionTimeMonths'] = changeInTransactionTimeMonthsList
-    transactionData['gChangeInTransactionTimeDays'] = changeInTransactionTimeDaysList
-    transactionData['gChangeInTransactionTimeMinutes'] = changeInTransactionTimeMinutesList
+    transactionData['gTransactionDateTime'] = parseDates(transactionData['transactionDateTime'],
+                                                         TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+
+    # Calculate differences from the previous transaction and tag duplicates, g fields are generated.  The records
+    # needed for the next batch are saved.
+    if appendTo:
+        (transactionData, retaggedData, duplicateState) = appendDuplicateTransactions(loadDuplicateState(stateFile),
+                                                                                      transactionData,
+                                                                                      fileHash(inputFile))
+        writeDataset(retaggedData, createOutputFileName(inputPath, dsName, "jsonl", "DuplicatesRetagged",
+                                                        conversion=0, storageFormat=storageFormat))
+    else:
+        if partitions > 0:
+            transactionData = tagDuplicateTransactionsPartitioned(transactionData, partitions, workers)
+        else:
+            transactionData = tagDuplicateTransactions(transactionData)
+        duplicateState = duplicateStateOf(transactionData, fileHash(inputFile))
+    saveDuplicateState(duplicateState, stateFile)
 
     # Write out dataset
-    transactionData.to_json(outputFile, orient="records", lines=True)
+    writeDataset(transactionData, outputFile)
 
     datasetShapeInfo(transactionData, inputFile, outputResults)
 
@@ -172,10 +118,14 @@ def investigateAndTagDuplicates(inputPath, dsName, dsNameExtension):
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT,
+                                                                                   'partitions': 0, 'workers': 1,
+                                                                                   'appendTo': ''})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-investigateAndTagDuplicates(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    investigateAndTagDuplicates(inputPath, dsName, dsNameExtension, options['storageFormat'], options['partitions'],
+                                options['workers'], options['appendTo'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -7,14 +7,23 @@ import pandas as pd
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetStorage import writeDataset
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.ExternalSort import externalSortDataset
+from S0_HelperClassLibrary.PipelineStages import SORT_KEYS, sortTransactions
 
 """"SortData.py is a script that sorts data in ascending customer id, account id, transaction amount, transaction date-time.
 
-This script expects the data to be a json lines dataset.  Both before and after the sort, there is a print of the first
-five records.
+This script expects the data to be a json lines or parquet dataset.  Both before and after the sort, there is a print of the first
+five records.  The sort is stable, records with the same keys keep the order of the input dataset.
+
+With --externalSort 1 the dataset is not held in memory.  Every --runSize records are sorted and spilled to disk, then
+the sorted runs are merged into the output dataset.  The output dataset has the same records in the same order as the
+in-memory sort.
 
 The output results are saved in the Output/ directory.
 """
@@ -26,21 +35,22 @@ startTime = datetime.now()
 # Priority on the server
 os.nice(5)
 
-# Generate Histograms
-def sortData(inputPath, dsName, dsNameExtension):
+# Sort Data
+def sortData(inputPath, dsName, dsNameExtension, storageFormat, externalSort, runSize):
     # Concatenate arguments to obtain input and output file locations.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputFile = createOutputFileName(inputPath, dsName, dsNameExtension, "Sorted", conversion=0)
+    outputFile = createOutputFileName(inputPath, dsName, dsNameExtension, "Sorted", conversion=0, storageFormat=storageFormat)
     outputResults = createOutputResultsName(dsName, "SortData")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    # For testing use nrows=100000
-    #chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=1000, nrows=100000)
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=10000)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
+
+    if externalSort:
+        externalSortData(inputFile, outputFile, outputResults, runSize)
+        return
+
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
 
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
@@ -54,21 +64,44 @@ def sortData(inputPath, dsName, dsNameExtension):
         print(transactionData.head(), file=output)
 
         # Sort data by (customer id, account number, transaction amount, transaction date time)
-        dataSorted = transactionData.sort_values(["customerId", "accountNumber", "transactionAmount", "transactionDateTime"])
+        dataSorted = sortTransactions(transactionData)
 
         # Write out dataset
-        dataSorted.to_json(outputFile, orient="records", lines=True)
+        writeDataset(dataSorted, outputFile)
 
         print("---------File Header After Sort--------", file=output)
         print(dataSorted.head(), file=output)
     output.close()
 
 
+# Sort data with sorted runs spilled to disk
+def externalSortData(inputFile, outputFile, outputResults, runSize):
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    (firstRecords, sortedFirstRecords, numberOfRuns) = externalSortDataset(inputFile, outputFile, SORT_KEYS, runSize)
+
+    with open(outputResults, 'w') as output:
+        print('Input file is: ' + inputFile, file=output)
+        print('Output file is: ' + outputFile, file=output)
+        print('Output results are found here: ' + outputResults, file=output)
+        print("---------File Header Before Sort--------", file=output)
+        print(firstRecords, file=output)
+        print("---------File Header After Sort--------", file=output)
+        print(sortedFirstRecords, file=output)
+        print("Number of sorted runs spilled to disk: " + str(numberOfRuns), file=output)
+    output.close()
+
+
 # Create infile and outfile
-(inputFile, outputFile, outputResults) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT,
+                                                                                   'externalSort': False,
+                                                                                   'runSize': 1000000})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-sortData(inputFile, outputFile, outputResults)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    sortData(inputPath, dsName, dsNameExtension, options['storageFormat'], options['externalSort'], options['runSize'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -3,20 +3,44 @@
 import os
 import sys
 import pandas as pd
-import numpy as np
 from datetime import datetime
 # from pandas.util import hash_pandas_object
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgs
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetStorage import writeDataset, writeDatasetChunks
+from S0_HelperClassLibrary.DatasetLoader import loadDataset, loadDatasetChunks
+from S0_HelperClassLibrary.TagDuplicates import mergeTaggedBatch
+from S0_HelperClassLibrary.RiskTables import DEFAULT_RISK_TABLES, loadRiskTables, riskTableFieldName
+from S0_HelperClassLibrary.PipelineStages import addTransactionFeatures
+from S0_HelperClassLibrary.VelocityFeatures import addVelocityFeatures, appendVelocityFeatures, velocityStateOf, \
+    saveVelocityState, loadVelocityState
 
 """"AddFeatures.py is a script that adds simple features to the dataset for use in modeling.
 
 This script adds simple features including time since address change and a risk table of merchant category code.  This
 script also adds a customer id hash and a partition group.
 
+The risk tables are the WOE of each category of a field.  By default the merchant category code risk table is the
+precomputed one.  With --riskTables <file> the risk tables learned by BuildRiskTables.py are applied instead, e.g.
+Output/RiskTables.transactions.json, and a g<Field>RiskTable field is added for each field in the file.  Categories
+that are not in a learned risk table have a WOE of 0, and categories that are not in the precomputed risk table are
+missing, so that gMCCRiskTable is 1 as before.
+
+The velocity features are the number of transactions, total transaction amount, and number of distinct merchants of the
+customer in the last 1 hour, 24 hours, 7 days, and 30 days including the transaction, and the hours since the previous
+card not present transaction of the customer.  The windows of all transactions are computed with cumulative sums over
+the transactions ordered by customer and date-time.  The transactions needed for later batches are saved in
+Output/State.<dsName>.Velocity.pkl.  With --appendTo <dsName of the dataset> the input dataset is a new batch of
+transactions of that dataset with later date-times.  The velocity features of the batch are computed from the saved
+state.  The batch is merged into the <dsName>.withFeatures dataset of the earlier runs one chunk at a time, and the
+earlier records tagged again by the batch in <batch dsName>.DuplicatesRetagged of InvestigateAndTagDuplicates.py take
+their new g fields by key, so the dataset has the records in the same order and with the same fields as a full run.
+CheckAppendBatch.py checks this against a full recompute.
+
 The output results are saved in the Output/ directory.
 """
 print(__doc__)
@@ -28,21 +52,19 @@ startTime = datetime.now()
 os.nice(5)
 
 # Add key and drop fields
-def addFeatures(inputPath, dsName, dsNameExtension):
-    # Concatenate arguments to obtain input and output file locations.
+def addFeatures(inputPath, dsName, dsNameExtension, storageFormat, riskTablesFile, appendTo):
+    # Concatenate arguments to obtain input and output file locations.  A batch is added to the output dataset of the
+    # dataset it is appended to and reported on its own.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
-    outputFile = createOutputFileName(inputPath, dsName, "jsonl", "withFeatures", conversion=0)
+    outputFile = createOutputFileName(inputPath, appendTo or dsName, "jsonl", "withFeatures", conversion=0, storageFormat=storageFormat)
     outputResults = createOutputResultsName(dsName, "AddFeatures")
+    stateFile = createStateFileName(appendTo or dsName, "Velocity")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
 
-    # Read in data with chunksize to reduce CPU needs
-    # For testing set chunksize and nrows to desired row count
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=10, nrows=10)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
 
     # Create Output directory if it doesn't exist
     if not os.path.exists('Output'):
@@ -54,47 +76,32 @@ def addFeatures(inputPath, dsName, dsNameExtension):
     # Add sample set for validation by taking last digit of customer id hash
     # transactionData['gPartition'] = transactionData['gCustomerIdHash'] % 10
 
-    # Add features that don't require previous transaction knowledge
-    # Format dates
-    transactionData['gTransactionDateTime'] = pd.to_datetime(transactionData['transactionDateTime'])
-    transactionData['gDateOfLastAddressChange'] = pd.to_datetime(transactionData['dateOfLastAddressChange'])
-    transactionData['gAccountOpenDate'] = pd.to_datetime(transactionData['accountOpenDate'])
-
-    # Calculate number of days since address change.  Default value = 365 which is higher than the maximum calculated value.
-    transactionData['gNumDaysSinceLastAddressChange'] = np.where(transactionData['dateOfLastAddressChange'] == transactionData['accountOpenDate'],
-                                                                 365, (transactionData['gTransactionDateTime'] - transactionData['gDateOfLastAddressChange']) / np.timedelta64(1, "D"))
-
-    # Calculate if move happened in last 30 days
-    transactionData['gIndLastAddressChangeWithin30Days'] = np.where(transactionData['gNumDaysSinceLastAddressChange'] <= 30, 1, 0)
-
-    # Calculate Months Open
-    transactionData['gNumMonthsOpen'] = (transactionData['gTransactionDateTime'] - transactionData['gAccountOpenDate']) / np.timedelta64(1, "M")
-
-    # Add risk table for merchant category code.  Risk table value is a smoothed WOE.
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'airline', 'gMerchantCategoryCodeRiskTable'] = -0.807063458
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'auto', 'gMerchantCategoryCodeRiskTable'] = 0.224553926
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'cable / phone', 'gMerchantCategoryCodeRiskTable'] = 3.098851402
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'entertainment', 'gMerchantCategoryCodeRiskTable'] = 0.277485754
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'fastfood', 'gMerchantCategoryCodeRiskTable'] = 0.505350348
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'food', 'gMerchantCategoryCodeRiskTable'] = 0.163152711
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'food_delivery', 'gMerchantCategoryCodeRiskTable'] = 4.567079146
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'fuel', 'gMerchantCategoryCodeRiskTable'] = 5.949616458
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'furniture', 'gMerchantCategoryCodeRiskTable'] = 0.122767859
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'gym', 'gMerchantCategoryCodeRiskTable'] = 3.567859601
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'health', 'gMerchantCategoryCodeRiskTable'] = 1.209004407
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'hotels', 'gMerchantCategoryCodeRiskTable'] = 0.771717107
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'mobileapps', 'gMerchantCategoryCodeRiskTable'] = 5.482702989
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'online_gifts', 'gMerchantCategoryCodeRiskTable'] = -0.438095045
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'online_retail', 'gMerchantCategoryCodeRiskTable'] = -0.445288768
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'online_subscriptions', 'gMerchantCategoryCodeRiskTable'] = 5.179287384
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'personal care', 'gMerchantCategoryCodeRiskTable'] = 1.247408781
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'rideshare', 'gMerchantCategoryCodeRiskTable'] = -0.464512622
-    transactionData.loc[transactionData['merchantCategoryCode'] == 'subscriptions', 'gMerchantCategoryCodeRiskTable'] = 0.517126236
-
-    # Todo: Add features that require previous transaction knowledge. Current data is too sparse
-
-    # Write out dataset
-    transactionData.to_json(outputFile, orient="records", lines=True)
+    # Add features that don't require previous transaction knowledge, and risk tables of categorical fields.  Risk table
+    # value is a smoothed WOE looked up with the category codes.
+    riskTables = loadRiskTables(riskTablesFile) if riskTablesFile else DEFAULT_RISK_TABLES
+    transactionData = addTransactionFeatures(transactionData, riskTables)
+
+    # Add velocity features that require previous transaction knowledge of the customer and save the transactions
+    # needed for the next batch
+    if appendTo:
+        (transactionData, velocityState) = appendVelocityFeatures(loadVelocityState(stateFile), transactionData)
+    else:
+        transactionData = addVelocityFeatures(transactionData)
+        velocityState = velocityStateOf(transactionData)
+    saveVelocityState(velocityState, stateFile)
+
+    # Write out dataset.  A batch is merged into the dataset one chunk at a time with the earlier records tagged again
+    # by the batch, and the dataset is replaced once the merged dataset is written.
+    if appendTo:
+        retaggedFile = createOutputFileName(inputPath, dsName, "jsonl", "DuplicatesRetagged", conversion=0,
+                                            storageFormat=detectStorageFormat(inputFile))
+        retaggedData = loadDataset(retaggedFile) if os.path.exists(retaggedFile) else None
+        appendedFile = createOutputFileName(inputPath, appendTo, "jsonl", "withFeaturesAppended", conversion=0,
+                                            storageFormat=storageFormat)
+        writeDatasetChunks(mergeTaggedBatch(loadDatasetChunks(outputFile), transactionData, retaggedData), appendedFile)
+        os.replace(appendedFile, outputFile)
+    else:
+        writeDataset(transactionData, outputFile)
 
     datasetShapeInfo(transactionData, inputFile, outputResults)
     with open(outputResults, 'a+') as output:
@@ -122,14 +129,28 @@ def addFeatures(inputPath, dsName, dsNameExtension):
         print("--------Cross Tab of Merchant Category Code Risk Table with MCC---------", file=output)
         print(pd.crosstab(transactionData['gMerchantCategoryCodeRiskTable'], transactionData['merchantCategoryCode']), file=output)
 
+        # Summary of the risk tables of the other fields
+        for field in riskTables:
+            if field != 'merchantCategoryCode':
+                print("--------Summary of " + field + " Risk Table---------", file=output)
+                print(transactionData[riskTableFieldName(field)].describe(), file=output)
+
+        print("--------Summary of Velocity Features---------", file=output)
+        velocityFields = [column for column in transactionData if column.startswith(('gNumTransactions',
+                          'gSumTransactionAmount', 'gNumDistinctMerchants', 'gHoursSincePreviousCardNotPresent'))]
+        print(transactionData[velocityFields].describe().transpose(), file=output)
+
     output.close()
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension) = readArgs(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT,
+                                                                                   'riskTables': '', 'appendTo': ''})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-addFeatures(inputPath, dsName, dsNameExtension)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    addFeatures(inputPath, dsName, dsNameExtension, options['storageFormat'], options['riskTables'],
+                options['appendTo'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -0,0 +1,91 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsBenchmark
+from S0_HelperClassLibrary.SyntheticTransactions import createSyntheticTransactions
+from S0_HelperClassLibrary.DatasetLoader import applySchema
+from S0_HelperClassLibrary.TagDuplicates import tagDuplicateTransactions
+from S0_HelperClassLibrary.ModelingPopulation import selectModelingPopulation, selectModelingPopulationIterrows
+
+"""BenchmarkCreateModelingDataset.py is a script that compares the vectorized and iterrows selection of the modeling population.
+
+This script generates a synthetic sorted transactions dataset, tags duplicates, and runs the exclusions, first fraud
+fields, and selection of CreateModelingDataset.py with both implementations and the same seed.  The following is
+produced:
+    - Run time and throughput in records per second of each implementation and the speed up
+    - Check that both datasets produced match between the two implementations
+    - Number of selected records by fraud customer indicator
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Benchmark the selection of the modeling population
+def benchmarkCreateModelingDataset(nrows, seed):
+    outputResults = 'Output/Output.BenchmarkCreateModelingDataset.' + str(nrows) + '.txt'
+    print("Output results are found here: " + outputResults)
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Generate sorted synthetic data with the types of the transaction schema and tag duplicates
+    transactionData = applySchema(createSyntheticTransactions(nrows, seed))
+    transactionData['gTransactionDateTime'] = transactionData['transactionDateTime']
+    transactionData = tagDuplicateTransactions(transactionData)
+
+    # Time both implementations on their own copy of the data
+    vectorizedStart = datetime.now()
+    (vectorizedSorted, vectorizedFiltered) = selectModelingPopulation(transactionData.copy(), seed)
+    vectorizedTime = datetime.now() - vectorizedStart
+
+    iterrowsStart = datetime.now()
+    (iterrowsSorted, iterrowsFiltered) = selectModelingPopulationIterrows(transactionData.copy(), seed)
+    iterrowsTime = datetime.now() - iterrowsStart
+
+    with open(outputResults, 'w') as output:
+        print("---------Synthetic Dataset--------", file=output)
+        print("Number of rows: " + str(len(transactionData.index)), file=output)
+        print("Number of customers: " + str(transactionData['customerId'].nunique()), file=output)
+
+        print("---------Run Time--------", file=output)
+        print("iterrows: " + str(iterrowsTime), file=output)
+        print("vectorized: " + str(vectorizedTime), file=output)
+        print("Speed up: " + str(iterrowsTime / vectorizedTime), file=output)
+
+        print("---------Throughput (Records per Second)--------", file=output)
+        print("iterrows: " + str(round(len(transactionData.index) / iterrowsTime.total_seconds())), file=output)
+        print("vectorized: " + str(round(len(transactionData.index) / vectorizedTime.total_seconds())), file=output)
+
+        # Both datasets have to match with the records in the same order
+        print("---------Datasets Match--------", file=output)
+        print("withFraudInd: " + str(vectorizedSorted.equals(iterrowsSorted) and
+                                     vectorizedSorted.index.equals(iterrowsSorted.index)), file=output)
+        print("modelingPopulation: " + str(vectorizedFiltered.equals(iterrowsFiltered) and
+                                           vectorizedFiltered.index.equals(iterrowsFiltered.index)), file=output)
+
+        print("---------Number of Selected Records By Fraud Customer Indicator--------", file=output)
+        print(vectorizedFiltered['gIndFraudCustomer'].value_counts().sort_index(), file=output)
+    output.close()
+
+
+# Read in the size of the synthetic dataset
+(nrows, seed) = readArgsBenchmark(sys.argv[1:])
+
+# Execute benchmarkCreateModelingDataset with the passed in arguments
+benchmarkCreateModelingDataset(nrows, seed)
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
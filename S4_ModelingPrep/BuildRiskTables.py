@@ -0,0 +1,91 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from sklearn.model_selection import train_test_split
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.RiskTables import RISK_TABLE_FIELDS, computeRiskTables, saveRiskTables
+
+"""BuildRiskTables.py is a script that learns smoothed weight of evidence (WOE) risk tables of categorical fields.
+
+This script expects a jsonl or parquet dataset with the target field, e.g. the withFraudInd dataset.  The risk tables
+of --fields are learned from the training population only: the records are split with --testSize and --randomState in
+the same way as the train-test split of S5_Modeling, and the test records are left out.  With --testSize 0 all records
+are used.  The WOE of each category is smoothed towards 0 with --smoothing pseudo records.
+
+The risk tables are saved as Output/RiskTables.<dsName>.json and are applied by AddFeatures.py with --riskTables.
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Learn and save the risk tables
+def buildRiskTables(inputPath, dsName, dsNameExtension, fields, targetField, smoothing, testSize, randomState):
+    # Concatenate arguments to obtain input and output file locations.
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    riskTablesFile = createRiskTablesFileName(dsName)
+    outputResults = createOutputResultsName(dsName, "RiskTables")
+
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile, columns=fields + [targetField])
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Keep the training records of the train-test split of the model
+    if testSize > 0:
+        (trainIndex, testIndex) = train_test_split(np.arange(len(transactionData.index)), test_size=testSize,
+                                                   random_state=randomState)
+        trainingData = transactionData.iloc[np.sort(trainIndex)]
+    else:
+        trainingData = transactionData
+
+    riskTables = computeRiskTables(trainingData, fields, targetField, smoothing)
+    saveRiskTables(riskTables, riskTablesFile, targetField, smoothing)
+
+    with open(outputResults, 'w') as output:
+        print("Number of records in the training population: " + str(len(trainingData.index)), file=output)
+        print("Target rate of the training population: " + str(trainingData[targetField].mean()), file=output)
+        print("Smoothing: " + str(smoothing), file=output)
+
+        for field in fields:
+            # Records, target records, and WOE of each category
+            riskTable = pd.DataFrame({'WOE': pd.Series(riskTables[field])})
+            counts = pd.crosstab(trainingData[field].astype(str), trainingData[targetField])
+            print("---------Risk Table of " + field + "--------", file=output)
+            print("Number of categories: " + str(len(riskTable.index)), file=output)
+            print(counts.join(riskTable).sort_values('WOE'), file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'fields': ','.join(RISK_TABLE_FIELDS),
+                                                                                   'targetField': 'isFraud',
+                                                                                   'smoothing': 10.0,
+                                                                                   'testSize': 0.3,
+                                                                                   'randomState': 109})
+
+# Execute buildRiskTables with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    buildRiskTables(inputPath, dsName, dsNameExtension, options['fields'].split(','), options['targetField'],
+                    options['smoothing'], options['testSize'], options['randomState'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
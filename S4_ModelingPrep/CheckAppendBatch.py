@@ -0,0 +1,125 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import pandas as pd
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset, concatChunks, TRANSACTION_SCHEMA
+from S0_HelperClassLibrary.DateParsing import parseDates
+from S0_HelperClassLibrary.PipelineStages import sortTransactions, investigateDuplicates, addTransactionFeatures
+from S0_HelperClassLibrary.TagDuplicates import appendDuplicateTransactions, duplicateStateOf, mergeTaggedBatch
+from S0_HelperClassLibrary.VelocityFeatures import addVelocityFeatures, appendVelocityFeatures, velocityStateOf
+from S0_HelperClassLibrary.RiskTables import DEFAULT_RISK_TABLES
+from S0_HelperClassLibrary.ModelingPopulation import selectModelingPopulation
+
+"""CheckAppendBatch.py is a script that checks that appending a batch gives the same datasets as a full recompute.
+
+This script splits a dataset after AddKeyIndsAndDropFields.py, e.g. transactions.withKey.parquet, by transaction
+date-time into the earlier records and a batch of the latest records.  The dataset with the batch appended is run
+through SortData.py, InvestigateAndTagDuplicates.py, AddFeatures.py, and CreateModelingDataset.py at once.  The earlier
+records are run through the same stages, and the batch is added with the states of the incremental mode of
+InvestigateAndTagDuplicates.py and AddFeatures.py, merging the batch into chunks of the earlier withFeatures dataset as
+AddFeatures.py --appendTo does.  The following is produced:
+    - Number of records of the earlier records and the batch, and the number of earlier records tagged again
+    - Check that the withFeatures, withFraudInd and modelingPopulation datasets match with the records in the same order
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Datasets of SortData.py through CreateModelingDataset.py of a dataset at once
+def fullRun(transactionData):
+    transactionData = investigateDuplicates(sortTransactions(transactionData))
+    transactionData = addVelocityFeatures(addTransactionFeatures(transactionData, DEFAULT_RISK_TABLES))
+    return transactionData.reset_index(drop=True)
+
+
+# Same values and order of two datasets, categories can list their values in a different order
+def datasetsMatch(leftData, rightData):
+    if list(leftData.columns) != list(rightData.columns) or len(leftData.index) != len(rightData.index):
+        return False
+    try:
+        pd.testing.assert_frame_equal(leftData.reset_index(drop=True), rightData.reset_index(drop=True),
+                                      check_categorical=False)
+    except AssertionError:
+        return False
+    return True
+
+
+# Check that appending a batch gives the same datasets as a full recompute
+def checkAppendBatch(inputPath, dsName, dsNameExtension, batchShare, chunksize, seed):
+    # Concatenate arguments to obtain input and output file locations
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    outputResults = createOutputResultsName(dsName, "CheckAppendBatch")
+
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # The batch has the latest transactions, as the velocity features of a batch need later date-times
+    transactionDateTime = parseDates(transactionData['transactionDateTime'],
+                                     TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+    isBatch = (transactionDateTime >= transactionDateTime.quantile(1 - batchShare)).to_numpy()
+    earlierData = transactionData[~isBatch].reset_index(drop=True)
+    batchData = transactionData[isBatch].reset_index(drop=True)
+
+    # Full recompute of the dataset with the batch appended
+    fullData = fullRun(concatChunks([earlierData.copy(), batchData.copy()]))
+
+    # Earlier records at once, then the batch from the states as InvestigateAndTagDuplicates.py and AddFeatures.py
+    # with --appendTo
+    earlierData = fullRun(earlierData)
+    duplicateState = duplicateStateOf(earlierData, 'earlier')
+    velocityState = velocityStateOf(earlierData)
+    batchData['gTransactionDateTime'] = parseDates(batchData['transactionDateTime'],
+                                                   TRANSACTION_SCHEMA['dates']['transactionDateTime'])
+    (batchData, retaggedData, duplicateState) = appendDuplicateTransactions(duplicateState, batchData, 'batch')
+    batchData = addTransactionFeatures(batchData, DEFAULT_RISK_TABLES)
+    (batchData, velocityState) = appendVelocityFeatures(velocityState, batchData)
+    earlierChunks = (earlierData.iloc[start:start + chunksize] for start in range(0, len(earlierData.index), chunksize))
+    appendedData = concatChunks(list(mergeTaggedBatch(earlierChunks, batchData, retaggedData)))
+
+    # Select the modeling population of both datasets with the same seed
+    (fullSorted, fullFiltered) = selectModelingPopulation(fullData.copy(), seed)
+    (appendedSorted, appendedFiltered) = selectModelingPopulation(appendedData.copy(), seed)
+
+    with open(outputResults, 'w') as output:
+        print("---------Number of Records--------", file=output)
+        print("Earlier records: " + str(len(earlierData.index)), file=output)
+        print("Batch: " + str(len(batchData.index)), file=output)
+        print("Earlier records tagged again: " + str(len(retaggedData.index)), file=output)
+
+        # All datasets have to match with the records in the same order
+        print("---------Datasets Match--------", file=output)
+        print("withFeatures: " + str(datasetsMatch(fullData, appendedData)), file=output)
+        print("withFraudInd: " + str(datasetsMatch(fullSorted, appendedSorted)), file=output)
+        print("modelingPopulation: " + str(datasetsMatch(fullFiltered, appendedFiltered)), file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'batchShare': 0.1,
+                                                                                   'chunksize': 10000, 'seed': 0})
+
+# Execute checkAppendBatch with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    checkAppendBatch(inputPath, dsName, dsNameExtension, options['batchShare'], options['chunksize'], options['seed'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
@@ -0,0 +1,68 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.FeatureCache import CACHE_FEATURES, loadOrBuildFeatureCache
+
+"""CreateFeatureCache.py is a script that caches the model features of a dataset for the S5_Modeling scripts.
+
+This script expects a jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFraudInd dataset.  The
+--features of the models and the --targetField labels are saved next to the dataset in <dataset>.featureCache:
+    - features.npy: contiguous float32 matrix of the features of each record
+    - labels.npy: labels of each record
+    - manifest.json: feature names, mean and standard deviation of each feature, and the sha256 hash of the dataset
+The S5_Modeling scripts memory map the cache without a copy.  The cache is only rebuilt when the hash of the dataset or
+the features change, by this script or by the first S5_Modeling script that reads it.
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+
+# Build the feature cache when it is out of date and describe it
+def createFeatureCache(inputPath, dsName, dsNameExtension, features, targetField):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    featureCacheDirectory = createFeatureCacheName(inputPath, dsName, dsNameExtension)
+    outputResults = createOutputResultsName(dsName, "FeatureCache")
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    (featureMatrix, labels, manifest) = loadOrBuildFeatureCache(inputFile, featureCacheDirectory, features, targetField)
+
+    with open(outputResults, 'w') as output:
+        print("Feature cache: " + featureCacheDirectory, file=output)
+        print("Source hash: " + manifest['sourceHash'], file=output)
+        print("Number of records: " + str(manifest['numberOfRecords']), file=output)
+        print("Target rate: " + str(labels.mean()), file=output)
+        print("Size of the feature matrix (MB): " + str(round(featureMatrix.nbytes / 2 ** 20, 1)), file=output)
+        print("---------Scaler Parameters--------", file=output)
+        for (feature, mean, scale) in zip(manifest['features'], manifest['scalerMean'], manifest['scalerScale']):
+            print(feature + ": mean " + str(mean) + " standard deviation " + str(scale), file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'features': ','.join(CACHE_FEATURES),
+                                                                                   'targetField': 'isFraud'})
+
+# Execute createFeatureCache with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    createFeatureCache(inputPath, dsName, dsNameExtension, options['features'].split(','), options['targetField'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
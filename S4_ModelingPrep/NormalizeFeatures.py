@@ -1,13 +1,15 @@
 #! /usr/bin/python4
 # Import statements
 import os
-import pandas as pd
-import numpy as np
+import sys
 from datetime import datetime
 from sklearn import svm
 from sklearn.model_selection import train_test_split
-from sklearn import preprocessing
 from sklearn import metrics
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.FeatureCache import loadOrBuildFeatureCache, scaleFeatures
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 
 # Start time of execution of the script
 startTime = datetime.now()
@@ -28,24 +30,16 @@ FEATURES = ['availableMoney',
 
 
 def Build_Data_Set():
-    transactionData = pd.read_json('/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt', lines=True)
-    #                               nrows=1000)
+    # Memory map the features from the feature cache, built first when it is out of date
+    (featureMatrix, labels, manifest) = loadOrBuildFeatureCache('/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt',
+                                                                '/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt.featureCache')
 
-    transactionData['gMCCRiskTable'] = transactionData['gMerchantCategoryCodeRiskTable'].replace(np.nan, 1)
-    transactionData['gDT'] = pd.to_datetime(transactionData['transactionDateTime'])
-    transactionData['gTransactionHour'] = transactionData['gDT'].dt.hour
+    #featureMatrix = featureMatrix[:100]
 
-    #transactionData = transactionData[:100]
+    # Standardized with the mean and standard deviation of the manifest, as preprocessing.scale
+    X = scaleFeatures(featureMatrix, manifest, FEATURES)
 
-    X = np.array(transactionData[FEATURES].values)
-    #X = np.array(transactionData[FEATURES].values).tolist())
-
-    y = (transactionData["isFraud"]
-         #.replace("underperform",0)
-         #.replace("outperform",1)
-         .values.tolist())
-
-    X = preprocessing.scale(X)
+    y = labels.tolist()
 
     return X,y
 
@@ -68,7 +62,8 @@ def Analysis():
     #print("Accuracy:", (correct_count / test_size) * 100.00)
 
 
-Analysis()
+with stageMetrics(__file__, 'transactions'):
+    Analysis()
 
 #print(transactionData.data.shape)
 
@@ -4,19 +4,35 @@ import os
 import sys
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
 DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.insert(0, DIR)
-from S0_HelperClassLibrary.ReadInArgs import readArgsWithCorrelationAndTag
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 from S0_HelperClassLibrary.DatasetSummary import datasetShapeInfo
 from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.ParallelColumns import mapColumns
+from S0_HelperClassLibrary.Histograms import computeHistogram, plotHistogram
+from S0_HelperClassLibrary.Correlations import correlationMatrix, CORRELATION_METHODS
+from S0_HelperClassLibrary.Crosstabs import segmentCrosstabs
+from S0_HelperClassLibrary.TransactionKeys import KEY_COLUMNS
 
 """ProduceCorrelationMatrixWithTag.py is a script that produces a correlation matrix and plots each variables with the tag.
 
-This script expects a jsonl dataset.  The code produces a correlation matrix based on the method as defined in the
-arguments.  In addition, there is a cross frequency of each field with the fraud tag, and two histogram of
-each fields - 1 for non-frauds and 1 for frauds.
+This script expects a jsonl or parquet dataset.  The code produces a correlation matrix based on the method as defined in the
+arguments (pearson, spearman, or kendall) with the values of DataFrame.corr.  Pearson is accumulated chunk by chunk from
+the sums and cross products of the fields, each field is ranked only once for spearman and kendall, and kendall is
+computed in O(n log n).  In addition, there is a cross frequency of each field with the fraud tag, and two histogram of
+each fields - 1 for non-frauds and 1 for frauds.  The bin counts of each histogram are saved next to the plot as
+Output/Histogram.ModelingPop.*.json.
+
+The cross frequencies of all fields are counted in 1 pass of each field, and with --topN N only the N most frequent
+values of each field are listed, the other values are added up in 1 row.
+
+With --workers N the correlation matrix, and the cross frequencies and histograms of the fields, are produced by a pool
+of N processes.  The dataset is shared with the processes through a memory mapped file, and the output is the same as
+with 1 worker.
 
 The output results are saved in the Output/ directory.
 """
@@ -29,18 +45,26 @@ os.nice(5)
 
 
 # Generate Histograms
-def produceCorrelationStats(inputPath, dsName, dsNameExtension, correlationMethod, targetField):
+def produceCorrelationStats(inputPath, dsName, dsNameExtension, correlationMethod, targetField, workers, topN):
     # Concatenate arguments to obtain input and output file locations.
     inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
     outputResults = createOutputResultsName(dsName, "Correlation")
 
     # Increase size of columns displayed in output file
     pd.set_option("display.max_columns", 500)
-    # Read in data with chunksize to reduce CPU needs
-    # For testing use nrows=100000
-    chunkedTransactionData = pd.read_json(inputFile, lines=True, chunksize=100000)
-    # Append chunked data into 1 data frame
-    transactionData = pd.concat(chunkedTransactionData, ignore_index=True)
+    # Read in data based on the extension (jsonl or parquet) with the types of the transaction schema
+    transactionData = loadDataset(inputFile)
+
+    # Durations are kept in milliseconds as they are in the json lines format
+    for column in transactionData:
+        if transactionData[column].dtype.kind == 'm':
+            transactionData[column] = transactionData[column] / np.timedelta64(1, 'ms')
+
+    # Cross frequencies and histograms of the fields.  With more than 1 worker the fields are spread across a pool of
+    # processes and the cross frequencies are written in the order of the fields.
+    fieldCrosstabs = segmentCrosstabs(transactionData, list(transactionData.columns), targetField, workers, topN)
+    mapColumns(fieldHistograms, transactionData, list(transactionData.columns), workers, sharedColumns=[targetField],
+               args=(targetField,))
 
     # Produce Frequencies on each field in the dataset
     with open(outputResults, 'w') as output:
@@ -49,56 +73,56 @@ def produceCorrelationStats(inputPath, dsName, dsNameExtension, correlationMetho
         print('Output results are found here: ' + outputResults, file=output)
 
         print("---------Correlation Matrix--------", file=output)
-        if correlationMethod == 'pearson':
-            print(transactionData.corr(method="pearson"), file=output)
-        elif correlationMethod == 'kendall':
-            print(transactionData.corr(method="kendall"), file=output)
-        elif correlationMethod == 'spearman':
-            print(transactionData.corr(method="spearman"), file=output)
-
-        for column in transactionData:
-            # Produce type, count, unique, and frequency information regardless of data type
+        if correlationMethod in CORRELATION_METHODS:
+            print(correlationMatrix(transactionData, correlationMethod, workers), file=output)
+
+        for (column, crosstab) in zip(transactionData.columns, fieldCrosstabs):
             print("---------" + column + " Crossed with Target--------", file=output)
-            print(pd.crosstab(transactionData[column], transactionData[targetField]), file=output)
+            print(crosstab, file=output)
 
     output.close()
 
-    for column in transactionData:
-        print(column)
-        if (column == targetField or column == 'gTransactionKey' or column == 'accountNumber' or column == 'customerId' or
-                column == 'merchantName' or column == 'posConditionCode'):
-            print("No histogram for:" + column)
-        else:
-             # Plot transaction type when transaction amount = 0 and positive
-             if np.dtype(transactionData[column]) == 'bool':
-                  transactionData[column] = transactionData[column].astype('str')
-
-             x1 = transactionData.loc[transactionData[targetField].values, column]
-             plt.hist(x1, color='b', label='Fraud')
-             plt.title(column + ' for frauds')
-             plt.xlabel("Value")
-             plt.ylabel("Frequency")
-             plt.legend()
-             plt.savefig("Output/Histogram.ModelingPop." + column + ".frauds.png")
-             plt.clf()
-
-             # Plot transaction type when transaction amount = 0 and positive
-             x2prep = np.invert(transactionData[targetField])
-             x2 = transactionData.loc[x2prep.values, column]
-             plt.hist(x2, color='r', label='NonFraud')
-             plt.title(column + ' for nonfrauds')
-             plt.xlabel("Value")
-             plt.ylabel("Frequency")
-             plt.legend()
-             plt.savefig("Output/Histogram.ModelingPop." + column + ".nonfrauds.png")
-             plt.clf()
+
+# Histograms of 1 field for frauds and nonfrauds
+def fieldHistograms(transactionData, column, targetField):
+    print(column)
+    if (column == targetField or column in KEY_COLUMNS or column == 'accountNumber' or column == 'customerId' or
+            column == 'merchantName' or column == 'posConditionCode'):
+        print("No histogram for:" + column)
+    else:
+         # Plot transaction type when transaction amount = 0 and positive.  The dataset is not changed, so the
+         # correlation matrix keeps the boolean fields.
+         field = transactionData[column]
+         if field.dtype == 'bool':
+              field = field.astype('str')
+
+         # Empty values are not plotted, e.g. gDateFirstFraud of nonfrauds
+         x1 = field[transactionData[targetField].values].dropna()
+         if x1.count() != 0:
+             plotHistogram([computeHistogram(x1, color='b', label='Fraud')],
+                           "Output/Histogram.ModelingPop." + column + ".frauds.png", column + ' for frauds', legend=True)
+         else:
+             print("No histogram for frauds of " + column + " as data is all null.")
+
+         # Plot transaction type when transaction amount = 0 and positive
+         x2prep = np.invert(transactionData[targetField])
+         x2 = field[x2prep.values].dropna()
+         if x2.count() != 0:
+             plotHistogram([computeHistogram(x2, color='r', label='NonFraud')],
+                           "Output/Histogram.ModelingPop." + column + ".nonfrauds.png", column + ' for nonfrauds',
+                           legend=True)
+         else:
+             print("No histogram for nonfrauds of " + column + " as data is all null.")
 
 
 # Create infile and outfile
-(inputPath, dsName, dsNameExtension, correlationMethod, targetField) = readArgsWithCorrelationAndTag(sys.argv[1:])
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {
+    'correlationMethod': '', 'targetField': '', 'workers': 1, 'topN': 0})
 
 # Execute generateFrequenciesHistograms with the passed in arguments
-produceCorrelationStats(inputPath, dsName, dsNameExtension, correlationMethod, targetField)
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    produceCorrelationStats(inputPath, dsName, dsNameExtension, options['correlationMethod'], options['targetField'],
+                            options['workers'], options['topN'])
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -0,0 +1,152 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import time
+import resource
+import tracemalloc
+import pandas as pd
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics, stageStep
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetStorage import writeDataset
+from S0_HelperClassLibrary.DatasetLoader import applySchema
+from S0_HelperClassLibrary.PipelineStages import readCsvData, addKeyAndIndicators, sortTransactions, \
+    investigateDuplicates, addTransactionFeatures
+from S0_HelperClassLibrary.RiskTables import DEFAULT_RISK_TABLES, loadRiskTables
+from S0_HelperClassLibrary.VelocityFeatures import addVelocityFeatures, velocityStateOf, saveVelocityState
+from S0_HelperClassLibrary.ModelingPopulation import selectModelingPopulation
+
+"""RunPipeline.py is a script that runs the dataset stages of S1 to S4 in one process, passing the dataset in memory.
+
+This script expects the raw csv dataset of ConvertCsvToJsonl.py.  The dataset is passed between the stages as a
+DataFrame instead of being written out and read in by each script:
+    - ConvertCsvToJsonl.py: read in the csv dataset with the types of pd.read_csv
+    - AddKeyIndsAndDropFields.py: apply the types of the transaction schema, add the transaction key and indicators, and
+      drop empty fields (withKey)
+    - SortData.py: sort by customer id, account number, transaction amount, and transaction date-time (Sorted.withKey)
+    - InvestigateAndTagDuplicates.py: tag reversals and duplicate transactions (DuplicatesIdentified)
+    - AddFeatures.py: add the features, the risk tables of --riskTables, and the velocity features (withFeatures)
+    - CreateModelingDataset.py: exclusions, first fraud fields, and selection of a transaction of each customer with --seed
+The withFraudInd and modelingPopulation datasets are written out with --storageFormat.  The intermediate datasets are
+only written out for the stages of --checkpoints, e.g. 'withKey,withFeatures' or 'all', with the file names of the
+scripts, so that the scripts of later stages can be run on them.  The Output/ results of the scripts are not produced.
+The datasets are the same as running the scripts one after the other with parquet storage.
+
+The time, number of records and fields, memory of the dataset, and peak memory of the process after each stage are
+saved in Output/Output.<dsName>.Pipeline.txt.  With --traceMemory 1 the peak memory allocated by each stage is also
+measured, which slows down the stages.  The steps of each stage are also appended to the metrics file of stageMetrics.
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+# Stages that can be written out, in order
+CHECKPOINT_STAGES = ['converted', 'withKey', 'Sorted', 'DuplicatesIdentified', 'withFeatures']
+
+
+# Run the stages in memory and report the time and memory of each stage
+def runPipeline(inputPath, dsName, dsNameExtension, storageFormat, checkpoints, riskTablesFile, seed, traceMemory):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    outputResults = createOutputResultsName(dsName, "Pipeline")
+    riskTables = loadRiskTables(riskTablesFile) if riskTablesFile else DEFAULT_RISK_TABLES
+    if checkpoints == ['all']:
+        checkpoints = CHECKPOINT_STAGES
+    for checkpoint in checkpoints:
+        if checkpoint not in CHECKPOINT_STAGES:
+            raise ValueError("Checkpoints need to be all or some of: " + ', '.join(CHECKPOINT_STAGES))
+
+    # Output datasets of the stages as named by the scripts
+    storageExtension = STORAGE_EXTENSIONS[storageFormat]
+    outputFiles = {
+        'converted': createOutputFileName(inputPath, dsName, dsNameExtension, "none", conversion=1, storageFormat=storageFormat),
+        'withKey': createOutputFileName(inputPath, dsName, storageExtension, "withKey", conversion=0),
+        'Sorted': createOutputFileName(inputPath, dsName, "withKey." + storageExtension, "Sorted", conversion=0),
+        'DuplicatesIdentified': createOutputFileName(inputPath, dsName, storageExtension, "DuplicatesIdentified", conversion=0),
+        'withFeatures': createOutputFileName(inputPath, dsName, storageExtension, "withFeatures", conversion=0),
+        'withFraudInd': createOutputFileName(inputPath, dsName, storageExtension, "withFraudInd", conversion=0),
+        'modelingPopulation': createOutputFileName(inputPath, dsName, storageExtension, "modelingPopulation", conversion=0),
+    }
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    stageResults = []
+
+    def runStage(stage, stageFunction, *args):
+        if traceMemory:
+            tracemalloc.start()
+        stageStart = time.perf_counter()
+        with stageStep(stage) as step:
+            result = stageFunction(*args)
+
+            # The index is dropped as when the scripts write out the datasets.  The last dataset is the output of
+            # the stage, e.g. the modelingPopulation of selectModelingPopulation.
+            for stageData in (result if isinstance(result, tuple) else (result,)):
+                stageData.reset_index(drop=True, inplace=True)
+            step['rows'] = len(stageData.index)
+        stageSeconds = time.perf_counter() - stageStart
+        if traceMemory:
+            peakTracedMemory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if stage in checkpoints:
+            writeDataset(stageData, outputFiles[stage])
+
+        stageResults.append({'stage': stage, 'seconds': round(stageSeconds, 3), 'records': len(stageData.index),
+                             'fields': len(stageData.columns),
+                             'datasetMB': round(stageData.memory_usage(deep=True).sum() / 2 ** 20, 1),
+                             'peakTracedMB': round(peakTracedMemory / 2 ** 20, 1) if traceMemory else None,
+                             'processPeakMB': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                             'checkpoint': outputFiles[stage] if stage in checkpoints else ''})
+        print(stageResults[-1])
+        return result
+
+    transactionData = runStage('converted', readCsvData, inputFile)
+    transactionData = runStage('withKey', lambda: addKeyAndIndicators(applySchema(transactionData)))
+    transactionData = runStage('Sorted', sortTransactions, transactionData)
+    transactionData = runStage('DuplicatesIdentified', investigateDuplicates, transactionData)
+    transactionData = runStage('withFeatures', lambda: addVelocityFeatures(addTransactionFeatures(transactionData,
+                                                                                                  riskTables)))
+    if 'withFeatures' in checkpoints:
+        saveVelocityState(velocityStateOf(transactionData), createStateFileName(dsName, "Velocity"))
+    (dataSorted, dataFiltered) = runStage('modelingPopulation', selectModelingPopulation, transactionData, seed)
+    del transactionData
+    writeDataset(dataSorted, outputFiles['withFraudInd'])
+    writeDataset(dataFiltered, outputFiles['modelingPopulation'])
+
+    with open(outputResults, 'w') as output:
+        print("Input file is: " + inputFile, file=output)
+        print("Output files are: " + outputFiles['withFraudInd'] + ", " + outputFiles['modelingPopulation'], file=output)
+        print("Number of records in the modeling population: " + str(len(dataFiltered.index)), file=output)
+        print("---------Time and Memory of Each Stage--------", file=output)
+        print(pd.DataFrame(stageResults).to_string(index=False), file=output)
+        print("Total time of the stages (seconds): " + str(round(sum(result['seconds'] for result in stageResults), 3)),
+              file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'storageFormat': DEFAULT_STORAGE_FORMAT,
+                                                                                   'checkpoints': '',
+                                                                                   'riskTables': '', 'seed': 0,
+                                                                                   'traceMemory': False})
+
+# Execute runPipeline with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    runPipeline(inputPath, dsName, dsNameExtension, options['storageFormat'],
+                [checkpoint for checkpoint in options['checkpoints'].split(',') if checkpoint], options['riskTables'],
+                options['seed'], options['traceMemory'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
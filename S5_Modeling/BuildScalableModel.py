@@ -0,0 +1,100 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import resource
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from sklearn import metrics
+from sklearn.model_selection import train_test_split
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.FeatureCache import loadOrBuildFeatureCache
+from S0_HelperClassLibrary.ScoringModel import SCORING_FEATURES
+from S0_HelperClassLibrary.ScalableTraining import createScalableModel, fitMinibatches, predictMinibatches
+
+"""BuildScalableModel.py is a script that fits an SVM whose fit time and memory grow linearly with the number of records.
+
+This script expects a jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFraudInd dataset.  It is
+the scalable training mode of BuildSvmModel.py and NormalizeFeatures.py, which fit svm.SVC with a kernel matrix of all
+pairs of records.  The X7 features of BuildSvmModel.py are read from the feature cache of CreateFeatureCache.py, which
+is built first when it is out of date, standardized, and one of the following --model is fitted:
+    - sgd: linear SVM fitted by stochastic gradient descent on minibatches
+    - linearSvc: linear SVM fitted by liblinear
+    - nystroem: RBF SVM approximated by a Nystroem feature map of --components features and an SGD linear SVM
+    - rff: RBF SVM approximated by --components random Fourier features and an SGD linear SVM
+The SGD models are fitted with --epochs passes over minibatches of --batchSize records.  The classes are weighted by the
+inverse of their frequency for the fraud imbalance.  The train-test split is the one of BuildSvmModel.py.
+
+The model metrics, fit time, and peak memory are added to Output/Model.log.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(6)
+
+
+# Fit and validate a scalable model
+def buildScalableModel(inputPath, dsName, dsNameExtension, model, components, gamma, alpha, batchSize, epochs, seed):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    featureCacheDirectory = createFeatureCacheName(inputPath, dsName, dsNameExtension)
+
+    # Memory map the features of the model from the feature cache, built first when it is out of date
+    (featureMatrix, labels, manifest) = loadOrBuildFeatureCache(inputFile, featureCacheDirectory)
+    X = featureMatrix[:, [manifest['features'].index(feature) for feature in SCORING_FEATURES]].astype('float64')
+    y = np.asarray(labels)
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Create Train-Test
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=109)
+
+    # Fit time and peak memory allocated while fitting
+    (transformers, classifier) = createScalableModel(model, components, gamma if gamma > 0 else None, alpha, seed)
+    tracemalloc.start()
+    fitStart = datetime.now()
+    (transformers, classifier) = fitMinibatches(transformers, classifier, X_train, y_train, batchSize, epochs, seed)
+    fitTime = datetime.now() - fitStart
+    fitPeakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    y_pred = predictMinibatches(transformers, classifier, X_test, batchSize)
+
+    with open('Output/Model.log', 'a+') as output:
+        print('--------RUN ' + model + ' components ' + str(components) + ' batchSize ' + str(batchSize) +
+              ' epochs ' + str(epochs) + '-------', file=output)
+        print("Number of training records: " + str(len(y_train)), file=output)
+        print("Accuracy: ", metrics.accuracy_score(y_test, y_pred), file=output)
+        print("Precision:", metrics.precision_score(y_test, y_pred, zero_division=0), file=output)
+        print("Recall:", metrics.recall_score(y_test, y_pred), file=output)
+        print("Fit time: " + str(fitTime), file=output)
+        print("Peak memory allocated by the fit (MB): " + str(round(fitPeakMemory / 2 ** 20, 1)), file=output)
+        print("Peak memory of the process (MB): " + str(round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)),
+              file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'model': 'nystroem',
+                                                                                   'components': 500, 'gamma': 0.0,
+                                                                                   'alpha': 0.0001,
+                                                                                   'batchSize': 10000, 'epochs': 5,
+                                                                                   'seed': 0})
+
+# Execute buildScalableModel with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    buildScalableModel(inputPath, dsName, dsNameExtension, options['model'], options['components'], options['gamma'],
+                       options['alpha'], options['batchSize'], options['epochs'], options['seed'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
@@ -0,0 +1,82 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import numpy as np
+from datetime import datetime
+from sklearn import svm
+from sklearn import preprocessing
+from sklearn import metrics
+from sklearn.model_selection import train_test_split
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset
+from S0_HelperClassLibrary.RiskTables import DEFAULT_RISK_TABLES, loadRiskTables
+from S0_HelperClassLibrary.ScoringModel import SCORING_FEATURES, fitScoringModel, saveScoringModel
+
+"""BuildScoringModel.py is a script that fits the model used to score single transactions.
+
+This script expects a jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFraudInd dataset.  The
+X7 features of BuildSvmModel.py are standardized with a scaler fitted on the training records, as
+preprocessing.scale in NormalizeFeatures.py, and an SVM with probabilities is fitted.  The train-test split is the one
+of BuildSvmModel.py.  The scaler, the model, the features, and the risk tables of AddFeatures.py (--riskTables, or the
+precomputed merchant category code risk table) are saved together in --modelFile for ScoreTransactions.py.
+
+The model metrics are added to Output/Model.log.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(6)
+
+
+# Fit and save the scoring model
+def buildScoringModel(inputPath, dsName, dsNameExtension, riskTablesFile, modelFile):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+
+    # Read in only the fields used by the model
+    modelFields = [feature for feature in SCORING_FEATURES if feature != 'gMCCRiskTable']
+    transactionData = loadDataset(inputFile, columns=modelFields + ['gMerchantCategoryCodeRiskTable', 'isFraud'])
+    transactionData['gMCCRiskTable'] = transactionData['gMerchantCategoryCodeRiskTable'].replace(np.nan, 1)
+    riskTables = loadRiskTables(riskTablesFile) if riskTablesFile else DEFAULT_RISK_TABLES
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Create Train-Test
+    (trainData, testData) = train_test_split(transactionData, test_size=0.3, random_state=109)
+    scoringModel = fitScoringModel(trainData, trainData['isFraud'], svm.SVC(kernel='rbf', probability=True),
+                                   SCORING_FEATURES, riskTables, preprocessing.StandardScaler())
+    saveScoringModel(scoringModel, modelFile)
+    print("Scoring model is saved here: " + modelFile)
+
+    # Validate the model with the test records scaled by the scaler of the training records
+    testInput = scoringModel['scaler'].transform(testData[SCORING_FEATURES].to_numpy(dtype='float64'))
+    y_pred = scoringModel['model'].predict(testInput)
+
+    with open('Output/Model.log', 'a+') as output:
+        print('--------RUN ScoringModel ' + modelFile + '-------', file=output)
+        print("Accuracy: ", metrics.accuracy_score(testData['isFraud'], y_pred), file=output)
+        print("Precision:", metrics.precision_score(testData['isFraud'], y_pred, zero_division=0), file=output)
+        print("Recall:", metrics.recall_score(testData['isFraud'], y_pred), file=output)
+    output.close()
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'riskTables': '',
+                                                                                   'modelFile': 'Output/ScoringModel.pkl'})
+
+# Execute buildScoringModel with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    buildScoringModel(inputPath, dsName, dsNameExtension, options['riskTables'], options['modelFile'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
@@ -1,12 +1,17 @@
 #! /usr/bin/python4
 # Import statements
 import os
-import pandas as pd
+import sys
 import numpy as np
 from datetime import datetime
 from sklearn import svm
 from sklearn.model_selection import train_test_split
 from sklearn import metrics
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.FeatureCache import loadOrBuildFeatureCache
+from S0_HelperClassLibrary.ScalableTraining import MODEL_FEATURE_SETS
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
 
 # Start time of execution of the script
 startTime = datetime.now()
@@ -14,48 +19,42 @@ startTime = datetime.now()
 # Priority on the server
 os.nice(6)
 
-transactionData = pd.read_json('/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt', lines=True)
-#transactionData = pd.read_json('/home/shell/Data/CapOneDSChallenge/DS/transactions.modelingPopulation.txt', lines=True)
-transactionData['gMCCRiskTable'] = transactionData['gMerchantCategoryCodeRiskTable'].replace(np.nan, 1)
-transactionData['gDT'] = pd.to_datetime(transactionData['transactionDateTime'])
-transactionData['gTransactionHour'] = transactionData['gDT'].dt.hour
+with stageMetrics(__file__, 'transactions'):
+    # Memory map the features of the models from the feature cache, built first when it is out of date
+    (featureMatrix, labels, manifest) = loadOrBuildFeatureCache('/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt',
+                                                                '/home/shell/Data/CapOneDSChallenge/DS/transactions.withFraudInd.txt.featureCache')
+    #transactionData = pd.read_json('/home/shell/Data/CapOneDSChallenge/DS/transactions.modelingPopulation.txt', lines=True)
 
-#print(transactionData['gMerchantCategoryCodeRiskTable_Rounded'].value_counts().sort_index(1))
+    #print(transactionData['gMerchantCategoryCodeRiskTable_Rounded'].value_counts().sort_index(1))
 
-#Model iteration
-X8 = transactionData[['gTransactionHour', 'availableMoney', 'gNumMonthsOpen', 'cardPresent', 'currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable']]
-X7 = transactionData[['availableMoney', 'gNumMonthsOpen', 'cardPresent', 'currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable']]
-X6 = transactionData[['cardPresent', 'currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable']]
-X5 = transactionData[['currentBalance', 'gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable']]
-X4 = transactionData[['gIndLastAddressChangeWithin30Days', 'transactionAmount', 'gMCCRiskTable']]
-X3 = transactionData[['transactionAmount', 'gMCCRiskTable']]
-X1 = transactionData[['gMCCRiskTable']]
-#X = transactionData[['gIndCardCvvEqEnteredCVV', 'gIndLastAddressChangeWithin30Days', 'gNumMonthsOpen', 'gMerchantCategoryCodeRiskTable']]
+    #Model iteration
+    # The feature sets X1 to X8 are compared by SweepSvmModels.py
+    #X = transactionData[['gIndCardCvvEqEnteredCVV', 'gIndLastAddressChangeWithin30Days', 'gNumMonthsOpen', 'gMerchantCategoryCodeRiskTable']]
 
-X = X7
-y = transactionData['isFraud']
+    X = featureMatrix[:, [manifest['features'].index(feature) for feature in MODEL_FEATURE_SETS['X7']]]
+    y = np.asarray(labels)
 
-# Create Train-Test
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=109)
-clf = svm.SVC(kernel='rbf', probability=True)
+    # Create Train-Test
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=109)
+    clf = svm.SVC(kernel='rbf', probability=True)
 
-#clf.fit(modelingData.data, modelingData.target)
-clf.fit(X_train, y_train)
+    #clf.fit(modelingData.data, modelingData.target)
+    clf.fit(X_train, y_train)
 
-y_pred = clf.predict(X_test)
+    y_pred = clf.predict(X_test)
 
-with open('Output/Model.log', 'a+') as output:
-    print('--------RUN-------', file=output)
-    #print(clf.coef_, file=output)
+    with open('Output/Model.log', 'a+') as output:
+        print('--------RUN-------', file=output)
+        #print(clf.coef_, file=output)
 
-    # Model Accuracy on Validation set
-    print("Accuracy: ", metrics.accuracy_score(y_test, y_pred), file=output)
+        # Model Accuracy on Validation set
+        print("Accuracy: ", metrics.accuracy_score(y_test, y_pred), file=output)
 
-    # Model Precision on Validation set
-    print("Precision:", metrics.precision_score(y_test, y_pred), file=output)
+        # Model Precision on Validation set
+        print("Precision:", metrics.precision_score(y_test, y_pred), file=output)
 
-    # Model Recall on Validation set
-    print("Recall:", metrics.recall_score(y_test, y_pred), file=output)
+        # Model Recall on Validation set
+        print("Recall:", metrics.recall_score(y_test, y_pred), file=output)
 
 # Capture end time and print out run time
 endTime = datetime.now()
@@ -0,0 +1,179 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import http.client
+import numpy as np
+from datetime import datetime
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.DatasetLoader import loadDataset, TRANSACTION_SCHEMA
+from S0_HelperClassLibrary.ScoringModel import TransactionScorer, loadScoringModel
+
+"""LoadTestScoring.py is a script that measures the latency of scoring single transactions.
+
+This script expects a jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFeatures dataset.  The
+first --nrows transactions are converted to json objects with the fields of the transactions dataset and scored one
+at a time, after --warmup transactions that are not measured, with each front end of --frontEnds:
+    - inProcess: TransactionScorer in this process
+    - stdin: ScoreTransactions.py with --port 0 through its stdin and stdout
+    - http: ScoreTransactions.py with --port through a kept open HTTP connection
+The following is produced:
+    - Latency percentiles, maximum, and throughput of each front end, and if the p99 latency is under 5 ms
+    - Check that the features of TransactionScorer match the features of AddFeatures.py, and the largest
+      difference between the scores of single transactions and the scores of the same features in a batch
+
+The output results are saved in the Output/ directory.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(5)
+
+# Target latency of a transaction
+P99_TARGET_MS = 5
+# Fields generated by the scripts and not part of a transaction
+GENERATED_FIELDS = ('g', 'isFraud')
+CHECKED_FEATURES = ['gNumDaysSinceLastAddressChange', 'gIndLastAddressChangeWithin30Days', 'gNumMonthsOpen',
+                    'gMerchantCategoryCodeRiskTable']
+
+
+# Score the transactions with each front end and report the latencies
+def loadTestScoring(inputPath, dsName, dsNameExtension, modelFile, nrows, warmup, frontEnds, port):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    outputResults = createOutputResultsName(dsName, "LoadTestScoring")
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    transactionData = loadDataset(inputFile).head(nrows + warmup).reset_index(drop=True)
+    transactions = transactionRequests(transactionData)
+    scorer = TransactionScorer(loadScoringModel(modelFile))
+
+    with open(outputResults, 'w') as output:
+        print("Number of transactions: " + str(len(transactions) - warmup) + " after " + str(warmup) +
+              " warm up transactions", file=output)
+
+        for frontEnd in frontEnds:
+            if frontEnd == 'inProcess':
+                latencies = measureLatencies(lambda request: scorer.score(json.loads(request)), transactions)
+            elif frontEnd == 'stdin':
+                latencies = measureServiceLatencies(modelFile, 0, transactions)
+            elif frontEnd == 'http':
+                latencies = measureServiceLatencies(modelFile, port, transactions)
+            else:
+                raise ValueError("Front end needs to be one of: inProcess, stdin, http")
+            latencies = latencies[warmup:] * 1000
+
+            print("---------Latency of " + frontEnd + " (ms)--------", file=output)
+            for percentile in [50, 95, 99]:
+                print("p" + str(percentile) + ": " + str(round(np.percentile(latencies, percentile), 3)), file=output)
+            print("max: " + str(round(latencies.max(), 3)), file=output)
+            print("Throughput (transactions per second): " + str(round(1000 * len(latencies) / latencies.sum())),
+                  file=output)
+            print("p99 under " + str(P99_TARGET_MS) + " ms: " + str(np.percentile(latencies, 99) < P99_TARGET_MS),
+                  file=output)
+            output.flush()
+
+        # Features of single transactions and of AddFeatures.py, and scores of single transactions and of a batch
+        print("---------Features Match AddFeatures.py--------", file=output)
+        singleFeatures = [scorer.transactionFeatures(json.loads(request)) for request in transactions]
+        for feature in CHECKED_FEATURES:
+            singleFeature = np.array([features[feature] for features in singleFeatures], dtype='float64')
+            print(feature + ": " + str(np.allclose(singleFeature, transactionData[feature].to_numpy(dtype='float64'),
+                                                   equal_nan=True)), file=output)
+
+        transactionData['gMCCRiskTable'] = transactionData['gMerchantCategoryCodeRiskTable'].fillna(1)
+        batchInput = transactionData[scorer.features].to_numpy(dtype='float64')
+        if scorer.scaler is not None:
+            batchInput = scorer.scaler.transform(batchInput)
+        batchScores = scorer.model.predict_proba(batchInput)[:, scorer.fraudClass]
+        singleScores = np.array([scorer.score(json.loads(request)) for request in transactions])
+        print("Largest difference of single and batch scores: " + str(np.abs(singleScores - batchScores).max()),
+              file=output)
+    output.close()
+
+
+# Transactions as json objects with the dates in the formats of the transaction schema
+def transactionRequests(transactionData):
+    transactionFields = [column for column in transactionData
+                         if not column.startswith(GENERATED_FIELDS) and not column.endswith('DtType')]
+    transactions = transactionData[transactionFields].copy()
+    for column in transactions:
+        if transactions[column].dtype.kind == 'M':
+            transactions[column] = transactions[column].dt.strftime(TRANSACTION_SCHEMA['dates'][column])
+    return [json.dumps(transaction) for transaction in json.loads(transactions.to_json(orient='records'))]
+
+
+# Time each request of a function
+def measureLatencies(scoreFunction, requests):
+    latencies = np.empty(len(requests))
+    for (position, request) in enumerate(requests):
+        requestStart = time.perf_counter()
+        scoreFunction(request)
+        latencies[position] = time.perf_counter() - requestStart
+    return latencies
+
+
+# Time each request to ScoreTransactions.py running in a separate process
+def measureServiceLatencies(modelFile, port, requests):
+    service = subprocess.Popen([sys.executable, os.path.join(DIR, 'S5_Modeling', 'ScoreTransactions.py'),
+                                '--modelFile', modelFile, '--port', str(port)], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        if port == 0:
+            def scoreFunction(request):
+                service.stdin.write(request + '\n')
+                service.stdin.flush()
+                return json.loads(service.stdout.readline())
+        else:
+            connection = connectToService(port)
+
+            # The body is sent as bytes so that it is sent with the headers
+            def scoreFunction(request):
+                connection.request('POST', '/score', body=request.encode(), headers={'Content-Type': 'application/json'})
+                return json.loads(connection.getresponse().read())
+        return measureLatencies(scoreFunction, requests)
+    finally:
+        service.kill()
+        service.wait()
+
+
+# Wait until the service accepts connections
+def connectToService(port, timeout=60):
+    waitStart = time.time()
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return http.client.HTTPConnection('127.0.0.1', port)
+        except ConnectionRefusedError:
+            if time.time() - waitStart > timeout:
+                raise
+            time.sleep(0.1)
+
+
+# Read in the dataset, model file, and the front ends
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'modelFile': 'Output/ScoringModel.pkl',
+                                                                                   'nrows': 10000, 'warmup': 100,
+                                                                                   'frontEnds': 'inProcess,stdin,http',
+                                                                                   'port': 8765})
+
+# Execute loadTestScoring with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    loadTestScoring(inputPath, dsName, dsNameExtension, options['modelFile'], options['nrows'], options['warmup'],
+                    options['frontEnds'].split(','), options['port'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)
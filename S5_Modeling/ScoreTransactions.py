@@ -0,0 +1,85 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import json
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.ScoringModel import TransactionScorer, loadScoringModel
+
+"""ScoreTransactions.py is a service that scores single transactions with the model of BuildScoringModel.py.
+
+The scaler, the risk tables, and the model of --modelFile are loaded once and held in memory.  Each transaction is a
+json object with the fields of the transactions dataset, and the response is a json object with the fraud score, or
+with the error when the transaction can not be scored.
+    - With --port 0 the transactions are read from stdin, one per line, and the responses are written to stdout, one
+      per line.  This text is written to stderr.
+    - With --port N the transactions are posted to http://--host:N/score, one per request.
+
+No other service is needed.  LoadTestScoring.py measures the latency of both front ends.
+"""
+# stdout carries the responses of the stdin front end
+print(__doc__, file=sys.stderr)
+
+
+# Score a json transaction and return the json response
+def scoreRequest(scorer, request):
+    try:
+        return json.dumps({'score': scorer.score(json.loads(request))})
+    except (ValueError, KeyError, TypeError) as error:
+        return json.dumps({'error': type(error).__name__ + ': ' + str(error)})
+
+
+# Score the transactions of stdin, one per line
+def serveStdin(scorer):
+    for request in sys.stdin:
+        if request.strip():
+            sys.stdout.write(scoreRequest(scorer, request) + '\n')
+            sys.stdout.flush()
+
+
+# Score the transactions posted to /score
+def serveHttp(scorer, host, port):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        # Keep the connection open between requests, and send the response without waiting for the client ack
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            if self.path != '/score':
+                self.send_error(404)
+                return
+            response = scoreRequest(scorer, self.rfile.read(int(self.headers['Content-Length']))).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        # Requests are not logged
+        def log_message(self, format, *args):
+            return
+
+    server = HTTPServer((host, port), ScoreHandler)
+    print("Scoring transactions posted to http://" + host + ":" + str(server.server_port) + "/score", file=sys.stderr)
+    server.serve_forever()
+
+
+# Read in the model file and the front end, the arguments are echoed to stderr
+with redirect_stdout(sys.stderr):
+    (inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'modelFile': 'Output/ScoringModel.pkl',
+                                                                                       'host': '127.0.0.1', 'port': 0})
+
+# Load the model once and serve
+startTime = datetime.now()
+transactionScorer = TransactionScorer(loadScoringModel(options['modelFile']))
+print("Model loaded in " + str(datetime.now() - startTime), file=sys.stderr)
+
+if options['port'] == 0:
+    serveStdin(transactionScorer)
+else:
+    serveHttp(transactionScorer, options['host'], options['port'])
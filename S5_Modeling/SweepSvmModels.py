@@ -0,0 +1,142 @@
+#! /usr/bin/python3
+# Import statements
+import os
+import sys
+import itertools
+import tracemalloc
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from sklearn import svm
+from sklearn import metrics
+from sklearn import preprocessing
+from sklearn.model_selection import train_test_split
+DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, DIR)
+from S0_HelperClassLibrary.ReadInArgs import readArgsWithOptions
+from S0_HelperClassLibrary.StageMetrics import stageMetrics
+from S0_HelperClassLibrary.CreateFileNames import *
+from S0_HelperClassLibrary.FeatureCache import loadOrBuildFeatureCache
+from S0_HelperClassLibrary.ParallelColumns import mapSharedArrays
+from S0_HelperClassLibrary.ScalableTraining import MODEL_FEATURE_SETS, createScalableModel, fitMinibatches, \
+    predictMinibatches
+
+"""SweepSvmModels.py is a script that fits a model for each feature set and hyperparameter combination in parallel.
+
+This script expects a jsonl or parquet dataset with the AddFeatures.py features, e.g. the withFraudInd dataset.  The
+features of all feature sets of BuildSvmModel.py are read from the feature cache of CreateFeatureCache.py, which is
+built first when it is out of date, split into train and test records as BuildSvmModel.py, and standardized once with
+the scaler of the training records.  A model is fitted for each combination of:
+    - --featureSets: feature sets of BuildSvmModel.py, X1 to X8
+    - --models: the models of BuildScalableModel.py (sgd, linearSvc, nystroem, rff) or svc, the svm.SVC of
+      BuildSvmModel.py, which only fits in memory for small datasets
+    - --alphas: regularization of the SGD models
+    - --components: number of features of the kernel approximations
+With --workers N the models are fitted by a pool of N processes, which memory map the standardized records read only
+from shared memory.
+
+The accuracy, precision, recall, fit time, and peak memory allocated by the fit of each model are saved as a table in
+Output/Output.<dsName>.SvmModelSweep.txt and .csv.  The peak memory is the memory allocated by Python and numpy, the
+internal memory of libsvm and liblinear is not included.
+"""
+print(__doc__)
+
+# Start time of execution of the script
+startTime = datetime.now()
+
+# Priority on the server
+os.nice(6)
+
+
+# Fit all models and save the table of results
+def sweepSvmModels(inputPath, dsName, dsNameExtension, featureSets, models, alphas, components, batchSize, epochs, seed,
+                   workers):
+    inputFile = createInputFileName(inputPath, dsName, dsNameExtension)
+    featureCacheDirectory = createFeatureCacheName(inputPath, dsName, dsNameExtension)
+    outputResults = createOutputResultsName(dsName, "SvmModelSweep")
+
+    # Memory map the features of all feature sets from the feature cache, built first when it is out of date
+    (featureMatrix, labels, manifest) = loadOrBuildFeatureCache(inputFile, featureCacheDirectory)
+    features = list(dict.fromkeys(itertools.chain.from_iterable(MODEL_FEATURE_SETS[featureSet]
+                                                                for featureSet in featureSets)))
+    featureColumns = [manifest['features'].index(feature) for feature in features]
+
+    # Create Output directory if it doesn't exist
+    if not os.path.exists('Output'):
+        os.makedirs('Output')
+
+    # Create Train-Test and standardize the features once, each feature is standardized on its own
+    X_train, X_test, y_train, y_test = train_test_split(featureMatrix[:, featureColumns].astype('float64'), labels,
+                                                        test_size=0.3, random_state=109)
+    scaler = preprocessing.StandardScaler().fit(X_train)
+    arrays = {'X_train': scaler.transform(X_train), 'X_test': scaler.transform(X_test), 'y_train': y_train,
+              'y_test': y_test}
+    del featureMatrix, X_train, X_test
+
+    # The alphas only apply to the SGD models and the components to the kernel approximations
+    tasks = []
+    for (featureSet, model) in itertools.product(featureSets, models):
+        modelAlphas = alphas if model in ('sgd', 'nystroem', 'rff') else [None]
+        modelComponents = components if model in ('nystroem', 'rff') else [None]
+        for (alpha, numberOfComponents) in itertools.product(modelAlphas, modelComponents):
+            columns = [features.index(feature) for feature in MODEL_FEATURE_SETS[featureSet]]
+            tasks.append((featureSet, columns, model, alpha, numberOfComponents))
+
+    results = mapSharedArrays(fitSweepModel, arrays, tasks, workers, args=(batchSize, epochs, seed))
+    sweepResults = pd.DataFrame(results)
+
+    with open(outputResults, 'w') as output:
+        print("Number of training records: " + str(len(y_train)), file=output)
+        print("Number of test records: " + str(len(y_test)), file=output)
+        print("Number of workers: " + str(workers), file=output)
+        print("---------Results By Feature Set and Model--------", file=output)
+        print(sweepResults.to_string(index=False), file=output)
+    output.close()
+    sweepResults.to_csv(outputResults.rsplit('.', 1)[0] + '.csv', index=False)
+
+
+# Fit and validate the model of a task on the columns of its feature set
+def fitSweepModel(arrays, task, batchSize, epochs, seed):
+    (featureSet, columns, model, alpha, components) = task
+    X_train = np.asarray(arrays['X_train'][:, columns])
+    X_test = np.asarray(arrays['X_test'][:, columns])
+
+    tracemalloc.start()
+    fitStart = datetime.now()
+    if model == 'svc':
+        classifier = svm.SVC(kernel='rbf').fit(X_train, arrays['y_train'])
+        y_pred = classifier.predict(X_test)
+    else:
+        (transformers, classifier) = createScalableModel(model, components or 500, None, alpha or 0.0001, seed)
+        (transformers, classifier) = fitMinibatches(transformers, classifier, X_train, arrays['y_train'], batchSize,
+                                                    epochs, seed)
+        y_pred = predictMinibatches(transformers, classifier, X_test, batchSize)
+    fitTime = datetime.now() - fitStart
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'featureSet': featureSet, 'numberOfFeatures': len(columns), 'model': model, 'alpha': alpha,
+            'components': components, 'accuracy': metrics.accuracy_score(arrays['y_test'], y_pred),
+            'precision': metrics.precision_score(arrays['y_test'], y_pred, zero_division=0),
+            'recall': metrics.recall_score(arrays['y_test'], y_pred),
+            'fitSeconds': round(fitTime.total_seconds(), 3), 'peakMemoryMB': round(peakMemory / 2 ** 20, 1)}
+
+
+# Create infile and outfile
+(inputPath, dsName, dsNameExtension, options) = readArgsWithOptions(sys.argv[1:], {'featureSets': 'X1,X3,X4,X5,X6,X7,X8',
+                                                                                   'models': 'sgd,linearSvc,nystroem',
+                                                                                   'alphas': '0.0001',
+                                                                                   'components': '500',
+                                                                                   'batchSize': 10000, 'epochs': 5,
+                                                                                   'seed': 0, 'workers': 1})
+
+# Execute sweepSvmModels with the passed in arguments
+with stageMetrics(__file__, dsName, options['profile'], options['metricsFile']):
+    sweepSvmModels(inputPath, dsName, dsNameExtension, options['featureSets'].split(','), options['models'].split(','),
+                   [float(alpha) for alpha in options['alphas'].split(',')],
+                   [int(component) for component in options['components'].split(',')], options['batchSize'],
+                   options['epochs'], options['seed'], options['workers'])
+
+# Capture end time and print out run time
+endTime = datetime.now()
+print(endTime - startTime)